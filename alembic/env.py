@@ -27,6 +27,9 @@ if config.config_file_name is not None:
 from app.db.base_class import Base
 from app.models.expediente import Expediente
 from app.models.access_log import AccessLog 
+from app.models.access_log_rollup import AccessLogRollup
+from app.models.analysis_cache import AnalysisCache
+from app.models.analysis_job import AnalysisJob
 # from app.models.user import User # Importar otros modelos si existen
 
 target_metadata = Base.metadata
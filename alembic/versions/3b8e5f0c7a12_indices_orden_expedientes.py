@@ -0,0 +1,33 @@
+"""Indices (fecha, id) para la paginacion por cursor de expedientes
+
+Revision ID: 3b8e5f0c7a12
+Revises: 7d13b9e0f642
+Create Date: 2026-10-17 18:05:12.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e5f0c7a12'
+down_revision: Union[str, None] = '7d13b9e0f642'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY no bloquea las escrituras en expedientes, pero no puede correr dentro de una transacción
+    with op.get_context().autocommit_block():
+        op.create_index('ix_expedientes_fecha_recibido_id', 'expedientes', ['fecha_recibido', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_expedientes_fecha_creacion_id', 'expedientes', ['fecha_creacion', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_expedientes_fecha_creacion_id', table_name='expedientes', postgresql_concurrently=True)
+        op.drop_index('ix_expedientes_fecha_recibido_id', table_name='expedientes', postgresql_concurrently=True)
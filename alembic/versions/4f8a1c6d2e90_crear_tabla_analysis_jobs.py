@@ -0,0 +1,46 @@
+"""Crear tabla analysis_jobs
+
+Revision ID: 4f8a1c6d2e90
+Revises: 9c2d4e7a1b3f
+Create Date: 2026-10-17 11:03:27.541982
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '4f8a1c6d2e90'
+down_revision: Union[str, None] = '9c2d4e7a1b3f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('analysis_jobs',
+    sa.Column('id', sa.Integer(), nullable=False, comment='Identificador único del trabajo'),
+    sa.Column('status', sa.String(length=16), server_default='pending', nullable=False, comment='Estado del trabajo: pending, running, done o dead'),
+    sa.Column('filename', sa.String(), nullable=True, comment='Nombre original del archivo subido'),
+    sa.Column('pdf_content', sa.LargeBinary(), nullable=True, comment='Contenido del PDF (se borra al terminar con éxito)'),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False, comment='Intentos realizados hasta ahora'),
+    sa.Column('max_attempts', sa.Integer(), nullable=False, comment="Intentos permitidos antes de pasar a 'dead'"),
+    sa.Column('available_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False, comment='Momento a partir del cual el trabajo puede reclamarse (backoff entre reintentos)'),
+    sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True, comment='Fin del tiempo de visibilidad del worker que lo reclamó'),
+    sa.Column('last_error', sa.Text(), nullable=True, comment='Último error registrado'),
+    sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=True, comment='AnalysisResponse validado, en formato JSON'),
+    sa.Column('fecha_creacion', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False, comment='Fecha y hora de creación del trabajo'),
+    sa.Column('fecha_actualizacion', sa.DateTime(timezone=True), nullable=True, comment='Fecha y hora de la última actualización'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_analysis_jobs'))
+    )
+    op.create_index(op.f('ix_analysis_jobs_id'), 'analysis_jobs', ['id'], unique=False)
+    op.create_index('ix_analysis_jobs_reclamables', 'analysis_jobs', ['available_at', 'id'], unique=False, postgresql_where=sa.text("status IN ('pending', 'running')"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_analysis_jobs_reclamables', table_name='analysis_jobs', postgresql_where=sa.text("status IN ('pending', 'running')"))
+    op.drop_index(op.f('ix_analysis_jobs_id'), table_name='analysis_jobs')
+    op.drop_table('analysis_jobs')
@@ -0,0 +1,92 @@
+"""expediente_nro unico (upsert en la importacion masiva)
+
+Revision ID: 7d13b9e0f642
+Revises: c62e8d4f1a35
+Create Date: 2026-10-17 16:48:03.115290
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d13b9e0f642'
+down_revision: Union[str, None] = 'c62e8d4f1a35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Los expedientes repetidos que se quitan quedan aquí, con el id del que se conservó
+_AUDIT_TABLE = 'expedientes_duplicados'
+
+# Intentos de crear el índice único: la app sigue escribiendo mientras se crea
+_INDEX_ATTEMPTS = 3
+
+
+def _remove_duplicates() -> int:
+    """
+    Por cada expediente_nro repetido conserva el expediente modificado más recientemente
+    y mueve los demás a expedientes_duplicados (una sola sentencia: es atómica).
+
+    Returns:
+        int: Cantidad de expedientes movidos.
+    """
+    moved = op.get_bind().execute(sa.text(f"""
+        WITH ranked AS (
+            SELECT id,
+                   first_value(id) OVER w AS conservado_id,
+                   row_number() OVER w AS position
+            FROM expedientes
+            WINDOW w AS (
+                PARTITION BY expediente_nro
+                ORDER BY coalesce(fecha_actualizacion, fecha_creacion) DESC, id DESC
+            )
+        ), moved AS (
+            DELETE FROM expedientes
+            USING ranked
+            WHERE expedientes.id = ranked.id AND ranked.position > 1
+            RETURNING expedientes.*, ranked.conservado_id
+        )
+        INSERT INTO {_AUDIT_TABLE} SELECT * FROM moved
+    """)).rowcount
+    if moved:
+        print(f"Se movieron {moved} expedientes con expediente_nro repetido a {_AUDIT_TABLE}.")
+    return moved
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Misma estructura que expedientes (sin restricciones), más el expediente conservado
+    op.execute(f"""
+        CREATE TABLE IF NOT EXISTS {_AUDIT_TABLE} (
+            LIKE expedientes,
+            conservado_id integer NOT NULL,
+            movido_en timestamp with time zone NOT NULL DEFAULT now()
+        )
+    """)
+
+    # CONCURRENTLY no bloquea las escrituras en expedientes, pero no puede correr dentro de una transacción
+    with op.get_context().autocommit_block():
+        for attempt in range(1, _INDEX_ATTEMPTS + 1):
+            _remove_duplicates()
+            try:
+                op.create_index('ix_expedientes_expediente_nro_unico', 'expedientes', ['expediente_nro'], unique=True, postgresql_concurrently=True)
+                break
+            except sa.exc.IntegrityError:
+                # Se insertó un repetido mientras se creaba el índice: queda inválido, se borra y se reintenta
+                op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_expedientes_expediente_nro_unico')
+                if attempt == _INDEX_ATTEMPTS:
+                    raise
+        op.drop_index('ix_expedientes_expediente_nro', table_name='expedientes', postgresql_concurrently=True)
+        op.execute('ALTER INDEX ix_expedientes_expediente_nro_unico RENAME TO ix_expedientes_expediente_nro')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # expedientes_duplicados se conserva: los expedientes movidos no se restauran solos
+    with op.get_context().autocommit_block():
+        op.create_index('ix_expedientes_expediente_nro_no_unico', 'expedientes', ['expediente_nro'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_expedientes_expediente_nro', table_name='expedientes', postgresql_concurrently=True)
+        op.execute('ALTER INDEX ix_expedientes_expediente_nro_no_unico RENAME TO ix_expedientes_expediente_nro')
@@ -0,0 +1,42 @@
+"""Crear tabla analysis_cache
+
+Revision ID: 9c2d4e7a1b3f
+Revises: 730947d89a26
+Create Date: 2026-10-17 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '9c2d4e7a1b3f'
+down_revision: Union[str, None] = '730947d89a26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('analysis_cache',
+    sa.Column('id', sa.Integer(), nullable=False, comment='Identificador único de la entrada de caché'),
+    sa.Column('pdf_sha256', sa.String(length=64), nullable=False, comment='SHA-256 (hex) del contenido del PDF'),
+    sa.Column('prompt_hash', sa.String(length=64), nullable=False, comment='SHA-256 (hex) del prompt del sistema usado'),
+    sa.Column('model_name', sa.String(), nullable=False, comment='Nombre del modelo de IA usado'),
+    sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=False, comment='AnalysisResponse validado, en formato JSON'),
+    sa.Column('hit_count', sa.Integer(), server_default='0', nullable=False, comment='Veces que la entrada fue reutilizada'),
+    sa.Column('fecha_creacion', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False, comment='Fecha y hora de creación de la entrada'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_analysis_cache')),
+    sa.UniqueConstraint('pdf_sha256', 'prompt_hash', 'model_name', name='uq_analysis_cache_clave')
+    )
+    op.create_index(op.f('ix_analysis_cache_id'), 'analysis_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_analysis_cache_pdf_sha256'), 'analysis_cache', ['pdf_sha256'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_analysis_cache_pdf_sha256'), table_name='analysis_cache')
+    op.drop_index(op.f('ix_analysis_cache_id'), table_name='analysis_cache')
+    op.drop_table('analysis_cache')
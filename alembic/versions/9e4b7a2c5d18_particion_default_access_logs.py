@@ -0,0 +1,36 @@
+"""Particion DEFAULT de access_logs
+
+Revision ID: 9e4b7a2c5d18
+Revises: 3b8e5f0c7a12
+Create Date: 2026-10-17 19:42:08.113604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b7a2c5d18'
+down_revision: Union[str, None] = '3b8e5f0c7a12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Recibe los eventos de meses sin partición (si el mantenimiento dejó de correr) en vez
+    # de que el INSERT falle; el mantenimiento los mueve a su partición al crearla
+    op.execute('CREATE TABLE access_logs_default PARTITION OF access_logs DEFAULT')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    rows = op.get_bind().execute(sa.text('SELECT count(*) FROM access_logs_default')).scalar()
+    if rows:
+        raise RuntimeError(
+            f"access_logs_default tiene {rows} registros: ejecute el mantenimiento de particiones "
+            "para moverlos a su partición mensual antes de revertir esta migración."
+        )
+    op.execute('DROP TABLE access_logs_default')
@@ -0,0 +1,44 @@
+"""Indices GIN para buscar en access_logs (trigramas y details JSONB)
+
+Revision ID: a3d9e71c4b58
+Revises: e8c2b5f19d07
+Create Date: 2026-10-17 14:31:50.772014
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d9e71c4b58'
+down_revision: Union[str, None] = 'e8c2b5f19d07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY no bloquea las escrituras en access_logs, pero no puede correr dentro de una transacción
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_access_logs_action_description_trgm', 'access_logs', ['action_description'], unique=False,
+            postgresql_using='gin', postgresql_ops={'action_description': 'gin_trgm_ops'}, postgresql_concurrently=True
+        )
+        # jsonb_path_ops solo sirve para @>, pero es más chico y rápido que el operador por defecto
+        op.create_index(
+            'ix_access_logs_details', 'access_logs', ['details'], unique=False,
+            postgresql_using='gin', postgresql_ops={'details': 'jsonb_path_ops'}, postgresql_concurrently=True
+        )
+        # El b-tree no sirve para ILIKE '%...%' y no hay consultas por igualdad sobre la descripción
+        op.drop_index('ix_access_logs_action_description', table_name='access_logs', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_access_logs_action_description', 'access_logs', ['action_description'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_access_logs_details', table_name='access_logs', postgresql_concurrently=True)
+        op.drop_index('ix_access_logs_action_description_trgm', table_name='access_logs', postgresql_concurrently=True)
@@ -0,0 +1,34 @@
+"""Indice (timestamp, id) para la paginacion por cursor de access_logs
+
+Revision ID: b7e3d52a9c14
+Revises: 4f8a1c6d2e90
+Create Date: 2026-10-17 12:41:08.203519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3d52a9c14'
+down_revision: Union[str, None] = '4f8a1c6d2e90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY no bloquea las escrituras en access_logs, pero no puede correr dentro de una transacción
+    with op.get_context().autocommit_block():
+        op.create_index('ix_access_logs_timestamp_id', 'access_logs', ['timestamp', 'id'], unique=False, postgresql_concurrently=True)
+        # El índice compuesto cubre las consultas por timestamp; el de una sola columna sobra
+        op.drop_index('ix_access_logs_timestamp', table_name='access_logs', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_access_logs_timestamp', 'access_logs', ['timestamp'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_access_logs_timestamp_id', table_name='access_logs', postgresql_concurrently=True)
@@ -0,0 +1,42 @@
+"""Crear tabla access_log_rollups
+
+Revision ID: c62e8d4f1a35
+Revises: f5a0c3e7b921
+Create Date: 2026-10-17 16:05:19.337820
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c62e8d4f1a35'
+down_revision: Union[str, None] = 'f5a0c3e7b921'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('access_log_rollups',
+    sa.Column('bucket', sa.DateTime(timezone=True), nullable=False, comment='Inicio de la hora (UTC) agregada'),
+    sa.Column('action_description', sa.String(), nullable=False, comment='Descripción de la acción o evento registrado'),
+    sa.Column('user_identifier', sa.String(), server_default='', nullable=False, comment="Identificador del usuario ('' si no está disponible)"),
+    sa.Column('event_count', sa.Integer(), nullable=False, comment='Cantidad de eventos en la hora'),
+    sa.PrimaryKeyConstraint('bucket', 'action_description', 'user_identifier', name='pk_access_log_rollups')
+    )
+    # Carga inicial con los eventos ya registrados; desde aquí la tabla se mantiene al insertar
+    op.execute("""
+        INSERT INTO access_log_rollups (bucket, action_description, user_identifier, event_count)
+        SELECT date_trunc('hour', "timestamp" AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+               action_description, COALESCE(user_identifier, ''), count(*)
+        FROM access_logs
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('access_log_rollups')
@@ -0,0 +1,40 @@
+"""Indices compuestos para los filtros de expedientes
+
+Revision ID: d41f6a8b2c73
+Revises: b7e3d52a9c14
+Create Date: 2026-10-17 13:22:45.918307
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41f6a8b2c73'
+down_revision: Union[str, None] = 'b7e3d52a9c14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY no bloquea las escrituras en expedientes, pero no puede correr dentro de una transacción
+    with op.get_context().autocommit_block():
+        op.create_index('ix_expedientes_trabajado_fecha_recibido', 'expedientes', ['trabajado', 'fecha_recibido'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_expedientes_usuario_id_trabajado', 'expedientes', ['usuario_id', 'trabajado'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_expedientes_departamento_trabajado', 'expedientes', ['departamento', 'trabajado'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_expedientes_juzgado_trabajado', 'expedientes', ['juzgado', 'trabajado'], unique=False, postgresql_concurrently=True)
+        # ix_expedientes_usuario_id_trabajado cubre las consultas por usuario_id solo
+        op.drop_index('ix_expedientes_usuario_id', table_name='expedientes', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_expedientes_usuario_id', 'expedientes', ['usuario_id'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_expedientes_juzgado_trabajado', table_name='expedientes', postgresql_concurrently=True)
+        op.drop_index('ix_expedientes_departamento_trabajado', table_name='expedientes', postgresql_concurrently=True)
+        op.drop_index('ix_expedientes_usuario_id_trabajado', table_name='expedientes', postgresql_concurrently=True)
+        op.drop_index('ix_expedientes_trabajado_fecha_recibido', table_name='expedientes', postgresql_concurrently=True)
@@ -0,0 +1,40 @@
+"""Indices de trigramas (pg_trgm) para la busqueda de expedientes
+
+Revision ID: e8c2b5f19d07
+Revises: d41f6a8b2c73
+Create Date: 2026-10-17 13:58:12.406751
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c2b5f19d07'
+down_revision: Union[str, None] = 'd41f6a8b2c73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_TRGM_COLUMNS = ('expediente_nro', 'oficio', 'juzgado')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY no bloquea las escrituras en expedientes, pero no puede correr dentro de una transacción
+    with op.get_context().autocommit_block():
+        for column in _TRGM_COLUMNS:
+            op.create_index(
+                f'ix_expedientes_{column}_trgm', 'expedientes', [column], unique=False,
+                postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'}, postgresql_concurrently=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # La extensión se deja instalada: otras tablas pueden usarla
+    with op.get_context().autocommit_block():
+        for column in reversed(_TRGM_COLUMNS):
+            op.drop_index(f'ix_expedientes_{column}_trgm', table_name='expedientes', postgresql_concurrently=True)
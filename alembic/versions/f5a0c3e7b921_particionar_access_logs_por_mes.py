@@ -0,0 +1,169 @@
+"""Particionar access_logs por mes (timestamp)
+
+Revision ID: f5a0c3e7b921
+Revises: a3d9e71c4b58
+Create Date: 2026-10-17 15:12:36.580443
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5a0c3e7b921'
+down_revision: Union[str, None] = 'a3d9e71c4b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Meses por delante del actual que se crean en la migración (luego los crea la app)
+_MONTHS_AHEAD = 3
+
+_COLUMNS = """
+    id integer NOT NULL DEFAULT nextval('access_logs_id_seq'),
+    "timestamp" timestamp with time zone NOT NULL DEFAULT now(),
+    ip_address varchar(45),
+    action_description varchar NOT NULL,
+    user_identifier varchar,
+    details jsonb
+"""
+
+_COLUMN_COMMENTS = {
+    'id': 'Identificador único del registro de acceso',
+    'timestamp': 'Fecha y hora del evento',
+    'ip_address': 'Dirección IP del cliente que generó el evento',
+    'action_description': 'Descripción de la acción o evento registrado',
+    'user_identifier': 'Identificador del usuario (si está disponible)',
+    'details': 'Detalles adicionales sobre el evento en formato JSON',
+}
+
+# Filas copiadas por sentencia desde la tabla anterior (cada lote se confirma por separado)
+_COPY_BATCH_SIZE = 10000
+
+_INDEX_NAMES = (
+    'ix_access_logs_timestamp_id',
+    'ix_access_logs_user_identifier',
+    'ix_access_logs_action_description_trgm',
+    'ix_access_logs_details',
+)
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_indexes() -> None:
+    op.create_index('ix_access_logs_timestamp_id', 'access_logs', ['timestamp', 'id'], unique=False)
+    op.create_index('ix_access_logs_user_identifier', 'access_logs', ['user_identifier'], unique=False)
+    op.create_index(
+        'ix_access_logs_action_description_trgm', 'access_logs', ['action_description'], unique=False,
+        postgresql_using='gin', postgresql_ops={'action_description': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_access_logs_details', 'access_logs', ['details'], unique=False,
+        postgresql_using='gin', postgresql_ops={'details': 'jsonb_path_ops'}
+    )
+
+
+def _comment_columns() -> None:
+    for column, comment in _COLUMN_COMMENTS.items():
+        escaped = comment.replace("'", "''")
+        op.execute(f'COMMENT ON COLUMN access_logs."{column}" IS \'{escaped}\'')
+
+
+def _move_to_legacy() -> None:
+    """Renombra la tabla actual (sin índices) y le quita la secuencia para reutilizarla."""
+    for index_name in _INDEX_NAMES + ('ix_access_logs_id',):
+        op.execute(f'DROP INDEX IF EXISTS {index_name}')
+    op.execute('ALTER TABLE access_logs RENAME TO access_logs_legacy')
+    op.execute('ALTER TABLE access_logs_legacy RENAME CONSTRAINT pk_access_logs TO pk_access_logs_legacy')
+    op.execute('ALTER TABLE access_logs_legacy ALTER COLUMN id DROP DEFAULT')
+    op.execute('ALTER SEQUENCE access_logs_id_seq OWNED BY NONE')
+
+
+def _copy_from_legacy() -> None:
+    """
+    Copia access_logs_legacy a access_logs en lotes de _COPY_BATCH_SIZE filas, recorridos
+    por id (su clave primaria), confirmando cada lote. Así ninguna transacción abarca toda
+    la copia: la tabla anterior solo se lee y la nueva sigue aceptando escrituras mientras
+    tanto (los eventos nuevos usan ids posteriores, de la misma secuencia).
+    """
+    bind = op.get_bind()
+    copy_batch = sa.text("""
+        WITH moved AS (
+            INSERT INTO access_logs (id, "timestamp", ip_address, action_description, user_identifier, details)
+            SELECT id, "timestamp", ip_address, action_description, user_identifier, details
+            FROM access_logs_legacy WHERE id > :last_id ORDER BY id LIMIT :batch_size
+            RETURNING id
+        )
+        SELECT count(*), max(id) FROM moved
+    """)
+    last_id = 0
+    copied = 0
+    with op.get_context().autocommit_block():
+        while True:
+            count, batch_last_id = bind.execute(copy_batch, {"last_id": last_id, "batch_size": _COPY_BATCH_SIZE}).one()
+            if not count:
+                break
+            copied += count
+            last_id = batch_last_id
+    print(f"access_logs: {copied} registros copiados en lotes de {_COPY_BATCH_SIZE}.")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _move_to_legacy()
+
+    # La clave primaria de una tabla particionada debe incluir la columna de partición
+    op.execute(f"""
+        CREATE TABLE access_logs ({_COLUMNS},
+            CONSTRAINT pk_access_logs PRIMARY KEY (id, "timestamp")
+        ) PARTITION BY RANGE ("timestamp")
+    """)
+    op.execute('ALTER SEQUENCE access_logs_id_seq OWNED BY access_logs.id')
+    _comment_columns()
+
+    # Una partición por mes (en UTC) desde el registro más antiguo hasta _MONTHS_AHEAD meses por delante
+    oldest = op.get_bind().execute(sa.text('SELECT min("timestamp") FROM access_logs_legacy')).scalar()
+    now = datetime.now(timezone.utc)
+    first = (oldest.astimezone(timezone.utc) if oldest else now).date().replace(day=1)
+    last = _add_months(now.date().replace(day=1), _MONTHS_AHEAD)
+    month = first
+    while month <= last:
+        next_month = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE access_logs_p{month:%Y_%m} PARTITION OF access_logs "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{next_month.isoformat()} 00:00:00+00')"
+        )
+        month = next_month
+
+    # Índices en la tabla padre: PostgreSQL los crea en cada partición (también en las futuras)
+    _create_indexes()
+
+    # La estructura nueva se confirma antes de copiar, así las escrituras de la app no esperan a la copia
+    _copy_from_legacy()
+    # La secuencia es la misma de antes y la app ya la usó durante la copia: no se reajusta
+    op.execute('DROP TABLE access_logs_legacy')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _move_to_legacy()
+
+    op.execute(f"""
+        CREATE TABLE access_logs ({_COLUMNS},
+            CONSTRAINT pk_access_logs PRIMARY KEY (id)
+        )
+    """)
+    op.execute('ALTER SEQUENCE access_logs_id_seq OWNED BY access_logs.id')
+    _comment_columns()
+    op.create_index('ix_access_logs_id', 'access_logs', ['id'], unique=False)
+    _create_indexes()
+
+    # La estructura nueva se confirma antes de copiar, así las escrituras de la app no esperan a la copia
+    _copy_from_legacy()
+    # Elimina la tabla particionada y todas sus particiones
+    op.execute('DROP TABLE access_logs_legacy')
@@ -1,64 +1,98 @@
 # app/crud/crud_access_log.py
-from sqlalchemy.orm import Session
-from typing import List, Optional, Type, Dict, Any
+from datetime import datetime
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Dict, Any, Tuple
 
+from app.crud.crud_access_log_rollup import increment_rollups
+from app.crud.pagination import decode_cursor, encode_cursor, split_page
 from app.models.access_log import AccessLog # Modelo SQLAlchemy
-from app.schemas.access_log import AccessLogCreate # Esquema Pydantic para creación
 
-def create_access_log_entry(
-    db: Session,
-    *,
-    log_entry_in: AccessLogCreate, # Datos que vienen de la solicitud
-    ip_address: Optional[str] = None # La IP se obtendrá de la solicitud en el router
-) -> AccessLog:
+async def create_access_log_entries(db: AsyncSession, entries: List[Dict[str, Any]]) -> int:
     """
-    Crea un nuevo registro de log de acceso en la base de datos.
+    Inserta varios registros de acceso en una sola transacción (INSERT de varias filas,
+    sin leer de vuelta los registros creados) y actualiza sus agregados por hora.
 
     Args:
-        db (Session): La sesión de la base de datos.
-        log_entry_in (AccessLogCreate): Datos del log a crear.
-        ip_address (Optional[str]): Dirección IP del solicitante.
+        db (AsyncSession): La sesión asíncrona de la base de datos.
+        entries (List[Dict[str, Any]]): Valores de cada registro (columnas de AccessLog).
 
     Returns:
-        AccessLog: El objeto AccessLog recién creado.
+        int: Cantidad de registros insertados.
     """
-    db_log_entry = AccessLog(
-        ip_address=ip_address,
-        action_description=log_entry_in.action_description,
-        user_identifier=log_entry_in.user_identifier,
-        details=log_entry_in.details
-        # timestamp es manejado por server_default=func.now()
-    )
-    db.add(db_log_entry)
-    db.commit()
-    db.refresh(db_log_entry)
-    return db_log_entry
+    if not entries:
+        return 0
+    await db.execute(insert(AccessLog), entries)
+    await increment_rollups(db, entries)
+    await db.commit()
+    return len(entries)
 
-def get_access_logs(
-    db: Session,
+async def get_access_logs(
+    db: AsyncSession,
     skip: int = 0,
     limit: int = 100,
     user_identifier: Optional[str] = None,
-    action_description: Optional[str] = None
-) -> List[Type[AccessLog]]:
+    action_description: Optional[str] = None,
+    details: Optional[Dict[str, Any]] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    cursor: Optional[str] = None
+) -> Tuple[List[AccessLog], Optional[str]]:
     """
-    Obtiene una lista de registros de acceso, con filtros opcionales y paginación.
+    Obtiene una página de registros de acceso, del más reciente al más antiguo
+    (orden por timestamp e id), con filtros opcionales.
 
     Args:
-        db (Session): La sesión de la base de datos.
-        skip (int): Número de registros a saltar.
+        db (AsyncSession): La sesión asíncrona de la base de datos.
+        skip (int): Número de registros a saltar (solo por compatibilidad; se ignora si hay cursor).
         limit (int): Número máximo de registros a devolver.
         user_identifier (Optional[str]): Filtrar por identificador de usuario.
-        action_description (Optional[str]): Filtrar por descripción de acción (búsqueda parcial).
+        action_description (Optional[str]): Filtrar por descripción de acción (búsqueda parcial,
+            con el índice de trigramas).
+        details (Optional[Dict[str, Any]]): Filtrar los registros cuyo `details` contiene este
+            objeto JSON (operador @>, con el índice GIN jsonb_path_ops).
+        desde (Optional[datetime]): Solo registros desde este momento (inclusive).
+        hasta (Optional[datetime]): Solo registros anteriores a este momento. Con un rango,
+            PostgreSQL consulta solo las particiones mensuales que lo cubren.
+        cursor (Optional[str]): Cursor devuelto por la página anterior.
 
     Returns:
-        List[Type[AccessLog]]: Una lista de objetos AccessLog.
+        Tuple[List[AccessLog], Optional[str]]: Los registros y el cursor de la página
+            siguiente (None si no hay más).
+
+    Raises:
+        ValueError: Si el cursor no es válido.
     """
-    query = db.query(AccessLog)
+    query = select(AccessLog)
     if user_identifier:
-        query = query.filter(AccessLog.user_identifier == user_identifier)
+        query = query.where(AccessLog.user_identifier == user_identifier)
     if action_description:
-        query = query.filter(AccessLog.action_description.ilike(f"%{action_description}%")) # Búsqueda case-insensitive
+        query = query.where(AccessLog.action_description.ilike(f"%{action_description}%")) # Búsqueda case-insensitive
+    if details:
+        query = query.where(AccessLog.details.contains(details)) # details @> '{...}'
+    if desde is not None:
+        query = query.where(AccessLog.timestamp >= desde)
+    if hasta is not None:
+        query = query.where(AccessLog.timestamp < hasta)
+
+    if cursor is not None:
+        # Continúa justo después de la última fila de la página anterior, usando el índice (timestamp, id)
+        last_timestamp, last_id = decode_cursor(cursor, 2)
+        try:
+            last_timestamp = datetime.fromisoformat(last_timestamp)
+        except (TypeError, ValueError) as e:
+            raise ValueError("Cursor de paginación inválido.") from e
+        if not isinstance(last_id, int):
+            raise ValueError("Cursor de paginación inválido.")
+        query = query.where(tuple_(AccessLog.timestamp, AccessLog.id) < tuple_(last_timestamp, last_id))
+        # Redundante, pero la comparación de tuplas no permite descartar particiones y esta sí
+        query = query.where(AccessLog.timestamp <= last_timestamp)
+    elif skip:
+        query = query.offset(skip)
 
-    return query.order_by(AccessLog.timestamp.desc()).offset(skip).limit(limit).all()
+    query = query.order_by(AccessLog.timestamp.desc(), AccessLog.id.desc()).limit(limit + 1)
+    result = await db.execute(query)
+    logs, has_more = split_page(result.scalars().all(), limit)
+    next_cursor = encode_cursor([logs[-1].timestamp, logs[-1].id]) if has_more else None
+    return logs, next_cursor
 
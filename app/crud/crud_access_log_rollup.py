@@ -0,0 +1,108 @@
+# app/crud/crud_access_log_rollup.py
+from collections import Counter
+from datetime import datetime, timezone
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.access_log_rollup import AccessLogRollup # Modelo SQLAlchemy
+
+def _hour_bucket(timestamp: datetime) -> datetime:
+    """Inicio de la hora (UTC) a la que pertenece el evento."""
+    return timestamp.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+async def increment_rollups(db: AsyncSession, entries: List[Dict[str, Any]]) -> None:
+    """
+    Suma los eventos a sus contadores por hora, acción y usuario (sin hacer commit:
+    debe ir en la misma transacción que el INSERT de los eventos).
+
+    Args:
+        db (AsyncSession): La sesión asíncrona de la base de datos.
+        entries (List[Dict[str, Any]]): Eventos con timestamp, action_description y user_identifier.
+    """
+    counts = Counter(
+        (_hour_bucket(entry["timestamp"]), entry["action_description"], entry.get("user_identifier") or "")
+        for entry in entries
+    )
+    if not counts:
+        return
+    # Orden fijo de las filas para que dos lotes concurrentes no se bloqueen mutuamente
+    rows = [
+        {"bucket": bucket, "action_description": action, "user_identifier": user, "event_count": count}
+        for (bucket, action, user), count in sorted(counts.items())
+    ]
+    stmt = insert(AccessLogRollup).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        constraint="pk_access_log_rollups",
+        set_={"event_count": AccessLogRollup.event_count + stmt.excluded.event_count}
+    )
+    await db.execute(stmt)
+
+def _range_filters(
+    query,
+    desde: datetime,
+    hasta: datetime,
+    action_description: Optional[str],
+    user_identifier: Optional[str]
+):
+    query = query.where(AccessLogRollup.bucket >= _hour_bucket(desde), AccessLogRollup.bucket < hasta)
+    if action_description is not None:
+        query = query.where(AccessLogRollup.action_description == action_description)
+    if user_identifier is not None:
+        query = query.where(AccessLogRollup.user_identifier == user_identifier)
+    return query
+
+async def get_time_series(
+    db: AsyncSession,
+    *,
+    desde: datetime,
+    hasta: datetime,
+    granularity: str = "hour",
+    action_description: Optional[str] = None,
+    user_identifier: Optional[str] = None
+) -> List[Tuple[datetime, int]]:
+    """
+    Cantidad de eventos por hora o por día (UTC) en [desde, hasta), leída de los agregados.
+
+    Returns:
+        List[Tuple[datetime, int]]: (inicio del intervalo, cantidad), en orden cronológico.
+    """
+    if granularity == "hour":
+        period = AccessLogRollup.bucket
+    else:
+        period = func.timezone("UTC", func.date_trunc(granularity, func.timezone("UTC", AccessLogRollup.bucket)))
+    period = period.label("period")
+    query = _range_filters(
+        select(period, func.sum(AccessLogRollup.event_count)),
+        desde, hasta, action_description, user_identifier
+    ).group_by(period).order_by(period)
+    result = await db.execute(query)
+    return [(row[0], int(row[1])) for row in result.all()]
+
+async def get_top(
+    db: AsyncSession,
+    *,
+    dimension: str,
+    desde: datetime,
+    hasta: datetime,
+    limit: int = 10,
+    action_description: Optional[str] = None,
+    user_identifier: Optional[str] = None
+) -> List[Tuple[Optional[str], int]]:
+    """
+    Las `limit` acciones (dimension="action") o usuarios (dimension="user") con más
+    eventos en [desde, hasta).
+
+    Returns:
+        List[Tuple[Optional[str], int]]: (acción o usuario, cantidad), de mayor a menor.
+            Los eventos sin usuario se agrupan con None.
+    """
+    column = AccessLogRollup.action_description if dimension == "action" else AccessLogRollup.user_identifier
+    total = func.sum(AccessLogRollup.event_count).label("total")
+    query = _range_filters(
+        select(column, total),
+        desde, hasta, action_description, user_identifier
+    ).group_by(column).order_by(total.desc(), column).limit(limit)
+    result = await db.execute(query)
+    return [(row[0] or None, int(row[1])) for row in result.all()]
@@ -0,0 +1,80 @@
+# app/crud/crud_analysis_cache.py
+from sqlalchemy import update, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from typing import Optional, Dict, Any
+
+from app.models.analysis_cache import AnalysisCache # Modelo SQLAlchemy
+
+def get_cached_result(
+    db: Session,
+    *,
+    pdf_sha256: str,
+    prompt_hash: str,
+    model_name: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Busca un resultado de análisis en caché y, si existe, incrementa su contador de usos.
+
+    Args:
+        db (Session): La sesión de la base de datos.
+        pdf_sha256 (str): Hash SHA-256 del contenido del PDF.
+        prompt_hash (str): Hash SHA-256 del prompt del sistema.
+        model_name (str): Nombre del modelo de IA.
+
+    Returns:
+        Optional[Dict[str, Any]]: El JSON del AnalysisResponse guardado, o None si no hay entrada.
+    """
+    # Un único UPDATE ... RETURNING resuelve la búsqueda y el contador en un solo viaje
+    stmt = (
+        update(AnalysisCache)
+        .where(
+            AnalysisCache.pdf_sha256 == pdf_sha256,
+            AnalysisCache.prompt_hash == prompt_hash,
+            AnalysisCache.model_name == model_name,
+        )
+        .values(hit_count=AnalysisCache.hit_count + 1)
+        .returning(AnalysisCache.result)
+    )
+    result = db.execute(stmt).scalar_one_or_none()
+    db.commit()
+    return result
+
+def store_result(
+    db: Session,
+    *,
+    pdf_sha256: str,
+    prompt_hash: str,
+    model_name: str,
+    result: Dict[str, Any]
+) -> None:
+    """
+    Guarda un resultado de análisis en caché.
+    Si otra solicitud ya guardó la misma clave (subidas concurrentes), no hace nada.
+    """
+    stmt = (
+        insert(AnalysisCache)
+        .values(pdf_sha256=pdf_sha256, prompt_hash=prompt_hash, model_name=model_name, result=result)
+        .on_conflict_do_nothing(constraint="uq_analysis_cache_clave")
+    )
+    db.execute(stmt)
+    db.commit()
+
+def purge_cache(db: Session, *, keep_prompt_hash: Optional[str] = None) -> int:
+    """
+    Elimina entradas de la caché de análisis.
+
+    Args:
+        db (Session): La sesión de la base de datos.
+        keep_prompt_hash (Optional[str]): Si se indica, solo se eliminan las entradas
+            generadas con un prompt distinto (entradas obsoletas).
+
+    Returns:
+        int: Número de entradas eliminadas.
+    """
+    stmt = delete(AnalysisCache)
+    if keep_prompt_hash:
+        stmt = stmt.where(AnalysisCache.prompt_hash != keep_prompt_hash)
+    deleted = db.execute(stmt).rowcount
+    db.commit()
+    return deleted
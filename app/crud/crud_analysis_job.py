@@ -0,0 +1,173 @@
+# app/crud/crud_analysis_job.py
+from datetime import timedelta
+from sqlalchemy import select, update, or_, and_, func
+from sqlalchemy.orm import Session, defer
+from typing import Optional, Dict, Any
+
+from app.models.analysis_job import (
+    AnalysisJob,
+    JOB_STATUS_PENDING,
+    JOB_STATUS_RUNNING,
+    JOB_STATUS_DONE,
+    JOB_STATUS_DEAD,
+)
+
+def create_job(db: Session, *, filename: Optional[str], pdf_content: bytes, max_attempts: int) -> AnalysisJob:
+    """
+    Encola un nuevo trabajo de análisis con el PDF subido.
+
+    Args:
+        db (Session): La sesión de la base de datos.
+        filename (Optional[str]): Nombre original del archivo.
+        pdf_content (bytes): Contenido del PDF.
+        max_attempts (int): Intentos permitidos antes de pasar a 'dead'.
+
+    Returns:
+        AnalysisJob: El trabajo recién creado (estado 'pending').
+    """
+    db_job = AnalysisJob(filename=filename, pdf_content=pdf_content, max_attempts=max_attempts)
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def get_job(db: Session, job_id: int) -> Optional[AnalysisJob]:
+    """
+    Obtiene un trabajo de análisis por su ID, sin cargar el PDF (la consulta de estado
+    no lo necesita y puede pesar tanto como el límite de subida).
+    """
+    return db.query(AnalysisJob).options(defer(AnalysisJob.pdf_content)).filter(AnalysisJob.id == job_id).first()
+
+def claim_next_job(db: Session, *, visibility_timeout_seconds: int) -> Optional[AnalysisJob]:
+    """
+    Reclama el siguiente trabajo disponible para este worker.
+
+    Usa `FOR UPDATE SKIP LOCKED`, de modo que varios procesos pueden reclamar a la vez
+    sin bloquearse ni tomar el mismo trabajo. Un trabajo 'running' cuyo tiempo de
+    visibilidad venció (worker caído o reiniciado) vuelve a ser reclamable si le quedan
+    intentos; si no, pasa a 'dead' (ej. un PDF que tira abajo al worker en cada intento).
+
+    Args:
+        db (Session): La sesión de la base de datos.
+        visibility_timeout_seconds (int): Tiempo que el trabajo queda reservado para este worker.
+
+    Returns:
+        Optional[AnalysisJob]: El trabajo reclamado (ya en 'running'), o None si no hay ninguno.
+    """
+    now = func.now()
+    # Trabajos abandonados sin intentos restantes: el worker murió en el último intento
+    db.execute(
+        update(AnalysisJob)
+        .where(
+            AnalysisJob.status == JOB_STATUS_RUNNING,
+            AnalysisJob.locked_until < now,
+            AnalysisJob.attempts >= AnalysisJob.max_attempts,
+        )
+        .values(
+            status=JOB_STATUS_DEAD,
+            locked_until=None,
+            last_error=func.coalesce(AnalysisJob.last_error + "; ", "") + "El worker no terminó el último intento (tiempo de visibilidad vencido).",
+        )
+        .execution_options(synchronize_session=False)
+    )
+    next_job_id = (
+        select(AnalysisJob.id)
+        .where(
+            AnalysisJob.available_at <= now,
+            or_(
+                AnalysisJob.status == JOB_STATUS_PENDING,
+                and_(
+                    AnalysisJob.status == JOB_STATUS_RUNNING,
+                    AnalysisJob.locked_until < now,
+                    AnalysisJob.attempts < AnalysisJob.max_attempts,
+                ),
+            ),
+        )
+        .order_by(AnalysisJob.available_at, AnalysisJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(AnalysisJob)
+        .where(AnalysisJob.id == next_job_id)
+        .values(
+            status=JOB_STATUS_RUNNING,
+            attempts=AnalysisJob.attempts + 1,
+            locked_until=now + timedelta(seconds=visibility_timeout_seconds),
+        )
+        .returning(AnalysisJob)
+        .execution_options(synchronize_session=False)
+    )
+    claimed = db.execute(stmt).scalars().first()
+    if claimed is not None:
+        # Se separa de la sesión para que el commit no expire sus atributos (evita recargar el PDF)
+        db.expunge(claimed)
+    db.commit()
+    return claimed
+
+def _owned_by(job: AnalysisJob):
+    """
+    Condición de que el trabajo sigue reservado por quien lo reclamó: cada reclamo suma un
+    intento, así que si otro worker lo volvió a reclamar (visibilidad vencida) `attempts` cambió.
+    """
+    return (
+        AnalysisJob.id == job.id,
+        AnalysisJob.status == JOB_STATUS_RUNNING,
+        AnalysisJob.attempts == job.attempts,
+    )
+
+def extend_job_lease(db: Session, job: AnalysisJob, *, visibility_timeout_seconds: int) -> bool:
+    """
+    Extiende el tiempo de visibilidad de un trabajo en curso (latido del worker).
+
+    Returns:
+        bool: False si el trabajo ya no pertenece a este worker.
+    """
+    result = db.execute(
+        update(AnalysisJob)
+        .where(*_owned_by(job))
+        .values(locked_until=func.now() + timedelta(seconds=visibility_timeout_seconds))
+    )
+    db.commit()
+    return result.rowcount == 1
+
+def mark_job_done(db: Session, job: AnalysisJob, *, result: Dict[str, Any]) -> bool:
+    """
+    Marca un trabajo como terminado, guarda el resultado y libera el PDF almacenado.
+
+    Returns:
+        bool: False si el trabajo ya no pertenece a este worker (no se modifica nada).
+    """
+    updated = db.execute(
+        update(AnalysisJob)
+        .where(*_owned_by(job))
+        .values(status=JOB_STATUS_DONE, result=result, pdf_content=None, locked_until=None, last_error=None)
+    )
+    db.commit()
+    return updated.rowcount == 1
+
+def mark_job_failed(db: Session, job: AnalysisJob, *, error: str, retry_delay_seconds: float, retryable: bool = True) -> Optional[str]:
+    """
+    Registra el fallo de un intento.
+
+    Si quedan intentos y el error es recuperable, el trabajo vuelve a 'pending' y
+    se podrá reclamar tras `retry_delay_seconds`. Si no, pasa a 'dead' (dead-letter).
+
+    Returns:
+        Optional[str]: El nuevo estado del trabajo, o None si ya no pertenece a este
+            worker (no se modifica nada).
+    """
+    new_status = JOB_STATUS_PENDING if retryable and job.attempts < job.max_attempts else JOB_STATUS_DEAD
+    updated = db.execute(
+        update(AnalysisJob)
+        .where(*_owned_by(job))
+        .values(
+            status=new_status,
+            last_error=error,
+            locked_until=None,
+            available_at=func.now() + timedelta(seconds=retry_delay_seconds),
+        )
+    )
+    db.commit()
+    return new_status if updated.rowcount == 1 else None
@@ -1,82 +1,447 @@
 # app/crud/crud_expediente.py
-from sqlalchemy.orm import Session
-from typing import List, Optional, Type
+import json
+from collections import defaultdict
+from datetime import date, datetime
+from sqlalchemy import Integer, Select, any_, bindparam, delete, func, insert, literal, literal_column, or_, select, tuple_, union_all, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
+from app.core.config import settings
+from app.crud.pagination import decode_cursor, encode_cursor, split_page
 from app.models.expediente import Expediente
-from app.schemas.expediente import ExpedienteCreate, ExpedienteUpdate
+from app.schemas.expediente import ExpedienteCreate, ExpedienteFilters, ExpedienteUpdate
 
-# --- Operaciones CRUD para Expediente ---
+# --- Operaciones CRUD para Expediente (asíncronas) ---
 
-def get_expediente(db: Session, expediente_id: int) -> Optional[Expediente]:
+async def get_expediente(db: AsyncSession, expediente_id: int) -> Optional[Expediente]:
     """Obtiene un expediente específico por su ID."""
-    return db.query(Expediente).filter(Expediente.id == expediente_id).first()
+    result = await db.execute(select(Expediente).where(Expediente.id == expediente_id))
+    return result.scalars().first()
 
-def get_expedientes(db: Session, skip: int = 0, limit: int = 100) -> List[Type[Expediente]]:
-    """Obtiene una lista de expedientes, con opción de paginación."""
-    return db.query(Expediente).offset(skip).limit(limit).all()
+# Campos por los que se puede ordenar la lista; el id desempata para que el orden sea total
+_SORT_FIELDS = {
+    "id": (Expediente.id, int),
+    "fecha_recibido": (Expediente.fecha_recibido, date.fromisoformat),
+    "fecha_creacion": (Expediente.fecha_creacion, datetime.fromisoformat),
+    "expediente_nro": (Expediente.expediente_nro, str),
+}
+SORT_OPTIONS = [prefix + field for field in _SORT_FIELDS for prefix in ("", "-")]
 
-def get_expediente_by_nro(db: Session, expediente_nro: str) -> Optional[Expediente]:
+
+def _apply_filters(query, filters: ExpedienteFilters):
+    """Añade a la consulta (SELECT o UPDATE) las condiciones de los filtros indicados (todas con índice)."""
+    if filters.trabajado is not None:
+        query = query.where(Expediente.trabajado == filters.trabajado)
+    if filters.juzgado is not None:
+        query = query.where(Expediente.juzgado == filters.juzgado)
+    if filters.departamento is not None:
+        query = query.where(Expediente.departamento == filters.departamento)
+    if filters.usuario_id is not None:
+        query = query.where(Expediente.usuario_id == filters.usuario_id)
+    if filters.fecha_recibido_desde is not None:
+        query = query.where(Expediente.fecha_recibido >= filters.fecha_recibido_desde)
+    if filters.fecha_recibido_hasta is not None:
+        query = query.where(Expediente.fecha_recibido <= filters.fecha_recibido_hasta)
+    return query
+
+
+def _after_row(column, descending: bool, last_value: Any, last_id: int):
+    """
+    Condición "fila posterior a (last_value, last_id)" para ORDER BY column, id en el mismo
+    sentido. Como comparación de filas, el índice (column, id) la resuelve como un rango.
+    """
+    if column is Expediente.id:
+        return Expediente.id < last_id if descending else Expediente.id > last_id
+    row, last = tuple_(column, Expediente.id), tuple_(literal(last_value, column.type), literal(last_id))
+    return row < last if descending else row > last
+
+
+def _keyset_query(
+    base: Select,
+    column,
+    descending: bool,
+    after: Optional[Tuple[Any, int]],
+    skip: int,
+    limit: int
+) -> Select:
+    """
+    Consulta de una página ordenada por column, id (NULL al final en ambos sentidos)
+    que empieza después de `after` (valor e id de la última fila de la página anterior).
+
+    Si la columna admite NULL, los valores y los NULL se leen en dos ramas de un UNION
+    ALL, cada una en el orden del índice (column, id), y luego se unen. Una sola condición
+    con "OR column IS NULL" obligaría a recorrer y ordenar toda la tabla.
+    """
+    def ordered(query: Select, sort_column) -> Select:
+        order = [sort_column.desc() if descending else sort_column.asc()]
+        if sort_column is not Expediente.id:
+            order.append(Expediente.id.desc() if descending else Expediente.id.asc())
+        return query.order_by(*order)
+
+    def page(query: Select) -> Select:
+        return query.offset(skip or None).limit(limit + 1)
+
+    if not column.nullable:
+        query = ordered(base, column)
+        if after is not None:
+            query = query.where(_after_row(column, descending, *after))
+        return page(query)
+
+    nulls = ordered(base.where(column.is_(None)), Expediente.id)
+    if after is not None and after[0] is None:
+        # La página anterior terminó entre los NULL: solo quedan NULL
+        return page(nulls.where(_after_row(Expediente.id, descending, None, after[1])))
+
+    values = ordered(base.where(column.is_not(None)), column)
+    if after is not None:
+        values = values.where(_after_row(column, descending, *after))
+    branch_limit = skip + limit + 1
+    parts = union_all(values.limit(branch_limit), nulls.limit(branch_limit)).subquery()
+    expediente = aliased(Expediente, parts)
+    part_value = getattr(expediente, column.key)
+    return page(select(expediente).order_by(
+        part_value.desc().nulls_last() if descending else part_value.asc().nulls_last(),
+        expediente.id.desc() if descending else expediente.id.asc()
+    ))
+
+
+async def get_expedientes(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    filters: Optional[ExpedienteFilters] = None
+) -> Tuple[List[Expediente], Optional[str]]:
+    """
+    Obtiene una página de expedientes filtrada y ordenada en SQL.
+
+    `sort` es un campo de SORT_OPTIONS ("-" adelante para orden descendente). Con
+    `cursor` la página empieza después de la última fila de la anterior (paginación
+    por clave: mismo costo a cualquier profundidad); `skip` se mantiene solo por
+    compatibilidad y se ignora si hay cursor.
+
+    Returns:
+        Tuple[List[Expediente], Optional[str]]: Los expedientes y el cursor de la
+            página siguiente (None si no hay más).
+
+    Raises:
+        ValueError: Si el orden no es válido, o si el cursor no es válido o fue
+            generado con otro orden.
+    """
+    descending = sort.startswith("-")
+    field = sort.lstrip("-")
+    if field not in _SORT_FIELDS:
+        raise ValueError(f"Orden no válido: '{sort}'. Opciones: {', '.join(SORT_OPTIONS)}.")
+    column, parse_value = _SORT_FIELDS[field]
+
+    after = None
+    if cursor is not None:
+        cursor_sort, last_value, last_id = decode_cursor(cursor, 3)
+        if cursor_sort != sort or not isinstance(last_id, int):
+            raise ValueError("Cursor de paginación inválido.")
+        try:
+            last_value = parse_value(last_value) if last_value is not None else None
+        except (TypeError, ValueError) as e:
+            raise ValueError("Cursor de paginación inválido.") from e
+        after = (last_value, last_id)
+        skip = 0
+
+    base = _apply_filters(select(Expediente), filters or ExpedienteFilters())
+    result = await db.execute(_keyset_query(base, column, descending, after, skip, limit))
+    expedientes, has_more = split_page(result.scalars().all(), limit)
+    next_cursor = None
+    if has_more:
+        last = expedientes[-1]
+        next_cursor = encode_cursor([sort, getattr(last, field), last.id])
+    return expedientes, next_cursor
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) de una consulta, con sus parámetros enlazados (no interpolados)."""
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(_Explain)
+def _compile_explain(element: _Explain, compiler, **kw) -> str:
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kw)}"
+
+
+async def count_expedientes(db: AsyncSession, filters: Optional[ExpedienteFilters] = None) -> Tuple[int, bool]:
+    """
+    Cuenta los expedientes que cumplen los filtros.
+
+    Primero consulta la estimación del planificador (EXPLAIN, sin recorrer la tabla);
+    si supera EXPEDIENTES_COUNT_ESTIMATE_THRESHOLD se devuelve esa estimación, y si no,
+    un COUNT(*) exacto, que para resultados chicos es barato.
+
+    Returns:
+        Tuple[int, bool]: El total y si es una estimación.
+    """
+    query = _apply_filters(select(Expediente.id), filters or ExpedienteFilters())
+    result = await db.execute(_Explain(query))
+    plan = result.scalar_one()
+    if isinstance(plan, str): # asyncpg devuelve el JSON como texto
+        plan = json.loads(plan)
+    estimate = int(plan[0]["Plan"]["Plan Rows"])
+    if estimate > settings.EXPEDIENTES_COUNT_ESTIMATE_THRESHOLD:
+        return estimate, True
+
+    total = await db.scalar(select(func.count()).select_from(query.subquery()))
+    return total, False
+
+# Columnas de la exportación, en el orden en que se escriben
+EXPORT_COLUMNS = [column.name for column in Expediente.__table__.columns]
+
+
+async def stream_expedientes(
+    db: AsyncSession,
+    filters: Optional[ExpedienteFilters] = None,
+    batch_size: int = 1000
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Recorre todos los expedientes que cumplen los filtros (ordenados por id) con un
+    cursor del lado del servidor, de a `batch_size` filas: la memoria usada no depende
+    del total. Devuelve filas (no objetos ORM) con las columnas de EXPORT_COLUMNS.
+    """
+    query = _apply_filters(select(*Expediente.__table__.columns), filters or ExpedienteFilters())
+    result = await db.stream(query.order_by(Expediente.id).execution_options(yield_per=batch_size))
+    async for partition in result.mappings().partitions():
+        yield partition
+
+def _escape_like(value: str) -> str:
+    """Escapa los comodines de LIKE para buscar el texto literal."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+async def search_expedientes(db: AsyncSession, q: str, limit: int = 20) -> List[Expediente]:
+    """
+    Búsqueda aproximada por número de expediente, oficio o juzgado.
+
+    Una fila coincide si alguno de los tres campos contiene `q` (ILIKE) o se parece a
+    `q` según pg_trgm (operador `<%`, word_similarity). Ambos usan los índices GIN de
+    trigramas. Como pg_trgm ignora la puntuación, "330 364" encuentra "IUE 330-364/2024".
+    Los resultados se ordenan por la mayor similitud entre los tres campos.
+    """
+    pattern = f"%{_escape_like(q)}%"
+    columns = (Expediente.expediente_nro, Expediente.oficio, Expediente.juzgado)
+    conditions = []
+    for column in columns:
+        conditions.append(column.ilike(pattern))
+        conditions.append(literal(q).op("<%")(column))
+    rank = func.greatest(*(func.coalesce(func.word_similarity(q, column), 0) for column in columns))
+
+    query = (
+        select(Expediente)
+        .where(or_(*conditions))
+        .order_by(rank.desc(), Expediente.id.desc())
+        .limit(limit)
+    )
+    result = await db.execute(query)
+    return list(result.scalars().all())
+
+
+async def get_expediente_by_nro(db: AsyncSession, expediente_nro: str) -> Optional[Expediente]:
     """Obtiene un expediente específico por su número de expediente."""
-    return db.query(Expediente).filter(Expediente.expediente_nro == expediente_nro).first()
-
-
-def create_expediente(db: Session, expediente: ExpedienteCreate) -> Expediente:
-    """Crea un nuevo registro de expediente en la base de datos."""
-    # Crea una instancia del modelo SQLAlchemy incluyendo los nuevos campos
-    db_expediente = Expediente(
-        expediente_nro=expediente.expediente_nro,
-        usuario_id=expediente.usuario_id,
-        trabajado=expediente.trabajado,
-        # --- Añadir nuevos campos ---
-        oficio=expediente.oficio,
-        fecha_recibido=expediente.fecha_recibido,
-        juzgado=expediente.juzgado,
-        departamento=expediente.departamento
+    result = await db.execute(select(Expediente).where(Expediente.expediente_nro == expediente_nro))
+    return result.scalars().first()
+
+
+async def create_expediente(db: AsyncSession, expediente: ExpedienteCreate) -> Expediente:
+    """
+    Crea un nuevo registro de expediente en la base de datos. El INSERT ... RETURNING
+    devuelve la fila con sus valores por defecto (id, fecha_creacion) sin otro SELECT.
+    """
+    result = await db.execute(
+        insert(Expediente).values(**expediente.model_dump()).returning(Expediente)
     )
-    db.add(db_expediente)
-    db.commit()
-    db.refresh(db_expediente)
+    db_expediente = result.scalars().one()
+    await db.commit()
     return db_expediente
 
-def update_expediente(
-    db: Session,
-    db_obj: Expediente,
-    obj_in: ExpedienteUpdate # ExpedienteUpdate ya incluye los nuevos campos opcionales
-) -> Expediente:
-    """Actualiza un expediente existente en la base de datos."""
+# xmax = 0 solo en las filas recién insertadas (no en las actualizadas por ON CONFLICT)
+_WAS_INSERTED = literal_column("xmax = 0")
+
+def _upsert_statement(rows: List[Dict[str, Any]], columns: Sequence[str]):
+    """
+    INSERT ... ON CONFLICT (expediente_nro) DO UPDATE de las columnas indicadas, solo
+    si alguna cambia: una fila idéntica a la guardada no se reescribe ni cambia su
+    fecha_actualizacion (y no aparece en el RETURNING).
+    """
+    stmt = pg_insert(Expediente).values(rows)
+    update_columns = [column for column in columns if column != "expediente_nro"]
+    if not update_columns:
+        return stmt.on_conflict_do_nothing(index_elements=[Expediente.expediente_nro])
+    update_values = {column: stmt.excluded[column] for column in update_columns}
+    update_values["fecha_actualizacion"] = func.now()
+    changed = tuple_(*(Expediente.__table__.c[column] for column in update_columns)).is_distinct_from(
+        tuple_(*(stmt.excluded[column] for column in update_columns))
+    )
+    return stmt.on_conflict_do_update(index_elements=[Expediente.expediente_nro], set_=update_values, where=changed)
+
+async def upsert_expedientes(db: AsyncSession, rows: List[Dict[str, Any]]) -> Tuple[int, int, int]:
+    """
+    Inserta o actualiza (por expediente_nro) un grupo de expedientes con INSERT ... ON
+    CONFLICT de varias filas, sin hacer commit. En un conflicto solo se actualizan las
+    columnas presentes en la fila, así una importación sin 'trabajado' no lo reinicia.
+
+    Args:
+        db (AsyncSession): La sesión asíncrona de la base de datos.
+        rows (List[Dict[str, Any]]): Valores de cada expediente (expediente_nro sin repetir).
+
+    Returns:
+        Tuple[int, int, int]: Cantidad de expedientes insertados, actualizados y sin
+            cambios (ya coincidían con lo guardado).
+    """
+    # Un INSERT de varias filas necesita las mismas columnas en todas: se agrupan por columnas
+    groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = defaultdict(list)
+    for row in rows:
+        groups[tuple(sorted(row))].append(row)
+
+    inserted = updated = 0
+    for columns, group in groups.items():
+        # Orden fijo para que dos importaciones concurrentes no se bloqueen mutuamente
+        group.sort(key=lambda row: row["expediente_nro"])
+        result = await db.execute(_upsert_statement(group, columns).returning(_WAS_INSERTED))
+        for was_inserted in result.scalars().all():
+            if was_inserted:
+                inserted += 1
+            else:
+                updated += 1
+    # Las filas sin cambios no devuelven nada en el RETURNING
+    return inserted, updated, len(rows) - inserted - updated
+
+async def upsert_expediente(db: AsyncSession, values: Dict[str, Any]) -> Tuple[Expediente, bool]:
+    """
+    Inserta o actualiza (por expediente_nro) un expediente con un único INSERT ... ON
+    CONFLICT ... RETURNING. Al actualizar solo se modifican las columnas de `values`;
+    si ya coincidían, el expediente se lee tal como está.
+
+    Returns:
+        Tuple[Expediente, bool]: El expediente guardado y si fue creado (False si ya existía).
+    """
+    result = await db.execute(
+        _upsert_statement([values], tuple(values))
+        .returning(Expediente, _WAS_INSERTED)
+        .execution_options(populate_existing=True)
+    )
+    row = result.one_or_none()
+    await db.commit()
+    if row is None:
+        # Sin cambios: el RETURNING no devolvió la fila
+        existing = await db.execute(select(Expediente).where(Expediente.expediente_nro == values["expediente_nro"]))
+        return existing.scalar_one(), False
+    db_expediente, was_inserted = row
+    return db_expediente, bool(was_inserted)
+
+def expediente_version(db_expediente: Expediente) -> datetime:
+    """Versión de un expediente para el control de concurrencia: su última modificación."""
+    return db_expediente.fecha_actualizacion or db_expediente.fecha_creacion
+
+# La misma versión, como expresión SQL
+_VERSION = func.coalesce(Expediente.fecha_actualizacion, Expediente.fecha_creacion)
+
+
+async def update_expediente(
+    db: AsyncSession,
+    expediente_id: int,
+    obj_in: ExpedienteUpdate, # ExpedienteUpdate ya incluye los nuevos campos opcionales
+    expected_versions: Optional[Sequence[datetime]] = None
+) -> Optional[Expediente]:
+    """
+    Actualiza los campos informados de un expediente con un único UPDATE ... RETURNING.
+    Con `expected_versions` solo se actualiza si la versión actual es una de ellas
+    (concurrencia optimista), comprobado en el mismo UPDATE.
+
+    Returns:
+        Optional[Expediente]: El expediente actualizado, o None si no existe o si su
+            versión no coincide.
+    """
     # Convierte el esquema Pydantic a un diccionario, excluyendo valores no establecidos
     update_data = obj_in.model_dump(exclude_unset=True)
+    if not update_data:
+        db_expediente = await get_expediente(db, expediente_id=expediente_id)
+        if db_expediente is not None and expected_versions is not None and expediente_version(db_expediente) not in expected_versions:
+            return None
+        return db_expediente
+    return await _update_returning(db, expediente_id, update_data, expected_versions)
 
-    # Actualiza los campos del objeto SQLAlchemy existente
-    # Esto funcionará para los campos nuevos y viejos
-    for field, value in update_data.items():
-        setattr(db_obj, field, value)
-
-    db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
-    return db_obj
-
-def update_trabajado_status(db: Session, expediente_id: int, trabajado: bool) -> Optional[Expediente]:
-    """Actualiza únicamente el estado 'trabajado' de un expediente."""
-    db_expediente = get_expediente(db, expediente_id=expediente_id)
-    if not db_expediente:
-        return None
-
-    db_expediente.trabajado = trabajado
-    db.add(db_expediente)
-    db.commit()
-    db.refresh(db_expediente)
+async def update_trabajado_status(
+    db: AsyncSession,
+    expediente_id: int,
+    trabajado: bool,
+    expected_versions: Optional[Sequence[datetime]] = None
+) -> Optional[Expediente]:
+    """Actualiza únicamente el estado 'trabajado' de un expediente (None si no existe o su versión no coincide)."""
+    return await _update_returning(db, expediente_id, {"trabajado": trabajado}, expected_versions)
+
+async def _update_returning(
+    db: AsyncSession,
+    expediente_id: int,
+    values: Dict[str, Any],
+    expected_versions: Optional[Sequence[datetime]] = None
+) -> Optional[Expediente]:
+    """UPDATE ... RETURNING de un expediente: si no devuelve filas, el expediente no existe (o cambió)."""
+    stmt = update(Expediente).where(Expediente.id == expediente_id)
+    if expected_versions is not None:
+        stmt = stmt.where(_VERSION.in_(list(expected_versions)))
+    result = await db.execute(
+        stmt.values(**values).returning(Expediente).execution_options(populate_existing=True)
+    )
+    db_expediente = result.scalars().first()
+    await db.commit()
     return db_expediente
 
 
-def delete_expediente(db: Session, expediente_id: int) -> Optional[Expediente]:
-    """Elimina un expediente de la base de datos por su ID."""
-    db_expediente = get_expediente(db, expediente_id=expediente_id)
-    if not db_expediente:
-        return None
+async def update_trabajado_bulk(
+    db: AsyncSession,
+    trabajado: bool,
+    ids: Optional[Sequence[int]] = None,
+    filters: Optional[ExpedienteFilters] = None
+) -> Tuple[int, List[int]]:
+    """
+    Cambia el estado 'trabajado' de varios expedientes con un único UPDATE: los de
+    `ids` (WHERE id = ANY(:ids) RETURNING id) o, si no se indican, los que cumplen
+    `filters`.
 
-    db.delete(db_expediente)
-    db.commit()
-    return db_expediente
+    Returns:
+        Tuple[int, List[int]]: Cantidad de expedientes modificados y los IDs pedidos
+            que no existen (siempre vacío si se usan filtros).
+    """
+    stmt = update(Expediente).values(trabajado=trabajado).execution_options(synchronize_session=False)
+    if ids is not None:
+        requested = sorted(set(ids))
+        stmt = stmt.where(
+            Expediente.id == any_(bindparam("ids", requested, type_=postgresql.ARRAY(Integer)))
+        ).returning(Expediente.id)
+        result = await db.execute(stmt)
+        found = set(result.scalars().all())
+        await db.commit()
+        return len(found), [expediente_id for expediente_id in requested if expediente_id not in found]
+
+    result = await db.execute(_apply_filters(stmt, filters or ExpedienteFilters()))
+    await db.commit()
+    return result.rowcount, []
 
+
+async def delete_expediente(db: AsyncSession, expediente_id: int) -> bool:
+    """
+    Elimina un expediente de la base de datos por su ID con un único DELETE ... RETURNING.
+
+    Returns:
+        bool: True si se eliminó, False si no existía.
+    """
+    result = await db.execute(
+        delete(Expediente).where(Expediente.id == expediente_id).returning(Expediente.id)
+    )
+    deleted_id = result.scalars().first()
+    await db.commit()
+    return deleted_id is not None
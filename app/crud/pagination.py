@@ -0,0 +1,43 @@
+# app/crud/pagination.py
+import base64
+import json
+from datetime import date
+from typing import Any, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# --- Cursores Opacos para Paginación por Clave (keyset) ---
+# El cursor guarda los valores de la clave de orden de la última fila devuelta; la página
+# siguiente se pide con WHERE (clave) > (cursor), que usa el índice sin importar la profundidad.
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Codifica los valores de la clave de orden como un texto opaco (base64 URL-safe)."""
+    payload = [value.isoformat() if isinstance(value, date) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, length: int) -> List[Any]:
+    """
+    Decodifica un cursor generado por `encode_cursor`.
+
+    Raises:
+        ValueError: Si el cursor no es válido o no tiene `length` valores.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Cursor de paginación inválido.") from e
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError("Cursor de paginación inválido.")
+    return values
+
+
+def split_page(rows: Sequence[T], limit: int) -> Tuple[List[T], bool]:
+    """
+    Separa la página de la fila extra que se pide de más (limit + 1) para saber si hay
+    otra página sin contar filas. Devuelve (filas de la página, hay_más).
+    """
+    return list(rows[:limit]), len(rows) > limit
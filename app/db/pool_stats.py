@@ -0,0 +1,91 @@
+# app/db/pool_stats.py
+import os
+import time
+from typing import Any, Dict, Optional, Type
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool
+
+
+class PoolStats:
+    """
+    Contadores del pool de conexiones de un motor, en este proceso (worker).
+    Los tiempos se acumulan en segundos; el máximo se guarda aparte.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine: Optional[Engine] = None
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.connects = 0
+        self.connect_seconds_total = 0.0
+        self.connect_seconds_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def record_connect(self, seconds: float) -> None:
+        self.connects += 1
+        self.connect_seconds_total += seconds
+        self.connect_seconds_max = max(self.connect_seconds_max, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado actual del pool (ocupación) y contadores acumulados."""
+        pool = self.engine.pool if self.engine is not None else None
+        return {
+            "name": self.name,
+            "pid": os.getpid(),
+            "pool_size": pool.size() if pool is not None else None,
+            "checked_out": pool.checkedout() if pool is not None else None,
+            "checked_in": pool.checkedin() if pool is not None else None,
+            # Negativo mientras el pool no llegó a pool_size conexiones abiertas
+            "overflow": pool.overflow() if pool is not None else None,
+            "checkouts": self.checkouts,
+            "checkout_timeouts": self.checkout_timeouts,
+            "wait_avg_ms": round(1000 * self.wait_seconds_total / self.checkouts, 3) if self.checkouts else None,
+            "wait_max_ms": round(1000 * self.wait_seconds_max, 3),
+            "connects": self.connects,
+            "connect_avg_ms": round(1000 * self.connect_seconds_total / self.connects, 3) if self.connects else None,
+            "connect_max_ms": round(1000 * self.connect_seconds_max, 3),
+        }
+
+
+def instrumented_pool_class(base: Type[Pool], stats: PoolStats) -> Type[Pool]:
+    """
+    Subclase de `base` que mide cuánto espera cada checkout (incluye abrir una conexión
+    nueva si hace falta) y cuenta los que agotan pool_timeout. La subclase se conserva
+    cuando el motor recrea el pool (dispose).
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return base._do_get(self)
+        except PoolTimeoutError:
+            stats.checkout_timeouts += 1
+            raise
+        finally:
+            stats.record_wait(time.perf_counter() - started)
+
+    return type(f"Instrumented{base.__name__}", (base,), {"_do_get": _do_get})
+
+
+def instrument_engine(engine: Engine, stats: PoolStats) -> None:
+    """Asocia `stats` al motor y mide el tiempo de apertura de cada conexión nueva."""
+    stats.engine = engine
+
+    @event.listens_for(engine, "do_connect")
+    def _timed_connect(dialect, conn_rec, cargs, cparams):
+        started = time.perf_counter()
+        try:
+            # Devolver la conexión aquí reemplaza la apertura por defecto del dialecto
+            return dialect.connect(*cargs, **cparams)
+        finally:
+            stats.record_connect(time.perf_counter() - started)
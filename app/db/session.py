@@ -1,7 +1,14 @@
 # app/db/session.py
-from sqlalchemy import create_engine
+import os
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import settings # Importa la configuración con DATABASE_URL
+from app.db.pool_stats import PoolStats, instrument_engine, instrumented_pool_class
 
 # --- Obtener y Corregir la URL de la Base de Datos ---
 db_url_str = str(settings.DATABASE_URL)
@@ -14,15 +21,82 @@ if db_url_str.startswith("postgres://"):
 # --- Fin Corrección URL ---
 
 
+# --- Configuración del Pool de Conexiones ---
+# Cada worker de gunicorn tiene dos pools (motor síncrono y asíncrono), así que el máximo
+# de conexiones por worker es 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+_pool_kwargs: Dict[str, Any] = {
+    "pool_pre_ping": True, # Verifica las conexiones antes de usarlas
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+}
+
+sync_pool_stats = PoolStats("sync")
+async_pool_stats = PoolStats("async")
+
 # Crea el motor (engine) de SQLAlchemy usando la URL potencialmente corregida
-# pool_pre_ping=True verifica las conexiones antes de usarlas, lo cual es bueno
-engine = create_engine(db_url_str, pool_pre_ping=True)
+engine = create_engine(
+    db_url_str,
+    poolclass=instrumented_pool_class(QueuePool, sync_pool_stats),
+    **_pool_kwargs,
+)
+instrument_engine(engine, sync_pool_stats)
 
 # Crea una fábrica de sesiones (SessionLocal) configurada
 # autocommit=False y autoflush=False son configuraciones estándar para FastAPI
 # Se prefiere manejar las transacciones explícitamente (commit/rollback)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# --- Motor Asíncrono (asyncpg) ---
+# Los routers de expedientes y logs usan sesiones asíncronas: una consulta en curso no
+# ocupa un hilo del threadpool, así la concurrencia depende de las conexiones y no de los hilos.
+def _to_async_url(url_str: str) -> str:
+    """Convierte la URL de psycopg2 al driver asyncpg (y 'sslmode' al parámetro 'ssl' de asyncpg)."""
+    url = make_url(url_str).set(drivername="postgresql+asyncpg")
+    if "sslmode" in url.query:
+        url = url.update_query_dict({"ssl": url.query["sslmode"]}).difference_update_query(["sslmode"])
+    return url.render_as_string(hide_password=False)
+
+async_engine = create_async_engine(
+    _to_async_url(db_url_str),
+    poolclass=instrumented_pool_class(AsyncAdaptedQueuePool, async_pool_stats),
+    **_pool_kwargs,
+)
+instrument_engine(async_engine.sync_engine, async_pool_stats)
+
+# expire_on_commit=False: tras el commit los objetos siguen legibles sin otra consulta
+# (en modo asíncrono no se pueden recargar atributos de forma implícita)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+# --- Seguridad ante fork (gunicorn --preload) ---
+def _reset_pools_after_fork() -> None:
+    """
+    Con --preload los motores se crean en el proceso maestro antes del fork. Cada worker
+    descarta el pool heredado sin cerrar sus conexiones (close=False), que siguen siendo
+    del maestro, y abre las suyas propias.
+    """
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+
+os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
+def pool_status() -> Dict[str, Any]:
+    """Ocupación y tiempos de los pools de este worker, más la configuración que los acota."""
+    return {
+        "pid": os.getpid(),
+        "settings": {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "max_connections_per_worker": 2 * (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW),
+        },
+        "pools": [sync_pool_stats.snapshot(), async_pool_stats.snapshot()],
+    }
+
 # Función para obtener una sesión de base de datos (dependencia para FastAPI)
 def get_db():
     """
@@ -35,3 +109,41 @@ def get_db():
     finally:
         db.close() # Cierra la sesión al terminar la solicitud
 
+
+async def get_async_db():
+    """
+    Generador de dependencia que proporciona una sesión asíncrona de base de datos
+    por cada solicitud y la cierra automáticamente al finalizar.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def warm_up_pool(connections: int) -> None:
+    """
+    Abre `connections` conexiones del pool a la vez y las devuelve al pool, para que
+    las primeras solicitudes tras un arranque no paguen el costo de conectarse.
+    """
+    opened = []
+    try:
+        for _ in range(connections):
+            connection = engine.connect()
+            opened.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in opened:
+            connection.close() # Vuelve al pool, no se cierra realmente
+
+async def warm_up_async_pool(connections: int) -> None:
+    """
+    Lo mismo que warm_up_pool para el pool del motor asíncrono, que es el que usan
+    los routers de expedientes y logs.
+    """
+    opened = []
+    try:
+        for _ in range(connections):
+            connection = await async_engine.connect()
+            opened.append(connection)
+            await connection.execute(text("SELECT 1"))
+    finally:
+        for connection in opened:
+            await connection.close() # Vuelve al pool, no se cierra realmente
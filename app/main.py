@@ -1,16 +1,51 @@
 # app/main.py
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 # Importa los routers
 from app.routers import analysis, expedientes, logs # Añade el nuevo router de expedientes
 from app.core.config import settings
+from app.db.session import async_engine, pool_status
+from app.services.access_log_partitions import start_partition_maintenance, stop_partition_maintenance
+from app.services.access_log_writer import start_access_log_writer, stop_access_log_writer
+from app.services.job_worker import start_job_workers, stop_job_workers
+from app.services.upload_service import limit_upload_size_middleware
+from app.services.warmup import warm_up, warm_up_until_ready, is_ready, readiness_report
+
+# --- Ciclo de Vida de la Aplicación ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Se ejecuta una vez por worker: al arrancar precalienta el worker (cliente de Gemini,
+    pool de conexiones, prompt y tabla de juzgados) e inicia los consumidores de la
+    cola de análisis, el escritor de logs de acceso y el mantenimiento de sus particiones;
+    al apagar los detiene, escribiendo antes los logs que queden en memoria.
+    """
+    warmup_task = None
+    if not await warm_up():
+        # Si algo falló (ej. la base de datos aún no responde), se reintenta en segundo plano;
+        # mientras tanto /health/ready responde 503
+        warmup_task = asyncio.create_task(warm_up_until_ready())
+    start_job_workers()
+    start_partition_maintenance()
+    start_access_log_writer()
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+    await stop_job_workers()
+    await stop_access_log_writer()
+    await stop_partition_maintenance()
+    await async_engine.dispose() # Cierra las conexiones asyncpg dentro del event loop
 
 # Crea la instancia principal de la aplicación FastAPI
 app = FastAPI(
     title="API de Análisis y Gestión de Oficios",
     description="API para analizar oficios judiciales PDF y gestionar expedientes asociados.",
     version="0.2.0", # Incrementamos versión
+    lifespan=lifespan,
 )
 
 # --- Configuración de CORS ---
@@ -22,9 +57,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"], # ETag para If-Match; X-Next-Cursor para paginar los logs de acceso
 )
 # --- Fin de Configuración de CORS ---
 
+# Rechaza con 413 las subidas (PDFs e importaciones) demasiado grandes antes de leer el cuerpo
+app.middleware("http")(limit_upload_size_middleware)
+
 
 # --- Incluir Routers ---
 app.include_router(analysis.router, prefix="/api/v1")
@@ -39,6 +78,23 @@ async def read_root():
     """
     return {"message": "Bienvenido a la API de Análisis y Gestión de Oficios"}
 
+# --- Endpoint de Preparación ---
+@app.get("/health/ready", tags=["Root"], summary="Verifica si el worker está listo para recibir tráfico")
+async def read_readiness():
+    """
+    Devuelve 200 cuando el worker terminó de precalentarse y 503 mientras no lo haya hecho.
+    """
+    return JSONResponse(status_code=200 if is_ready() else 503, content=readiness_report())
+
+# --- Endpoint de Estado del Pool ---
+@app.get("/health/pool", tags=["Root"], summary="Estado de los pools de conexiones de este worker")
+async def read_pool_status():
+    """
+    Conexiones en uso, overflow, tiempos de espera y de conexión de los pools del worker
+    que atiende la solicitud (cada worker de gunicorn tiene los suyos).
+    """
+    return pool_status()
+
 # Nota: Aún no hemos creado las tablas en la base de datos.
 # El siguiente paso será usar Alembic para eso.
 
@@ -1,5 +1,5 @@
 # app/models/access_log.py
-from sqlalchemy import Column, Integer, String, DateTime, Text, func
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, func
 from sqlalchemy.dialects.postgresql import JSONB # Para el campo 'details' si quieres usar JSON nativo de PG
 from app.db.base_class import Base
 
@@ -7,13 +7,20 @@ class AccessLog(Base):
     """
     Modelo SQLAlchemy para la tabla 'access_logs'.
     Registra eventos de acceso o acciones en la aplicación.
+
+    La tabla está particionada por mes sobre `timestamp` (access_logs_pAAAA_MM); las
+    particiones las crea y elimina app/services/access_log_partitions.py. Un evento de un
+    mes sin partición va a access_logs_default, que el mantenimiento vacía.
     """
     __tablename__ = "access_logs"
 
-    id = Column(Integer, primary_key=True, index=True, comment="Identificador único del registro de acceso")
-    timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True, comment="Fecha y hora del evento")
+    id = Column(Integer, primary_key=True, comment="Identificador único del registro de acceso")
+    # Forma parte de la clave primaria porque es la columna de partición.
+    # Indexado junto con id en ix_access_logs_timestamp_id (orden de la paginación por cursor)
+    timestamp = Column(DateTime(timezone=True), primary_key=True, server_default=func.now(), nullable=False, comment="Fecha y hora del evento")
     ip_address = Column(String(45), nullable=True, comment="Dirección IP del cliente que generó el evento") # IPv4 e IPv6
-    action_description = Column(String, nullable=False, index=True, comment="Descripción de la acción o evento registrado")
+    # Indexado con trigramas (ix_access_logs_action_description_trgm) para búsquedas parciales
+    action_description = Column(String, nullable=False, comment="Descripción de la acción o evento registrado")
     # user_identifier puede ser un email, ID de usuario, o un identificador de sesión.
     # Lo dejamos como String para flexibilidad.
     user_identifier = Column(String, nullable=True, index=True, comment="Identificador del usuario (si está disponible)")
@@ -24,5 +31,14 @@ class AccessLog(Base):
     # Alternativa para details si no quieres usar JSONB:
     # details = Column(Text, nullable=True, comment="Detalles adicionales sobre el evento")
 
+    __table_args__ = (
+        # Paginación por cursor: ORDER BY timestamp DESC, id DESC con WHERE (timestamp, id) < (...)
+        Index("ix_access_logs_timestamp_id", "timestamp", "id"),
+        # Filtro parcial por descripción (ILIKE '%...%') y por contenido de details (@>)
+        Index("ix_access_logs_action_description_trgm", "action_description", postgresql_using="gin", postgresql_ops={"action_description": "gin_trgm_ops"}),
+        Index("ix_access_logs_details", "details", postgresql_using="gin", postgresql_ops={"details": "jsonb_path_ops"}),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
     def __repr__(self):
         return f"<AccessLog(id={self.id}, action='{self.action_description}', ip='{self.ip_address}')>"
\ No newline at end of file
@@ -0,0 +1,25 @@
+# app/models/access_log_rollup.py
+from sqlalchemy import Column, Integer, String, DateTime, PrimaryKeyConstraint
+from app.db.base_class import Base
+
+class AccessLogRollup(Base):
+    """
+    Modelo SQLAlchemy para la tabla 'access_log_rollups'.
+    Cantidad de eventos de access_logs por hora (UTC), acción y usuario. Se actualiza
+    en la misma transacción que inserta los eventos, así que los paneles de uso no
+    necesitan recorrer access_logs.
+    """
+    __tablename__ = "access_log_rollups"
+    __table_args__ = (
+        # Empieza por la hora: las consultas de estadísticas siempre filtran por rango de tiempo
+        PrimaryKeyConstraint("bucket", "action_description", "user_identifier", name="pk_access_log_rollups"),
+    )
+
+    bucket = Column(DateTime(timezone=True), nullable=False, comment="Inicio de la hora (UTC) agregada")
+    action_description = Column(String, nullable=False, comment="Descripción de la acción o evento registrado")
+    # '' cuando el evento no tiene usuario: un NULL no coincidiría en ON CONFLICT
+    user_identifier = Column(String, nullable=False, server_default="", comment="Identificador del usuario ('' si no está disponible)")
+    event_count = Column(Integer, nullable=False, comment="Cantidad de eventos en la hora")
+
+    def __repr__(self):
+        return f"<AccessLogRollup(bucket={self.bucket}, action='{self.action_description}', count={self.event_count})>"
@@ -0,0 +1,27 @@
+# app/models/analysis_cache.py
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint, func
+from sqlalchemy.dialects.postgresql import JSONB
+from app.db.base_class import Base
+
+class AnalysisCache(Base):
+    """
+    Modelo SQLAlchemy para la tabla 'analysis_cache'.
+    Guarda el resultado validado de un análisis, direccionado por el contenido del PDF,
+    la versión del prompt y el modelo utilizado.
+    """
+    __tablename__ = "analysis_cache"
+    __table_args__ = (
+        # Un mismo PDF puede tener varias entradas (una por versión de prompt/modelo)
+        UniqueConstraint("pdf_sha256", "prompt_hash", "model_name", name="uq_analysis_cache_clave"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True, comment="Identificador único de la entrada de caché")
+    pdf_sha256 = Column(String(64), nullable=False, index=True, comment="SHA-256 (hex) del contenido del PDF")
+    prompt_hash = Column(String(64), nullable=False, comment="SHA-256 (hex) del prompt del sistema usado")
+    model_name = Column(String, nullable=False, comment="Nombre del modelo de IA usado")
+    result = Column(JSONB, nullable=False, comment="AnalysisResponse validado, en formato JSON")
+    hit_count = Column(Integer, nullable=False, server_default="0", comment="Veces que la entrada fue reutilizada")
+    fecha_creacion = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, comment="Fecha y hora de creación de la entrada")
+
+    def __repr__(self):
+        return f"<AnalysisCache(id={self.id}, pdf='{self.pdf_sha256[:12]}', model='{self.model_name}')>"
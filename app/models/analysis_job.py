@@ -0,0 +1,40 @@
+# app/models/analysis_job.py
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, Text, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from app.db.base_class import Base
+
+# --- Estados posibles de un trabajo de análisis ---
+JOB_STATUS_PENDING = "pending"   # En cola, esperando a un worker
+JOB_STATUS_RUNNING = "running"   # Reclamado por un worker (hasta locked_until)
+JOB_STATUS_DONE = "done"         # Terminado con éxito, 'result' contiene el análisis
+JOB_STATUS_DEAD = "dead"         # Falló definitivamente (reintentos agotados o error no recuperable)
+
+class AnalysisJob(Base):
+    """
+    Modelo SQLAlchemy para la tabla 'analysis_jobs'.
+    Cola persistente de análisis de PDF compartida por todos los workers de gunicorn.
+    """
+    __tablename__ = "analysis_jobs"
+    __table_args__ = (
+        # Índice parcial para que reclamar el siguiente trabajo no recorra los ya terminados
+        Index(
+            "ix_analysis_jobs_reclamables", "available_at", "id",
+            postgresql_where=text("status IN ('pending', 'running')"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True, comment="Identificador único del trabajo")
+    status = Column(String(16), nullable=False, server_default=JOB_STATUS_PENDING, comment="Estado del trabajo: pending, running, done o dead")
+    filename = Column(String, nullable=True, comment="Nombre original del archivo subido")
+    pdf_content = Column(LargeBinary, nullable=True, comment="Contenido del PDF (se borra al terminar con éxito)")
+    attempts = Column(Integer, nullable=False, server_default="0", comment="Intentos realizados hasta ahora")
+    max_attempts = Column(Integer, nullable=False, comment="Intentos permitidos antes de pasar a 'dead'")
+    available_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, comment="Momento a partir del cual el trabajo puede reclamarse (backoff entre reintentos)")
+    locked_until = Column(DateTime(timezone=True), nullable=True, comment="Fin del tiempo de visibilidad del worker que lo reclamó")
+    last_error = Column(Text, nullable=True, comment="Último error registrado")
+    result = Column(JSONB, nullable=True, comment="AnalysisResponse validado, en formato JSON")
+    fecha_creacion = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, comment="Fecha y hora de creación del trabajo")
+    fecha_actualizacion = Column(DateTime(timezone=True), onupdate=func.now(), comment="Fecha y hora de la última actualización")
+
+    def __repr__(self):
+        return f"<AnalysisJob(id={self.id}, status='{self.status}', attempts={self.attempts})>"
@@ -1,5 +1,5 @@
 # app/models/expediente.py
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, func, ForeignKey # Importa Date
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Index, func, ForeignKey # Importa Date
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 
@@ -11,9 +11,11 @@ class Expediente(Base):
 
     # Columnas existentes
     id = Column(Integer, primary_key=True, index=True, comment="Identificador único del expediente")
-    expediente_nro = Column(String, index=True, nullable=False, comment="Número o identificador del expediente (ej. IUE)")
+    # Único: la importación masiva y el alta desde PDF hacen upsert por este campo
+    expediente_nro = Column(String, index=True, unique=True, nullable=False, comment="Número o identificador del expediente (ej. IUE)")
     # Cuando tengas el modelo User, añadirás: ForeignKey("users.id")
-    usuario_id = Column(Integer, nullable=True, index=True, comment="ID del usuario asociado (opcional por ahora)")
+    # Indexado junto con trabajado en ix_expedientes_usuario_id_trabajado
+    usuario_id = Column(Integer, nullable=True, comment="ID del usuario asociado (opcional por ahora)")
     # usuario_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True, comment="ID del usuario asociado (opcional por ahora)") # Añadido ForeignKey y ondelete
     trabajado = Column(Boolean, default=False, nullable=False, comment="Indica si el expediente ha sido trabajado (True) o no (False)")
     fecha_creacion = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, comment="Fecha y hora de creación del registro (automática)")
@@ -27,6 +29,22 @@ class Expediente(Base):
     # --- Fin Nuevas Columnas ---
 
 
+    # --- Índices para los filtros y la búsqueda de expedientes ---
+    __table_args__ = (
+        Index("ix_expedientes_trabajado_fecha_recibido", "trabajado", "fecha_recibido"),
+        Index("ix_expedientes_usuario_id_trabajado", "usuario_id", "trabajado"),
+        Index("ix_expedientes_departamento_trabajado", "departamento", "trabajado"),
+        Index("ix_expedientes_juzgado_trabajado", "juzgado", "trabajado"),
+        # Paginación por cursor ordenando por fecha (GET /expedientes/?sort=...); expediente_nro
+        # usa su índice único y id la clave primaria
+        Index("ix_expedientes_fecha_recibido_id", "fecha_recibido", "id"),
+        Index("ix_expedientes_fecha_creacion_id", "fecha_creacion", "id"),
+        # Búsqueda aproximada (GET /expedientes/search) con pg_trgm
+        Index("ix_expedientes_expediente_nro_trgm", "expediente_nro", postgresql_using="gin", postgresql_ops={"expediente_nro": "gin_trgm_ops"}),
+        Index("ix_expedientes_oficio_trgm", "oficio", postgresql_using="gin", postgresql_ops={"oficio": "gin_trgm_ops"}),
+        Index("ix_expedientes_juzgado_trgm", "juzgado", postgresql_using="gin", postgresql_ops={"juzgado": "gin_trgm_ops"}),
+    )
+
     # --- Relaciones (Ejemplo futuro con User) ---
     # owner = relationship("User", back_populates="expedientes") # Descomentar cuando exista User
     # Asegúrate de añadir la relación inversa "expedientes = relationship('Expediente', back_populates='owner')" en el modelo User.
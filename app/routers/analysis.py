@@ -1,9 +1,19 @@
 # app/routers/analysis.py
-from fastapi import APIRouter, File, UploadFile, HTTPException, status, Depends
-from typing import Annotated # Usar Annotated para Depends y otros metadatos
+import json
+import zipfile
+from fastapi import APIRouter, File, UploadFile, HTTPException, status, Depends, Response, Query, Path
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Annotated, Any, Dict, List, Tuple, AsyncIterator # Usar Annotated para Depends y otros metadatos
 
+from app.db.session import get_db
 from app.schemas.analysis import AnalysisResponse
-from app.services.analysis_service import analyze_pdf_document
+from app.schemas.analysis_job import AnalysisJob, AnalysisJobCreated
+from app.core.config import settings
+from app.services.analysis_service import analyze_pdf_document, analyze_pdf_batch, PROMPT_HASH, gemini_caller
+from app.services.upload_service import spool_upload, spool_zip_member, SpooledUpload
+from app.crud import crud_analysis_cache, crud_analysis_job
 
 # Crea una instancia de APIRouter. Todas las rutas definidas aquí
 # tendrán el prefijo que se configure en main.py (ej. /api/v1)
@@ -21,9 +31,11 @@ router = APIRouter(
     status_code=status.HTTP_200_OK # Código de estado para respuesta exitosa
 )
 async def analyze_pdf_endpoint(
+    response: Response, # Para añadir cabeceras con metadatos del análisis
     # Define el parámetro 'file' que espera un archivo subido.
     # File(...) indica que es un campo obligatorio.
-    file: UploadFile = File(..., description="Archivo PDF (oficio judicial) a analizar.")
+    file: UploadFile = File(..., description="Archivo PDF (oficio judicial) a analizar."),
+    db: Session = Depends(get_db) # Sesión usada por la caché de análisis
 ):
     """
     Endpoint para recibir y procesar un archivo PDF.
@@ -31,6 +43,9 @@ async def analyze_pdf_endpoint(
     - Valida que el archivo sea de tipo 'application/pdf'.
     - Delega el procesamiento al servicio `analyze_pdf_document`.
     - Devuelve la respuesta estructurada o un error HTTP.
+    - La cabecera `X-Analysis-Cache` indica si el resultado vino de la caché (HIT) o no (MISS).
+    - La cabecera `X-Analysis-Input-Mode` indica si se envió a la IA solo el texto del PDF (text)
+      o el archivo completo (pdf).
     """
     # 1. Validación del tipo de archivo
     if file.content_type != "application/pdf":
@@ -46,7 +61,8 @@ async def analyze_pdf_endpoint(
     # El servicio se encargará de la lógica principal, incluyendo la simulación de Gemini.
     # El manejo de excepciones dentro del servicio devolverá HTTPException si algo falla.
     try:
-        analysis_result = await analyze_pdf_document(pdf_file=file)
+        analysis_result, metadata = await analyze_pdf_document(pdf_file=file, db=db)
+        _set_metadata_headers(response, metadata)
         # Si el servicio se completa correctamente, devuelve el resultado.
         # FastAPI se encargará de serializar el objeto AnalysisResponse a JSON.
         return analysis_result
@@ -61,4 +77,224 @@ async def analyze_pdf_endpoint(
             detail=f"Ocurrió un error interno inesperado en el servidor: {e}"
         )
 
+# --- Endpoint de Análisis por Lotes ---
+@router.post(
+    "/analyze-pdf/batch",
+    response_class=StreamingResponse,
+    summary="Analiza un lote de oficios PDF",
+    description="Recibe varios archivos PDF (o un único ZIP con PDFs) y los analiza en paralelo. "
+                "La respuesta es NDJSON (application/x-ndjson): una línea por archivo con "
+                "`filename`, `status` (ok/error) y `result` o `error`, enviada en cuanto ese archivo termina."
+)
+async def analyze_pdf_batch_endpoint(
+    files: List[UploadFile] = File(..., description="Archivos PDF a analizar, o un único archivo ZIP que los contenga.")
+):
+    """
+    Endpoint para analizar oficios en lote.
+
+    - Acepta varios PDFs o un ZIP (se analizan los .pdf que contenga).
+    - Los archivos que no son PDF se informan como error sin detener el lote.
+    - Los resultados se transmiten en orden de finalización, no de subida.
+    """
+    documents, rejected = await _collect_batch_documents(files)
+    if not documents and not rejected:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El lote no contiene archivos PDF."
+        )
+    print(f"Lote recibido: {len(documents)} PDFs válidos, {len(rejected)} rechazados.")
+
+    async def ndjson_lines() -> AsyncIterator[str]:
+        # Los archivos rechazados se informan primero, ya que no requieren análisis
+        for filename, reason in rejected:
+            yield json.dumps({"filename": filename, "status": "error", "status_code": 400, "error": reason}, ensure_ascii=False) + "\n"
+        async for line in analyze_pdf_batch(documents):
+            yield line
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+# --- Endpoints de Análisis Asíncrono (Cola de Trabajos) ---
+@router.post(
+    "/analyze-pdf/jobs",
+    response_model=AnalysisJobCreated,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Encola el análisis de un oficio PDF",
+    description="Guarda el PDF en la cola de trabajos y devuelve un ID inmediatamente. "
+                "El análisis lo realiza en segundo plano cualquiera de los workers; "
+                "el resultado se consulta con `GET /analyze-pdf/jobs/{job_id}`."
+)
+async def create_analysis_job(
+    file: UploadFile = File(..., description="Archivo PDF (oficio judicial) a analizar."),
+    db: Session = Depends(get_db)
+) -> AnalysisJobCreated:
+    """
+    Encola un análisis y responde sin esperar a Gemini.
+    """
+    if file.content_type != "application/pdf":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Tipo de archivo no válido: '{file.content_type}'. Solo se aceptan archivos PDF (application/pdf)."
+        )
+    # Lectura acotada: un archivo demasiado grande se rechaza con 413 antes de leerlo entero
+    upload = await spool_upload(file)
+    try:
+        pdf_content = await run_in_threadpool(upload.read_bytes)
+    finally:
+        upload.close()
+
+    job = await run_in_threadpool(
+        crud_analysis_job.create_job, db,
+        filename=file.filename, pdf_content=pdf_content,
+        max_attempts=settings.ANALYSIS_JOB_MAX_ATTEMPTS
+    )
+    print(f"Trabajo de análisis {job.id} encolado para '{file.filename}'.")
+    return job
+
+@router.get(
+    "/analyze-pdf/jobs/{job_id}",
+    response_model=AnalysisJob,
+    summary="Consulta un trabajo de análisis",
+    description="Devuelve el estado del trabajo y, si terminó, el resultado del análisis."
+)
+def read_analysis_job(
+    job_id: int = Path(..., description="ID del trabajo de análisis", gt=0),
+    db: Session = Depends(get_db)
+) -> AnalysisJob:
+    """
+    Obtiene el estado y resultado de un trabajo de análisis.
+    """
+    job = crud_analysis_job.get_job(db, job_id=job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Trabajo de análisis con ID {job_id} no encontrado"
+        )
+    return job
+
+# --- Endpoint de Administración de la Caché ---
+@router.delete(
+    "/analyze-pdf/cache",
+    summary="Purgar la caché de análisis",
+    description="Elimina los resultados de análisis guardados en caché. Con `only_stale=true` "
+                "solo se eliminan las entradas generadas con una versión anterior del prompt."
+)
+def purge_analysis_cache(
+    only_stale: bool = Query(False, description="Eliminar solo entradas de versiones anteriores del prompt"),
+    db: Session = Depends(get_db)
+) -> Dict[str, int]:
+    """
+    Purga la caché de análisis y devuelve el número de entradas eliminadas.
+    """
+    deleted = crud_analysis_cache.purge_cache(db, keep_prompt_hash=PROMPT_HASH if only_stale else None)
+    print(f"Caché de análisis purgada: {deleted} entradas eliminadas.")
+    return {"deleted": deleted}
+
+# --- Endpoint de Métricas de Resiliencia ---
+@router.get(
+    "/analyze-pdf/resilience",
+    summary="Estado de la capa de resiliencia de Gemini",
+    description="Devuelve el estado del disyuntor, los contadores de intentos, reintentos, timeouts "
+                "y solicitudes cubiertas, y las latencias p50/p95/p99 observadas por este worker."
+)
+async def read_resilience_stats() -> Dict[str, Any]:
+    """
+    Métricas de resiliencia del worker que atiende la solicitud.
+    """
+    return gemini_caller.stats()
+
+# --- Funciones Auxiliares ---
+
+def _set_metadata_headers(response: Response, metadata: Dict[str, str]) -> None:
+    """Expone los metadatos del análisis como cabeceras HTTP (ej. cache -> X-Analysis-Cache)."""
+    for key, value in metadata.items():
+        response.headers[f"X-Analysis-{key.replace('_', '-').title()}"] = value
+
+def _is_zip_upload(file: UploadFile) -> bool:
+    """Indica si el archivo subido es un ZIP (por tipo MIME o extensión)."""
+    return (
+        file.content_type in ("application/zip", "application/x-zip-compressed")
+        or (file.filename or "").lower().endswith(".zip")
+    )
+
+async def _collect_batch_documents(
+    files: List[UploadFile]
+) -> Tuple[List[Tuple[str, SpooledUpload]], List[Tuple[str, str]]]:
+    """
+    Lee los archivos de un lote (expandiendo un ZIP si se envía uno) antes de empezar a
+    transmitir la respuesta. Cada PDF se copia por bloques a un archivo temporal con
+    tamaño acotado, así el lote completo no queda en memoria.
+
+    Returns:
+        Tuple: (documentos válidos como (nombre, SpooledUpload), rechazados como (nombre, motivo)).
+    """
+    documents: List[Tuple[str, SpooledUpload]] = []
+    rejected: List[Tuple[str, str]] = []
+    try:
+        for file in files:
+            filename = file.filename or "sin_nombre"
+            if _is_zip_upload(file):
+                zip_upload = await spool_upload(file, max_bytes=settings.ANALYSIS_BATCH_MAX_BYTES)
+                try:
+                    # El ZIP solo puede aportar los documentos que aún caben en el lote
+                    remaining = settings.ANALYSIS_BATCH_MAX_FILES - len(documents) - len(rejected)
+                    documents_in_zip, rejected_in_zip = await run_in_threadpool(_expand_zip, zip_upload, remaining)
+                    documents.extend(documents_in_zip)
+                    rejected.extend(rejected_in_zip)
+                except zipfile.BadZipFile:
+                    rejected.append((filename, "El archivo ZIP está dañado o no es un ZIP válido."))
+                finally:
+                    zip_upload.close()
+            elif file.content_type != "application/pdf":
+                await file.close()
+                rejected.append((filename, f"Tipo de archivo no válido: '{file.content_type}'. Solo se aceptan archivos PDF (application/pdf)."))
+            else:
+                try:
+                    documents.append((filename, await spool_upload(file)))
+                except HTTPException as http_exc:
+                    rejected.append((filename, http_exc.detail))
+            if len(documents) + len(rejected) > settings.ANALYSIS_BATCH_MAX_FILES:
+                raise _batch_too_large()
+    except BaseException:
+        # Libera los temporales ya creados si el lote se rechaza (o falla) a mitad de camino
+        for _, upload in documents:
+            upload.close()
+        raise
+    return documents, rejected
+
+def _batch_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"El lote supera el máximo de {settings.ANALYSIS_BATCH_MAX_FILES} documentos."
+    )
+
+def _expand_zip(zip_upload: SpooledUpload, max_entries: int) -> Tuple[List[Tuple[str, SpooledUpload]], List[Tuple[str, str]]]:
+    """
+    Extrae los PDFs de un ZIP a archivos temporales acotados (función síncrona).
+    Se detiene con 400 en cuanto el ZIP supera `max_entries` documentos, sin extraer el resto.
+    """
+    documents: List[Tuple[str, SpooledUpload]] = []
+    rejected: List[Tuple[str, str]] = []
+    zip_upload.file.seek(0)
+    try:
+        with zipfile.ZipFile(zip_upload.file) as archive:
+            for member in archive.infolist():
+                # Ignora directorios y metadatos de macOS
+                if member.is_dir() or member.filename.startswith("__MACOSX/"):
+                    continue
+                # Se cuenta antes de extraer: un ZIP con miles de PDFs no llega a escribirse a disco
+                if len(documents) + len(rejected) >= max_entries:
+                    raise _batch_too_large()
+                if not member.filename.lower().endswith(".pdf"):
+                    rejected.append((member.filename, "El archivo dentro del ZIP no es un PDF."))
+                    continue
+                try:
+                    documents.append((member.filename, spool_zip_member(archive, member)))
+                except HTTPException as http_exc:
+                    rejected.append((member.filename, http_exc.detail))
+    except BaseException:
+        for _, upload in documents:
+            upload.close()
+        raise
+    return documents, rejected
+
 # Aquí podrían añadirse más endpoints relacionados con el análisis si fuera necesario.
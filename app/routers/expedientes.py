@@ -1,11 +1,24 @@
 # app/routers/expedientes.py
-from fastapi import APIRouter, Depends, HTTPException, status, Path, Query, Body
+import hashlib
+import re
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Query, Body, File, UploadFile, Header, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional, Any # Importa Any para el response de delete
+from typing import List, Optional, Any, Sequence # Importa Any para el response de delete
 
-from app.db.session import get_db # Dependencia para obtener la sesión DB
-from app.schemas.expediente import Expediente, ExpedienteCreate, ExpedienteUpdate # Esquemas Pydantic
+from app.db.session import get_async_db, get_db # Dependencias para obtener la sesión DB (asíncrona y síncrona)
+from app.models.expediente import Expediente as ExpedienteModel
+from app.schemas.expediente import ( # Esquemas Pydantic
+    Expediente, ExpedienteCreate, ExpedienteUpdate, ExpedienteList, ExpedienteFilters, ExpedienteBulkResult,
+    ExpedienteTrabajadoBulkUpdate, ExpedienteTrabajadoBulkResult, ExpedienteFromPdf
+)
 from app.crud import crud_expediente # Funciones CRUD
+from app.services.analysis_service import analyze_pdf_document
+from app.services.expediente_export import MEDIA_TYPES, export_expedientes
+from app.services.expediente_import import FORMAT_CSV, FORMAT_NDJSON, detect_format, import_expedientes
 
 # Crea un nuevo router para los endpoints de expedientes
 router = APIRouter(
@@ -14,53 +27,266 @@ router = APIRouter(
     responses={404: {"description": "Expediente no encontrado"}}, # Respuesta común
 )
 
+# --- ETags ---
+# El ETag de un expediente es '"<id>-<versión>"', con la versión (última modificación) en
+# microsegundos desde 1970: así un If-Match se puede comprobar dentro del propio UPDATE.
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ETAG_RE = re.compile(r'"(\d+)-(\d+)"')
+
+
+def _expediente_etag(db_expediente: ExpedienteModel) -> str:
+    version = crud_expediente.expediente_version(db_expediente)
+    return f'"{db_expediente.id}-{(version - _EPOCH) // timedelta(microseconds=1)}"'
+
+
+def _list_etag(expedientes: Sequence[ExpedienteModel], *parts: Any) -> str:
+    """ETag de una página: cambia si cambia cualquiera de sus expedientes, el total o el cursor."""
+    content = "|".join([_expediente_etag(expediente) for expediente in expedientes] + [str(part) for part in parts])
+    return f'"{hashlib.sha256(content.encode()).hexdigest()[:32]}"'
+
+
+def _none_match(if_none_match: Optional[str], etag: str) -> bool:
+    """True si el cliente ya tiene esta versión (If-None-Match, comparación débil)."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def _expected_versions(if_match: Optional[str], expediente_id: int) -> Optional[List[datetime]]:
+    """
+    Versiones aceptadas según If-Match (comparación fuerte), o None si no hay condición.
+    Los ETags débiles o de otro expediente no coinciden nunca.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versions = []
+    for tag in if_match.split(","):
+        match = _ETAG_RE.fullmatch(tag.strip())
+        if match and int(match.group(1)) == expediente_id:
+            versions.append(_EPOCH + timedelta(microseconds=int(match.group(2))))
+    return versions
+
+
+async def _raise_not_updated(db: AsyncSession, expediente_id: int, expected_versions: Optional[List[datetime]], detail: str) -> None:
+    """Un UPDATE condicional no devolvió filas: 412 si el expediente existe (cambió), 404 si no."""
+    if expected_versions is not None and await crud_expediente.get_expediente(db, expediente_id=expediente_id) is not None:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=f"El expediente con ID {expediente_id} fue modificado por otra persona; vuelva a cargarlo."
+        )
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+
 # --- Endpoint para Crear un Expediente ---
 @router.post(
     "/",
     response_model=Expediente, # El tipo de dato que devolverá (validado por Pydantic)
     status_code=status.HTTP_201_CREATED, # Código de estado para creación exitosa
     summary="Crear un nuevo expediente",
-    description="Crea un nuevo registro de expediente en la base de datos."
+    description="Crea un nuevo registro de expediente en la base de datos. El número de expediente es único: "
+                "si ya existe otro con el mismo número responde 409.",
+    responses={409: {"description": "Ya existe un expediente con ese número"}}
 )
-def create_new_expediente(
+async def create_new_expediente(
     *, # Fuerza a que los siguientes argumentos sean keyword-only
-    db: Session = Depends(get_db), # Inyecta la sesión de la DB
+    db: AsyncSession = Depends(get_async_db), # Inyecta la sesión de la DB
     expediente_in: ExpedienteCreate # Espera un cuerpo de solicitud que coincida con ExpedienteCreate
 ) -> Expediente:
     """
     Crea un nuevo expediente.
-    - Verifica si ya existe un expediente con el mismo número (opcional, descomentar si es necesario).
     - Llama a la función CRUD para crear el expediente.
+    - Si ya existe un expediente con el mismo número, lanza 409.
     """
-    # Opcional: Verificar si ya existe un expediente con ese número
-    # existing_expediente = crud_expediente.get_expediente_by_nro(db, expediente_nro=expediente_in.expediente_nro)
-    # if existing_expediente:
-    #     raise HTTPException(
-    #         status_code=status.HTTP_400_BAD_REQUEST,
-    #         detail=f"Ya existe un expediente con el número '{expediente_in.expediente_nro}'."
-    #     )
-
-    # Llama a la función CRUD para crear
-    created_expediente = crud_expediente.create_expediente(db=db, expediente=expediente_in)
+    # expediente_nro es único: un número repetido se detecta al insertar, sin consultar antes
+    try:
+        created_expediente = await crud_expediente.create_expediente(db=db, expediente=expediente_in)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Ya existe un expediente con el número '{expediente_in.expediente_nro}'."
+        )
     return created_expediente
 
+# --- Endpoint para Importar Expedientes de forma Masiva ---
+@router.post(
+    "/bulk",
+    response_model=ExpedienteBulkResult,
+    summary="Importar expedientes (CSV o NDJSON)",
+    description="Crea o actualiza (por `expediente_nro`) los expedientes de un archivo CSV con encabezados o NDJSON "
+                "(un objeto JSON por línea), con los campos de `ExpedienteCreate`. Se escribe por lotes; las filas "
+                "con error se informan en la respuesta sin detener la importación. Al actualizar solo se modifican "
+                "los campos presentes en la fila; las filas que no cambian nada no se reescriben (se cuentan en `unchanged`)."
+)
+async def bulk_import_expedientes(
+    file: UploadFile = File(..., description="Archivo .csv o .ndjson/.jsonl (UTF-8)"),
+    format: Optional[str] = Query(None, pattern=f"^({FORMAT_CSV}|{FORMAT_NDJSON})$", description="Formato del archivo; por defecto se deduce de la extensión"),
+    db: AsyncSession = Depends(get_async_db)
+) -> ExpedienteBulkResult:
+    """
+    Importa expedientes de forma masiva.
+    """
+    file_format = format or detect_format(file.filename, file.content_type)
+    try:
+        result = await import_expedientes(db, file.file, file_format)
+    finally:
+        await file.close()
+    print(f"Importación de expedientes ({file_format}): {result.received} filas, {result.inserted} insertadas, "
+          f"{result.updated} actualizadas, {result.unchanged} sin cambios, {result.failed} con error.")
+    return result
+
+# --- Endpoint para Analizar un Oficio y Guardar su Expediente ---
+@router.post(
+    "/from-pdf",
+    response_model=ExpedienteFromPdf,
+    summary="Analizar un oficio PDF y crear o actualizar su expediente",
+    description="Analiza el oficio (igual que `/analyze-pdf`) y, en la misma solicitud, crea el expediente con el IUE "
+                "extraído o, si ya existe, actualiza su oficio, juzgado y departamento. Responde 201 si lo creó y "
+                "200 si lo actualizó; 422 si el oficio no tiene un IUE reconocible."
+)
+async def create_expediente_from_pdf(
+    response: Response,
+    file: UploadFile = File(..., description="Archivo PDF (oficio judicial) a analizar."),
+    cache_db: Session = Depends(get_db), # Sesión usada por la caché de análisis
+    db: AsyncSession = Depends(get_async_db)
+) -> ExpedienteFromPdf:
+    """
+    Analiza un oficio y guarda su expediente (upsert por número de expediente).
+    - El número de expediente es "IUE <iue>", con el IUE extraído del oficio.
+    - Los datos que el análisis no encontró no pisan los que ya tenía el expediente.
+    """
+    if file.content_type != "application/pdf":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Tipo de archivo no válido: '{file.content_type}'. Solo se aceptan archivos PDF (application/pdf)."
+        )
+    analysis, _ = await analyze_pdf_document(pdf_file=file, db=cache_db)
+    if not analysis.iue:
+        # El análisis queda en caché: reintentar con /analyze-pdf no vuelve a llamar a la IA
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="No se encontró el IUE en el oficio; no se puede crear el expediente automáticamente."
+        )
+
+    values = {
+        "expediente_nro": f"IUE {analysis.iue}",
+        "oficio": analysis.numero_oficio,
+        "juzgado": analysis.nombre_juzgado,
+        "departamento": analysis.departamento_juzgado,
+    }
+    db_expediente, created = await crud_expediente.upsert_expediente(
+        db, {field: value for field, value in values.items() if value is not None}
+    )
+    print(f"DEBUG (Expedientes): expediente '{db_expediente.expediente_nro}' {'creado' if created else 'actualizado'} desde PDF.")
+    response.status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+    response.headers["ETag"] = _expediente_etag(db_expediente)
+    return ExpedienteFromPdf(analysis=analysis, expediente=Expediente.model_validate(db_expediente), created=created)
+
 # --- Endpoint para Obtener una Lista de Expedientes ---
 @router.get(
     "/",
-    response_model=List[Expediente], # Devuelve una lista de expedientes
+    response_model=ExpedienteList, # Devuelve una página de expedientes, el total y el cursor de la siguiente
     summary="Obtener lista de expedientes",
-    description="Obtiene una lista paginada de todos los expedientes registrados."
+    description="Obtiene una página de expedientes filtrada y ordenada en la base de datos, con el total de los que cumplen "
+                "los filtros. Para la página siguiente, envíe el `next_cursor` recibido como `cursor` (con los mismos filtros y orden)."
 )
-def read_expedientes(
-    db: Session = Depends(get_db),
-    skip: int = Query(0, ge=0, description="Número de registros a saltar (paginación)"),
-    limit: int = Query(100, ge=1, le=200, description="Número máximo de registros a devolver (máx 200)")
+async def read_expedientes(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    filters: ExpedienteFilters = Depends(), # Filtros como parámetros de consulta
+    sort: str = Query("id", description=f"Campo de orden; '-' adelante para descendente. Opciones: {', '.join(crud_expediente.SORT_OPTIONS)}"),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto en `next_cursor` por la página anterior"),
+    skip: int = Query(0, ge=0, deprecated=True, description="Número de registros a saltar (obsoleto: use `cursor`; se ignora si hay cursor)"),
+    limit: int = Query(100, ge=1, le=200, description="Número máximo de registros a devolver (máx 200)"),
+    if_none_match: Optional[str] = Header(None, description="ETag de la página que ya tiene el cliente")
+) -> ExpedienteList:
+    """
+    Obtiene una página de expedientes con filtros, orden, total y paginación por cursor.
+    Si la página no cambió desde el ETag de If-None-Match, responde 304 sin cuerpo.
+    """
+    try:
+        expedientes, next_cursor = await crud_expediente.get_expedientes(
+            db, skip=skip, limit=limit, cursor=cursor, sort=sort, filters=filters
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    total, total_is_estimate = await crud_expediente.count_expedientes(db, filters=filters)
+    etag = _list_etag(expedientes, total, total_is_estimate, next_cursor)
+    if _none_match(if_none_match, etag):
+        return _not_modified(etag)
+    response.headers["ETag"] = etag
+    return ExpedienteList(
+        expedientes=[Expediente.model_validate(expediente) for expediente in expedientes],
+        total=total,
+        total_is_estimate=total_is_estimate,
+        next_cursor=next_cursor
+    )
+
+# --- Endpoint para Exportar Expedientes ---
+# Debe declararse antes de "/{expediente_id}" para que "export" no se tome como un ID
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    summary="Exportar expedientes (CSV o NDJSON)",
+    description="Descarga todos los expedientes que cumplen los filtros (los mismos del listado), ordenados por ID. "
+                "Las filas se envían a medida que se leen de la base de datos, sin límite de cantidad."
+)
+async def export_expedientes_file(
+    filters: ExpedienteFilters = Depends(), # Filtros como parámetros de consulta
+    format: str = Query(FORMAT_CSV, pattern=f"^({FORMAT_CSV}|{FORMAT_NDJSON})$", description="Formato del archivo")
+) -> StreamingResponse:
+    """
+    Exporta expedientes leyendo con un cursor del servidor y escribiendo por partes.
+    """
+    return StreamingResponse(
+        export_expedientes(filters, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="expedientes.{format}"'}
+    )
+
+# --- Endpoint para Buscar Expedientes ---
+# Debe declararse antes de "/{expediente_id}" para que "search" no se tome como un ID
+@router.get(
+    "/search",
+    response_model=List[Expediente],
+    summary="Buscar expedientes",
+    description="Búsqueda aproximada por número de expediente (IUE), oficio o juzgado, tolerante a diferencias de "
+                "puntuación. Los resultados se ordenan por similitud."
+)
+async def search_expedientes(
+    q: str = Query(..., min_length=2, max_length=200, description="Texto a buscar (ej. '330-364', '250/2025', 'Rivera 4')"),
+    limit: int = Query(20, ge=1, le=100, description="Número máximo de resultados (máx 100)"),
+    db: AsyncSession = Depends(get_async_db)
 ) -> List[Expediente]:
     """
-    Obtiene una lista de expedientes con paginación.
+    Busca expedientes por similitud de trigramas (pg_trgm).
+    """
+    return await crud_expediente.search_expedientes(db, q=q.strip(), limit=limit)
+
+# --- Endpoint para Actualizar el Estado 'Trabajado' de Varios Expedientes ---
+# Debe declararse antes de "/{expediente_id}" para que "trabajado" no se tome como un ID
+@router.patch(
+    "/trabajado",
+    response_model=ExpedienteTrabajadoBulkResult,
+    summary="Actualizar estado 'trabajado' de varios expedientes",
+    description="Cambia el estado 'trabajado' de los expedientes indicados en `ids`, o de todos los que cumplen "
+                "`filters`, con una sola sentencia UPDATE. Los IDs que no existen se informan en `not_found`."
+)
+async def update_expedientes_trabajado_status(
+    update_in: ExpedienteTrabajadoBulkUpdate,
+    db: AsyncSession = Depends(get_async_db)
+) -> ExpedienteTrabajadoBulkResult:
+    """
+    Actualiza el estado 'trabajado' de varios expedientes en una única transacción.
     """
-    expedientes = crud_expediente.get_expedientes(db, skip=skip, limit=limit)
-    return expedientes # FastAPI convertirá automáticamente los objetos SQLAlchemy a JSON usando el response_model
+    updated, not_found = await crud_expediente.update_trabajado_bulk(
+        db, trabajado=update_in.trabajado, ids=update_in.ids, filters=update_in.filters
+    )
+    return ExpedienteTrabajadoBulkResult(updated=updated, not_found=not_found)
 
 # --- Endpoint para Obtener un Expediente por ID ---
 @router.get(
@@ -69,21 +295,28 @@ def read_expedientes(
     summary="Obtener un expediente por ID",
     description="Obtiene los detalles de un expediente específico usando su ID."
 )
-def read_expediente_by_id(
+async def read_expediente_by_id(
+    response: Response,
     expediente_id: int = Path(..., description="ID del expediente a obtener", gt=0),
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None, description="ETag del expediente que ya tiene el cliente"),
+    db: AsyncSession = Depends(get_async_db)
 ) -> Expediente:
     """
     Obtiene un expediente por su ID.
     - Llama a la función CRUD para buscar el expediente.
     - Si no se encuentra, lanza una excepción HTTP 404.
+    - Si no cambió desde el ETag de If-None-Match, responde 304 sin cuerpo.
     """
-    db_expediente = crud_expediente.get_expediente(db, expediente_id=expediente_id)
+    db_expediente = await crud_expediente.get_expediente(db, expediente_id=expediente_id)
     if db_expediente is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Expediente con ID {expediente_id} no encontrado"
         )
+    etag = _expediente_etag(db_expediente)
+    if _none_match(if_none_match, etag):
+        return _not_modified(etag)
+    response.headers["ETag"] = etag
     return db_expediente
 
 # --- Endpoint para Actualizar un Expediente (Parcial - PATCH) ---
@@ -93,26 +326,34 @@ def read_expediente_by_id(
     summary="Actualizar un expediente (parcial)",
     description="Actualiza uno o más campos de un expediente existente. Solo se modifican los campos proporcionados."
 )
-def update_existing_expediente(
+async def update_existing_expediente(
+    response: Response,
     expediente_id: int = Path(..., description="ID del expediente a actualizar", gt=0),
     *,
-    db: Session = Depends(get_db),
-    expediente_in: ExpedienteUpdate # Espera un cuerpo con los campos a actualizar
+    db: AsyncSession = Depends(get_async_db),
+    expediente_in: ExpedienteUpdate, # Espera un cuerpo con los campos a actualizar
+    if_match: Optional[str] = Header(None, description="ETag del expediente leído; si cambió desde entonces, responde 412")
 ) -> Expediente:
     """
     Actualiza un expediente existente.
-    - Busca el expediente por ID.
-    - Si no existe, lanza 404.
-    - Llama a la función CRUD para actualizar los campos proporcionados.
+    - Llama a la función CRUD, que actualiza los campos proporcionados en una sola sentencia.
+    - Si no existe, lanza 404; si el nuevo número ya lo tiene otro expediente, 409.
+    - Con If-Match, si el expediente cambió desde ese ETag no se modifica y responde 412.
     """
-    db_expediente = crud_expediente.get_expediente(db, expediente_id=expediente_id)
-    if not db_expediente:
+    expected_versions = _expected_versions(if_match, expediente_id)
+    try:
+        updated_expediente = await crud_expediente.update_expediente(
+            db=db, expediente_id=expediente_id, obj_in=expediente_in, expected_versions=expected_versions
+        )
+    except IntegrityError:
+        await db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Expediente con ID {expediente_id} no encontrado para actualizar"
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Ya existe un expediente con el número '{expediente_in.expediente_nro}'."
         )
-    # Llama a la función CRUD de actualización
-    updated_expediente = crud_expediente.update_expediente(db=db, db_obj=db_expediente, obj_in=expediente_in)
+    if not updated_expediente:
+        await _raise_not_updated(db, expediente_id, expected_versions, f"Expediente con ID {expediente_id} no encontrado para actualizar")
+    response.headers["ETag"] = _expediente_etag(updated_expediente)
     return updated_expediente
 
 # --- Endpoint para Actualizar el Estado 'Trabajado' ---
@@ -122,22 +363,26 @@ def update_existing_expediente(
     summary="Actualizar estado 'trabajado'",
     description="Cambia el estado booleano 'trabajado' de un expediente específico."
 )
-def update_expediente_trabajado_status(
+async def update_expediente_trabajado_status(
+    response: Response,
     expediente_id: int = Path(..., description="ID del expediente a modificar", gt=0),
     trabajado: bool = Body(..., description="Nuevo estado 'trabajado' (true o false)"), # Espera el booleano en el cuerpo
-    db: Session = Depends(get_db)
+    if_match: Optional[str] = Header(None, description="ETag del expediente leído; si cambió desde entonces, responde 412"),
+    db: AsyncSession = Depends(get_async_db)
 ) -> Expediente:
     """
     Actualiza el estado 'trabajado' de un expediente.
     - Llama a la función CRUD específica para esta acción.
     - Si el expediente no existe, lanza 404.
+    - Con If-Match, si el expediente cambió desde ese ETag no se modifica y responde 412.
     """
-    updated_expediente = crud_expediente.update_trabajado_status(db=db, expediente_id=expediente_id, trabajado=trabajado)
+    expected_versions = _expected_versions(if_match, expediente_id)
+    updated_expediente = await crud_expediente.update_trabajado_status(
+        db=db, expediente_id=expediente_id, trabajado=trabajado, expected_versions=expected_versions
+    )
     if not updated_expediente:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Expediente con ID {expediente_id} no encontrado para actualizar estado"
-        )
+        await _raise_not_updated(db, expediente_id, expected_versions, f"Expediente con ID {expediente_id} no encontrado para actualizar estado")
+    response.headers["ETag"] = _expediente_etag(updated_expediente)
     return updated_expediente
 
 # --- Endpoint para Eliminar un Expediente ---
@@ -149,17 +394,17 @@ def update_expediente_trabajado_status(
     # response_model=None es implícito con 204, pero podemos devolver un mensaje si quisiéramos
     # response_model=dict # Si quisiéramos devolver {"message": "Expediente eliminado"}
 )
-def delete_existing_expediente(
+async def delete_existing_expediente(
     expediente_id: int = Path(..., description="ID del expediente a eliminar", gt=0),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> None: # Devuelve None porque el status code es 204
     """
     Elimina un expediente por su ID.
     - Llama a la función CRUD para eliminar.
     - Si no se encuentra, lanza 404.
     """
-    deleted_expediente = crud_expediente.delete_expediente(db=db, expediente_id=expediente_id)
-    if not deleted_expediente:
+    deleted = await crud_expediente.delete_expediente(db=db, expediente_id=expediente_id)
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Expediente con ID {expediente_id} no encontrado para eliminar"
@@ -1,11 +1,19 @@
 # app/routers/logs.py
-from fastapi import APIRouter, Depends, HTTPException, status, Request # Importa Request para obtener la IP
-from sqlalchemy.orm import Session
+import json
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Query # Importa Request para obtener la IP
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
-from app.db.session import get_db
-from app.schemas.access_log import AccessLog, AccessLogCreate
+from app.core.config import settings
+from app.db.session import get_async_db
+from app.schemas.access_log import (
+    AccessLog, AccessLogAccepted, AccessLogCreate,
+    AccessLogStats, AccessLogStatsPoint, AccessLogStatsTop
+)
 from app.crud import crud_access_log # Importa el nuevo módulo CRUD
+from app.crud import crud_access_log_rollup
+from app.services.access_log_writer import AccessLogBufferFull, enqueue_access_logs, writer_stats
 
 router = APIRouter(
     prefix="/logs",
@@ -13,52 +21,162 @@ router = APIRouter(
     responses={404: {"description": "No encontrado"}},
 )
 
+def _enqueue_or_503(entries: List[AccessLogCreate], request: Request) -> AccessLogAccepted:
+    """Agrega los eventos al búfer del escritor; si está lleno (política 'reject') responde 503."""
+    client_ip = request.client.host if request.client else None
+    try:
+        accepted = enqueue_access_logs(entries, ip_address=client_ip)
+    except AccessLogBufferFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "1"}
+        )
+    return AccessLogAccepted(accepted=accepted)
+
 @router.post(
     "/access",
-    response_model=AccessLog,
-    status_code=status.HTTP_201_CREATED,
+    response_model=AccessLogAccepted,
+    status_code=status.HTTP_202_ACCEPTED,
     summary="Registrar un evento de acceso o acción",
-    description="Crea un nuevo registro en el log de acceso. La IP y el timestamp se registran automáticamente."
+    description="Acepta un evento para el log de acceso y lo escribe en segundo plano, junto con otros, en un solo INSERT. "
+                "La IP y el timestamp (momento en que se acepta) se registran automáticamente."
 )
-def record_access_event(
+async def record_access_event(
     *,
     request: Request, # Para obtener la IP del cliente
-    db: Session = Depends(get_db),
     log_in: AccessLogCreate # Datos del log desde el cuerpo de la solicitud
-) -> AccessLog:
+) -> AccessLogAccepted:
     """
-    Registra un evento de acceso.
+    Registra un evento de acceso sin esperar a la base de datos.
     La dirección IP del cliente se obtiene del objeto Request.
     """
-    client_ip = request.client.host if request.client else None
-    created_log_entry = crud_access_log.create_access_log_entry(
-        db=db,
-        log_entry_in=log_in,
-        ip_address=client_ip
-    )
-    return created_log_entry
+    return _enqueue_or_503([log_in], request)
+
+@router.post(
+    "/access/batch",
+    response_model=AccessLogAccepted,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Registrar varios eventos de acceso",
+    description="Igual que `POST /logs/access`, pero con una lista de eventos en una sola solicitud."
+)
+async def record_access_events_batch(
+    *,
+    request: Request,
+    logs_in: List[AccessLogCreate]
+) -> AccessLogAccepted:
+    """
+    Registra un grupo de eventos de acceso sin esperar a la base de datos.
+    """
+    if len(logs_in) > settings.ACCESS_LOG_BATCH_MAX_EVENTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Se aceptan hasta {settings.ACCESS_LOG_BATCH_MAX_EVENTS} eventos por solicitud."
+        )
+    return _enqueue_or_503(logs_in, request)
+
+@router.get(
+    "/access/writer",
+    summary="Estado del escritor de logs de acceso",
+    description="Eventos en el búfer y contadores (aceptados, descartados, escritos) del worker que atiende la solicitud."
+)
+async def read_access_log_writer_stats() -> dict:
+    """
+    Devuelve los contadores del escritor de logs de acceso de este worker.
+    """
+    return writer_stats()
 
 @router.get(
     "/access",
     response_model=List[AccessLog],
     summary="Obtener registros de acceso",
-    description="Obtiene una lista paginada de los logs de acceso, con filtros opcionales."
+    description="Obtiene una página de logs de acceso (del más reciente al más antiguo), con filtros opcionales. "
+                "La respuesta sigue siendo una lista; si hay más registros, la cabecera `X-Next-Cursor` trae el "
+                "cursor que se envía como `cursor` para pedir la página siguiente (sin la cabecera, no hay más)."
 )
-def read_access_logs(
-    db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = 100,
+async def read_access_logs(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    cursor: Optional[str] = Query(None, description="Cursor recibido en la cabecera `X-Next-Cursor` de la página anterior"),
+    skip: int = Query(0, ge=0, deprecated=True, description="Número de registros a saltar (obsoleto: use `cursor`; se ignora si hay cursor)"),
+    limit: int = Query(100, ge=1, le=1000),
     user_identifier: Optional[str] = None,
-    action_description: Optional[str] = None
+    action_description: Optional[str] = None,
+    details: Optional[str] = Query(None, description='Objeto JSON que debe estar contenido en `details`, ej. {"expediente_id": 1}'),
+    desde: Optional[datetime] = Query(None, description="Solo registros desde este momento, inclusive (ISO 8601)"),
+    hasta: Optional[datetime] = Query(None, description="Solo registros anteriores a este momento (ISO 8601)")
 ) -> List[AccessLog]:
     """
-    Obtiene logs de acceso con paginación y filtros.
+    Obtiene logs de acceso con paginación por cursor y filtros.
+    El cursor va en una cabecera para no cambiar el formato de la respuesta (una lista).
     """
-    logs = crud_access_log.get_access_logs(
-        db,
-        skip=skip,
-        limit=limit,
-        user_identifier=user_identifier,
-        action_description=action_description
+    details_filter = None
+    if details:
+        try:
+            details_filter = json.loads(details)
+        except ValueError:
+            details_filter = None
+        if not isinstance(details_filter, dict):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El filtro 'details' debe ser un objeto JSON, ej. {\"expediente_id\": 1}."
+            )
+    try:
+        logs, next_cursor = await crud_access_log.get_access_logs(
+            db,
+            skip=skip,
+            limit=limit,
+            user_identifier=user_identifier,
+            action_description=action_description,
+            details=details_filter,
+            desde=desde,
+            hasta=hasta,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return logs
+
+@router.get(
+    "/stats",
+    response_model=AccessLogStats,
+    summary="Estadísticas de uso",
+    description="Serie temporal y las acciones y usuarios más frecuentes en un rango de tiempo. Se calcula con los "
+                "agregados por hora, sin recorrer los logs de acceso. Por defecto, las últimas 24 horas."
+)
+async def read_access_log_stats(
+    db: AsyncSession = Depends(get_async_db),
+    desde: Optional[datetime] = Query(None, description="Inicio del rango (ISO 8601); se redondea a la hora"),
+    hasta: Optional[datetime] = Query(None, description="Fin del rango, excluido (ISO 8601); por defecto, ahora"),
+    granularity: str = Query("hour", pattern="^(hour|day)$", description="Intervalo de la serie: 'hour' o 'day' (UTC)"),
+    top: int = Query(10, ge=1, le=100, description="Cantidad de acciones y usuarios más frecuentes"),
+    action_description: Optional[str] = Query(None, description="Solo esta acción (coincidencia exacta)"),
+    user_identifier: Optional[str] = Query(None, description="Solo este usuario (coincidencia exacta)")
+) -> AccessLogStats:
+    """
+    Obtiene estadísticas de uso a partir de la tabla de agregados.
+    """
+    hasta = hasta or datetime.now(timezone.utc)
+    desde = desde or hasta - timedelta(days=1)
+    if hasta.tzinfo is None:
+        hasta = hasta.replace(tzinfo=timezone.utc)
+    if desde.tzinfo is None:
+        desde = desde.replace(tzinfo=timezone.utc)
+    if desde >= hasta:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'desde' debe ser anterior a 'hasta'.")
+
+    filters = dict(desde=desde, hasta=hasta, action_description=action_description, user_identifier=user_identifier)
+    series = await crud_access_log_rollup.get_time_series(db, granularity=granularity, **filters)
+    top_actions = await crud_access_log_rollup.get_top(db, dimension="action", limit=top, **filters)
+    top_users = await crud_access_log_rollup.get_top(db, dimension="user", limit=top, **filters)
+    return AccessLogStats(
+        desde=desde,
+        hasta=hasta,
+        granularity=granularity,
+        total=sum(count for _, count in series),
+        series=[AccessLogStatsPoint(bucket=bucket, count=count) for bucket, count in series],
+        top_actions=[AccessLogStatsTop(key=key, count=count) for key, count in top_actions],
+        top_users=[AccessLogStatsTop(key=key, count=count) for key, count in top_users],
     )
-    return logs
\ No newline at end of file
@@ -1,6 +1,6 @@
 # app/schemas/access_log.py
 from pydantic import BaseModel, Field, IPvAnyAddress
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 # --- Esquema para la Creación de un Registro de Acceso ---
@@ -22,4 +22,26 @@ class AccessLog(BaseModel):
     details: Optional[Dict[str, Any]] = None # O simplemente 'Any' si el JSON es muy variable
 
     class Config:
-        from_attributes = True # Para mapear desde el objeto SQLAlchemy
\ No newline at end of file
+        from_attributes = True # Para mapear desde el objeto SQLAlchemy
+
+# --- Esquema de Respuesta al Aceptar Eventos (se escriben en segundo plano) ---
+class AccessLogAccepted(BaseModel):
+    accepted: int = Field(..., example=1, description="Cantidad de eventos aceptados para su registro.")
+
+# --- Esquemas de Estadísticas (leídas de los agregados por hora) ---
+class AccessLogStatsPoint(BaseModel):
+    bucket: datetime = Field(..., description="Inicio del intervalo (UTC)")
+    count: int
+
+class AccessLogStatsTop(BaseModel):
+    key: Optional[str] = Field(None, description="Acción o usuario (null: eventos sin usuario)")
+    count: int
+
+class AccessLogStats(BaseModel):
+    desde: datetime
+    hasta: datetime
+    granularity: str
+    total: int
+    series: List[AccessLogStatsPoint]
+    top_actions: List[AccessLogStatsTop]
+    top_users: List[AccessLogStatsTop]
@@ -1,4 +1,5 @@
 # app/schemas/analysis.py
+import re
 from pydantic import BaseModel, Field, field_validator # Import field_validator if needed
 from typing import List, Optional, Union # Import Union if needed for mixed types
 
@@ -10,14 +11,14 @@ class InvolucradoAccion(BaseModel):
     nombre_completo: Optional[str] = Field(None, description="Nombre completo de la persona")
     documento_identidad: Optional[str] = Field(None, description="C.I. de la persona (solo números)")
 
-    # Opcional: Añadir un validador para asegurar que documento_identidad solo contenga números
+    # Normaliza la C.I. a solo dígitos ("4.459.424-7" -> "44594247"); la validación del
+    # dígito verificador la hace merge_identifiers (app/services/identifier_extractor.py)
     @field_validator('documento_identidad')
     def validate_doc_identidad(cls, v):
-        if v is not None and not v.isdigit():
-            # Podrías intentar limpiarlo o lanzar un error, por ahora lo dejamos pasar
-            # raise ValueError('Documento de identidad debe contener solo números')
-            print(f"Advertencia: documento_identidad '{v}' contiene caracteres no numéricos.")
-        return v
+        if v is None:
+            return v
+        digits = re.sub(r"\D", "", v)
+        return digits or None
 
 class AccionDetallada(BaseModel):
     """Esquema para una acción detallada extraída del oficio."""
@@ -33,6 +34,8 @@ class AnalysisResponse(BaseModel):
     alineado con la nueva estructura del prompt.
     """
     # Datos del Juzgado
+    # El modelo solo devuelve nombre_juzgado; código, email y departamento se resuelven
+    # localmente desde codigos.json (ver app/services/court_resolver.py).
     codigo_juzgado: Optional[int] = Field(None, example=163553, description="Código numérico del Juzgado según tabla de mapeo, o null si no se encuentra.")
     nombre_juzgado: Optional[str] = Field(None, example="Juzgado Letrado de Rivera de 4° Turno", description="Nombre completo del Juzgado emisor.")
     email_juzgado: Optional[str] = Field(None, example="jrivera4@poderjudicial.gub.uy", description="Email del Juzgado emisor.")
@@ -42,6 +45,9 @@ class AnalysisResponse(BaseModel):
     documentos_involucrados: List[str] = Field([], example=["44594247"], description="Lista de C.I. numéricas de las partes principales mencionadas en el oficio.")
     asunto_principal: str = Field(..., example="Oficio N° 250/2025 – Juzgado ... - Autos: \"...\", IUE ... – Solicitud...", description="Resumen del asunto general del oficio.")
     cve: Optional[str] = Field(None, example="A1B2C3D4E5", description="Código de Verificación Electrónica (CVE) si se encuentra.")
+    # Extraídos localmente del texto del oficio (o, si no hay texto, del asunto_principal)
+    iue: Optional[str] = Field(None, example="330-364/2024", description="Número de expediente (IUE) del caso.")
+    numero_oficio: Optional[str] = Field(None, example="250/2025", description="Número del oficio.")
 
     # Acciones Específicas
     acciones_detalladas: List[AccionDetallada] = Field([], description="Lista detallada de acciones solicitadas o comunicadas.")
@@ -50,24 +56,18 @@ class AnalysisResponse(BaseModel):
     releva_secreto_tributario: bool = Field(..., description="Indica si el oficio releva el secreto tributario.")
     justificacion_releva_secreto: Optional[str] = Field(None, description="Frase exacta del oficio que justifica la relevación del secreto, si aplica.")
 
-    # Opcional: Validadores adicionales si son necesarios
+    # Normaliza las C.I. a solo dígitos y descarta elementos que no contengan ninguno.
+    # La validación del dígito verificador la hace el extractor local.
     @field_validator('documentos_involucrados', mode='before')
     def validate_docs_involucrados(cls, v):
         if not isinstance(v, list):
             return [] # Devuelve lista vacía si no es una lista
-        # Asegura que todos los elementos sean strings y numéricos
         validated_docs = []
         for item in v:
             if isinstance(item, (str, int)):
-                doc_str = str(item).strip()
-                if doc_str.isdigit():
+                doc_str = re.sub(r"\D", "", str(item))
+                if doc_str and doc_str not in validated_docs:
                     validated_docs.append(doc_str)
-                else:
-                     print(f"Advertencia: documento_involucrado '{doc_str}' no es numérico.")
-                     # Podrías decidir incluirlo igualmente o filtrarlo
-                     # validated_docs.append(doc_str) # Descomentar si quieres incluir no numéricos
-            else:
-                print(f"Advertencia: elemento no válido en documentos_involucrados: {item}")
         return validated_docs
 
 
@@ -0,0 +1,29 @@
+# app/schemas/analysis_job.py
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+from app.schemas.analysis import AnalysisResponse
+
+# --- Esquema Devuelto al Encolar un Trabajo ---
+class AnalysisJobCreated(BaseModel):
+    id: int = Field(..., example=42, description="ID del trabajo, para consultar su estado")
+    status: str = Field(..., example="pending", description="Estado inicial del trabajo")
+
+    class Config:
+        from_attributes = True
+
+# --- Esquema para Consultar un Trabajo ---
+class AnalysisJob(BaseModel):
+    id: int
+    status: str = Field(..., example="done", description="pending, running, done o dead")
+    filename: Optional[str] = None
+    attempts: int = Field(..., description="Intentos realizados")
+    max_attempts: int = Field(..., description="Intentos permitidos")
+    last_error: Optional[str] = Field(None, description="Último error, si hubo alguno")
+    result: Optional[AnalysisResponse] = Field(None, description="Resultado del análisis (solo cuando status es 'done')")
+    fecha_creacion: datetime
+    fecha_actualizacion: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -1,8 +1,10 @@
 # app/schemas/expediente.py
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional, List
 from datetime import datetime, date # Importa date
 
+from app.schemas.analysis import AnalysisResponse
+
 # --- Esquema Base ---
 class ExpedienteBase(BaseModel):
     expediente_nro: str = Field(..., example="IUE 500-123/2025", description="Número o identificador del expediente")
@@ -47,7 +49,58 @@ class Expediente(ExpedienteInDBBase):
     pass
 
 # --- Esquema para Lista de Expedientes ---
+# Una página de expedientes (paginación por cursor) y el total de los que cumplen los filtros
 class ExpedienteList(BaseModel):
     expedientes: List[Expediente]
     total: int = Field(..., example=42)
+    total_is_estimate: bool = Field(False, description="True si el total es una estimación del planificador (resultados muy grandes)")
+    next_cursor: Optional[str] = Field(None, description="Cursor para pedir la página siguiente (null si no hay más)")
+
+# --- Filtros para la Lista de Expedientes (parámetros de consulta) ---
+class ExpedienteFilters(BaseModel):
+    trabajado: Optional[bool] = Field(None, description="Solo expedientes trabajados (true) o pendientes (false)")
+    juzgado: Optional[str] = Field(None, description="Nombre exacto del juzgado emisor")
+    departamento: Optional[str] = Field(None, description="Departamento exacto del juzgado emisor")
+    usuario_id: Optional[int] = Field(None, description="ID del usuario asociado")
+    fecha_recibido_desde: Optional[date] = Field(None, description="Recibidos desde esta fecha, inclusive (YYYY-MM-DD)")
+    fecha_recibido_hasta: Optional[date] = Field(None, description="Recibidos hasta esta fecha, inclusive (YYYY-MM-DD)")
+
+# --- Esquemas para la Importación Masiva ---
+class ExpedienteBulkError(BaseModel):
+    row: int = Field(..., description="Número de fila de datos en el archivo (desde 1)")
+    expediente_nro: Optional[str] = None
+    error: str
+
+class ExpedienteBulkResult(BaseModel):
+    received: int = Field(..., description="Filas leídas del archivo")
+    inserted: int
+    updated: int
+    unchanged: int = Field(0, description="Filas idénticas al expediente ya guardado (no se modificó nada)")
+    failed: int
+    errors: List[ExpedienteBulkError] = Field(default_factory=list, description="Detalle de las filas con error (hasta EXPEDIENTES_BULK_MAX_ERRORS)")
+
+# --- Esquemas para la Actualización Masiva del Estado 'Trabajado' ---
+class ExpedienteTrabajadoBulkUpdate(BaseModel):
+    trabajado: bool = Field(..., description="Nuevo estado 'trabajado' (true o false)")
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=1000, description="IDs de los expedientes a modificar (máx 1000)")
+    filters: Optional[ExpedienteFilters] = Field(None, description="Alternativa a `ids`: modifica todos los expedientes que cumplen estos filtros")
+
+    @model_validator(mode='after')
+    def check_ids_or_filters(self):
+        if (self.ids is None) == (self.filters is None):
+            raise ValueError("Indique 'ids' o 'filters' (uno de los dos).")
+        # Un filtro vacío modificaría todos los expedientes
+        if self.filters is not None and not self.filters.model_dump(exclude_none=True):
+            raise ValueError("'filters' debe incluir al menos un criterio.")
+        return self
+
+class ExpedienteTrabajadoBulkResult(BaseModel):
+    updated: int = Field(..., description="Cantidad de expedientes modificados")
+    not_found: List[int] = Field(default_factory=list, description="IDs pedidos que no existen (solo con `ids`)")
 
+# --- Esquema para el Alta desde un PDF ---
+# Resultado de analizar un oficio y guardar su expediente en la misma solicitud
+class ExpedienteFromPdf(BaseModel):
+    analysis: AnalysisResponse
+    expediente: Expediente
+    created: bool = Field(..., description="True si el expediente se creó; False si ya existía y se actualizó")
@@ -0,0 +1,197 @@
+# app/services/access_log_partitions.py
+import asyncio
+import re
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+
+# access_logs está particionada por mes (en UTC): access_logs_p2026_10 guarda octubre de 2026
+_PARTITION_NAME_RE = re.compile(r"^access_logs_p(\d{4})_(\d{2})$")
+
+# Partición DEFAULT: recibe los eventos de meses sin partición y debería estar siempre vacía
+DEFAULT_PARTITION = "access_logs_default"
+
+# Clave del advisory lock: solo un worker a la vez crea o elimina particiones
+_MAINTENANCE_LOCK_KEY = 7261001
+
+RETENTION_DROP = "drop" # DROP TABLE: libera el espacio al instante
+RETENTION_DETACH = "detach" # DETACH PARTITION: la tabla queda aparte (para archivarla) y deja de consultarse
+
+_maintenance_task: Optional[asyncio.Task] = None
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _current_month() -> date:
+    return datetime.now(timezone.utc).date().replace(day=1)
+
+
+def partition_name(month: date) -> str:
+    return f"access_logs_p{month:%Y_%m}"
+
+
+def list_partitions(db: Session) -> Dict[date, str]:
+    """Particiones mensuales actuales de access_logs (mes -> nombre de la tabla)."""
+    rows = db.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'access_logs'
+    """)).scalars().all()
+    partitions = {}
+    for name in rows:
+        match = _PARTITION_NAME_RE.match(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def _month_bounds(month: date) -> str:
+    return f"FROM ('{month.isoformat()} 00:00:00+00') TO ('{_add_months(month, 1).isoformat()} 00:00:00+00')"
+
+
+def ensure_partitions(db: Session, months_ahead: int) -> List[str]:
+    """
+    Crea las particiones del mes actual y de los `months_ahead` siguientes que falten,
+    para que ningún INSERT termine en la partición DEFAULT.
+
+    Si la partición DEFAULT ya tiene eventos de un mes a crear (el mantenimiento estuvo
+    detenido), la partición se crea aparte, los eventos se mueven a ella y luego se
+    adjunta: PostgreSQL no permite crear una partición cuyas filas estén en la DEFAULT.
+
+    Returns:
+        List[str]: Nombres de las particiones creadas.
+    """
+    existing = list_partitions(db)
+    created = []
+    for offset in range(months_ahead + 1):
+        month = _add_months(_current_month(), offset)
+        if month in existing:
+            continue
+        name = partition_name(month)
+        next_month = _add_months(month, 1)
+        in_default = db.execute(
+            text(f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE "timestamp" >= :start AND "timestamp" < :end)'),
+            {"start": datetime(month.year, month.month, 1, tzinfo=timezone.utc),
+             "end": datetime(next_month.year, next_month.month, 1, tzinfo=timezone.utc)},
+        ).scalar()
+        if in_default:
+            moved = _create_partition_from_default(db, month)
+            print(f"Advertencia: {moved} logs de acceso movidos de {DEFAULT_PARTITION} a {name}.")
+        else:
+            db.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF access_logs FOR VALUES {_month_bounds(month)}"))
+        created.append(name)
+    return created
+
+
+def _create_partition_from_default(db: Session, month: date) -> int:
+    """Crea la partición de `month` con los eventos que quedaron en la DEFAULT y la adjunta."""
+    name = partition_name(month)
+    next_month = _add_months(month, 1)
+    db.execute(text(f"CREATE TABLE {name} (LIKE access_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = db.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE "timestamp" >= :start AND "timestamp" < :end
+            RETURNING id, "timestamp", ip_address, action_description, user_identifier, details
+        )
+        INSERT INTO {name} (id, "timestamp", ip_address, action_description, user_identifier, details)
+        SELECT id, "timestamp", ip_address, action_description, user_identifier, details FROM moved
+    """), {"start": datetime(month.year, month.month, 1, tzinfo=timezone.utc),
+           "end": datetime(next_month.year, next_month.month, 1, tzinfo=timezone.utc)}).rowcount
+    # Al adjuntarla, PostgreSQL crea en ella los índices de la tabla padre
+    db.execute(text(f"ALTER TABLE access_logs ATTACH PARTITION {name} FOR VALUES {_month_bounds(month)}"))
+    return moved
+
+
+def default_partition_rows(db: Session) -> int:
+    """Eventos en la partición DEFAULT (0 si no existe). Distinto de 0 indica que faltó mantenimiento."""
+    if db.execute(text("SELECT to_regclass(:name)"), {"name": DEFAULT_PARTITION}).scalar() is None:
+        return 0
+    return db.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION}")).scalar()
+
+
+def apply_retention(db: Session, retention_months: int, action: str) -> List[str]:
+    """
+    Elimina (o separa, según `action`) las particiones de meses completos anteriores a
+    los últimos `retention_months` meses. Es instantáneo, a diferencia de un DELETE.
+
+    Returns:
+        List[str]: Nombres de las particiones eliminadas o separadas.
+    """
+    if retention_months <= 0:
+        return []
+    cutoff = _add_months(_current_month(), -retention_months)
+    removed = []
+    for month, name in sorted(list_partitions(db).items()):
+        if month >= cutoff:
+            continue
+        if action == RETENTION_DETACH:
+            db.execute(text(f"ALTER TABLE access_logs DETACH PARTITION {name}"))
+        else:
+            db.execute(text(f"DROP TABLE {name}"))
+        removed.append(name)
+    return removed
+
+
+def maintain_partitions() -> Dict[str, List[str]]:
+    """
+    Crea las particiones futuras y aplica la retención (función síncrona). Si otro
+    worker ya está haciendo el mantenimiento, no hace nada.
+    """
+    db = SessionLocal()
+    try:
+        locked = db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _MAINTENANCE_LOCK_KEY}).scalar()
+        if not locked:
+            db.rollback()
+            return {"created": [], "removed": []}
+        created = ensure_partitions(db, settings.ACCESS_LOG_PARTITIONS_AHEAD)
+        removed = apply_retention(db, settings.ACCESS_LOG_RETENTION_MONTHS, settings.ACCESS_LOG_RETENTION_ACTION)
+        db.commit()
+        leftover = default_partition_rows(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    if created or removed:
+        print(f"DEBUG (Partitions): particiones creadas: {created}; eliminadas/separadas: {removed}")
+    if leftover:
+        # Solo quedan eventos fuera del rango mantenido (ej. timestamps muy antiguos o futuros)
+        print(f"Advertencia: {DEFAULT_PARTITION} tiene {leftover} logs de acceso fuera de las particiones mensuales.")
+    return {"created": created, "removed": removed}
+
+
+async def _maintenance_loop() -> None:
+    """Ejecuta el mantenimiento al arrancar y luego cada ACCESS_LOG_PARTITION_MAINTENANCE_INTERVAL segundos."""
+    while True:
+        try:
+            await run_in_threadpool(maintain_partitions)
+        except Exception as e:
+            # Hay margen de ACCESS_LOG_PARTITIONS_AHEAD meses para reintentar
+            print(f"Error en el mantenimiento de particiones de access_logs: {e}")
+        await asyncio.sleep(settings.ACCESS_LOG_PARTITION_MAINTENANCE_INTERVAL)
+
+
+def start_partition_maintenance() -> None:
+    """Arranca la tarea periódica de mantenimiento de particiones en el event loop actual."""
+    global _maintenance_task
+    _maintenance_task = asyncio.create_task(_maintenance_loop())
+
+
+async def stop_partition_maintenance() -> None:
+    """Detiene la tarea de mantenimiento (las operaciones son transaccionales)."""
+    global _maintenance_task
+    if _maintenance_task is not None:
+        _maintenance_task.cancel()
+        await asyncio.gather(_maintenance_task, return_exceptions=True)
+        _maintenance_task = None
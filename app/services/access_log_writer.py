@@ -0,0 +1,145 @@
+# app/services/access_log_writer.py
+import asyncio
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.config import settings
+from app.crud import crud_access_log
+from app.db.session import AsyncSessionLocal
+from app.schemas.access_log import AccessLogCreate
+
+# Políticas ante el búfer lleno
+OVERFLOW_DROP_OLDEST = "drop_oldest" # Se descartan los eventos más viejos y se aceptan los nuevos
+OVERFLOW_REJECT = "reject" # Se rechazan los nuevos (el endpoint responde 503)
+
+# Búfer de eventos pendientes de escribir (uno por worker de gunicorn)
+_buffer: Deque[Dict[str, Any]] = deque()
+_wakeup: Optional[asyncio.Event] = None
+_flusher_task: Optional[asyncio.Task] = None
+_stopping = False
+_counters: Dict[str, int] = {"accepted": 0, "dropped": 0, "rejected": 0, "written": 0, "failed_flushes": 0}
+
+
+class AccessLogBufferFull(Exception):
+    """El búfer está lleno y la política es rechazar los eventos nuevos."""
+
+
+def enqueue_access_logs(entries: List[AccessLogCreate], ip_address: Optional[str]) -> int:
+    """
+    Agrega eventos al búfer sin tocar la base de datos. El timestamp se fija aquí, al
+    aceptar el evento, y no al escribirlo.
+
+    Returns:
+        int: Cantidad de eventos aceptados.
+
+    Raises:
+        AccessLogBufferFull: Si no hay lugar y la política es OVERFLOW_REJECT.
+    """
+    capacity = settings.ACCESS_LOG_BUFFER_MAX_EVENTS
+    overflow = len(_buffer) + len(entries) - capacity
+    if overflow > 0:
+        if settings.ACCESS_LOG_OVERFLOW_POLICY == OVERFLOW_REJECT:
+            _counters["rejected"] += len(entries)
+            raise AccessLogBufferFull(f"El búfer de logs de acceso está lleno ({capacity} eventos).")
+        # Si el lote entrante no cabe entero, se conservan sus eventos más recientes
+        discarded_incoming = max(0, len(entries) - capacity)
+        entries = entries[discarded_incoming:]
+        evicted = max(0, len(_buffer) + len(entries) - capacity)
+        for _ in range(evicted):
+            _buffer.popleft()
+        _counters["dropped"] += evicted + discarded_incoming
+        print(f"Advertencia: búfer de logs de acceso lleno; se descartaron {evicted + discarded_incoming} eventos antiguos.")
+
+    now = datetime.now(timezone.utc)
+    for entry in entries:
+        _buffer.append({
+            "timestamp": now,
+            "ip_address": ip_address,
+            "action_description": entry.action_description,
+            "user_identifier": entry.user_identifier,
+            "details": entry.details,
+        })
+    _counters["accepted"] += len(entries)
+    if _wakeup is not None and len(_buffer) >= settings.ACCESS_LOG_FLUSH_BATCH_SIZE:
+        _wakeup.set() # Lote completo: no hace falta esperar al intervalo
+    return len(entries)
+
+
+def writer_stats() -> Dict[str, Any]:
+    """Contadores del escritor de este proceso y eventos aún en el búfer."""
+    return {"buffered": len(_buffer), **_counters}
+
+
+async def _flush_once() -> int:
+    """
+    Escribe hasta ACCESS_LOG_FLUSH_BATCH_SIZE eventos en un INSERT de varias filas.
+    Si la escritura falla, los eventos vuelven al principio del búfer.
+
+    Returns:
+        int: Cantidad de eventos escritos.
+    """
+    batch = [_buffer.popleft() for _ in range(min(len(_buffer), settings.ACCESS_LOG_FLUSH_BATCH_SIZE))]
+    if not batch:
+        return 0
+    try:
+        async with AsyncSessionLocal() as db:
+            await crud_access_log.create_access_log_entries(db, batch)
+    except Exception as e:
+        _counters["failed_flushes"] += 1
+        # Se devuelven en orden; si mientras tanto el búfer se llenó, se pierden los que no caben
+        room = settings.ACCESS_LOG_BUFFER_MAX_EVENTS - len(_buffer)
+        kept = batch[:max(room, 0)]
+        _buffer.extendleft(reversed(kept))
+        _counters["dropped"] += len(batch) - len(kept)
+        print(f"Error al escribir {len(batch)} logs de acceso (se reintentará): {e}")
+        raise
+    _counters["written"] += len(batch)
+    return len(batch)
+
+
+async def _flusher_loop() -> None:
+    """Vacía el búfer cada ACCESS_LOG_FLUSH_INTERVAL_MS o cuando se junta un lote completo."""
+    interval = settings.ACCESS_LOG_FLUSH_INTERVAL_MS / 1000
+    while not _stopping:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+        try:
+            while _buffer and not _stopping:
+                await _flush_once()
+        except Exception:
+            # La base de datos no responde: se reintenta en el próximo intervalo
+            await asyncio.sleep(interval)
+
+
+def start_access_log_writer() -> None:
+    """Arranca la tarea que escribe el búfer en la base de datos."""
+    global _wakeup, _flusher_task, _stopping
+    _stopping = False
+    _wakeup = asyncio.Event()
+    _flusher_task = asyncio.create_task(_flusher_loop())
+
+
+async def stop_access_log_writer() -> None:
+    """
+    Detiene la tarea periódica (esperando a que termine la escritura en curso) y
+    escribe lo que quede en el búfer antes de apagar.
+    Si la base de datos no responde, los eventos restantes se pierden (se informa cuántos).
+    """
+    global _flusher_task, _stopping
+    if _flusher_task is not None:
+        # No se cancela la tarea: una escritura en curso termina y no se pierde ni se duplica
+        _stopping = True
+        _wakeup.set()
+        await asyncio.gather(_flusher_task, return_exceptions=True)
+        _flusher_task = None
+    try:
+        while _buffer:
+            await _flush_once()
+    except Exception:
+        print(f"Error: no se pudieron escribir {len(_buffer)} logs de acceso al apagar.")
+        _counters["dropped"] += len(_buffer)
+        _buffer.clear()
@@ -1,33 +1,104 @@
 # app/services/analysis_service.py
 import asyncio
+import hashlib
 import io
 import json
-from typing import Optional
+from typing import Optional, Tuple, Dict, List, Any, AsyncIterator, Callable, Awaitable
 
 from fastapi import UploadFile, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from pydantic import ValidationError
+from sqlalchemy.orm import Session
 
 # Importaciones de bibliotecas externas
 import google.generativeai as genai
-# Ya no importamos PdfReader de pypdf
+from pypdf import PdfReader # Extracción local de la capa de texto
 
 # Importaciones locales
 from app.core.config import settings # Importa la configuración (API Key, Prompt)
+from app.db.session import SessionLocal # Sesiones propias para cada documento de un lote
 from app.schemas.analysis import AnalysisResponse # Importa el esquema de respuesta
+from app.crud import crud_analysis_cache # Caché persistente de resultados
+from app.services.court_resolver import resolve_court # Tabla de juzgados en memoria
+from app.services.upload_service import spool_upload, SpooledUpload # Lectura acotada de subidas
+from app.services.identifier_extractor import extract_identifiers, merge_identifiers # Extractor local
+from app.services.gemini_resilience import ResilientCaller # Reintentos, plazos y disyuntor
+
+# Cliente del modelo de Gemini, compartido por todas las solicitudes del worker
+_gemini_model: Optional[genai.GenerativeModel] = None
+
+# Capa de resiliencia de las llamadas a Gemini (una por worker, con sus métricas).
+# Limita además las llamadas en curso por worker (GEMINI_MAX_CONCURRENT_CALLS), así un pico
+# de subidas no agota la cuota de la API ni la memoria del worker, mientras que el resto de
+# endpoints (/expedientes, /logs) sigue respondiendo.
+gemini_caller = ResilientCaller("gemini", max_concurrent=settings.GEMINI_MAX_CONCURRENT_CALLS)
+
+# --- Versión del Prompt ---
+# Hash del prompt del sistema. Forma parte de la clave de la caché de análisis,
+# por lo que cualquier cambio en prompt.txt invalida automáticamente las entradas previas.
+PROMPT_HASH = hashlib.sha256(settings.GEMINI_SYSTEM_PROMPT.encode("utf-8")).hexdigest()
 
 # --- Funciones Auxiliares ---
 
-# Ya no necesitamos _extract_text_from_pdf
+def _extract_text_layer(pdf_content: bytes) -> Optional[str]:
+    """
+    Extrae localmente la capa de texto de un PDF generado digitalmente (función síncrona).
+
+    Devuelve el texto solo si supera el umbral de calidad: suficientes caracteres por
+    página (PDF_TEXT_MIN_CHARS_PER_PAGE) y una proporción mínima de caracteres
+    alfanuméricos (PDF_TEXT_MIN_ALNUM_RATIO). Un PDF escaneado o con texto basura
+    devuelve None y se analiza como PDF completo.
+    """
+    try:
+        reader = PdfReader(io.BytesIO(pdf_content))
+        pages_text = [page.extract_text() or "" for page in reader.pages]
+    except Exception as e:
+        print(f"Advertencia: no se pudo extraer la capa de texto del PDF: {e}")
+        return None
+    if not pages_text:
+        return None
+
+    text = "\n\n".join(pages_text).strip()
+    visible_chars = [ch for ch in text if not ch.isspace()]
+    chars_per_page = len(visible_chars) / len(pages_text)
+    alnum_ratio = sum(ch.isalnum() for ch in visible_chars) / len(visible_chars) if visible_chars else 0.0
+    if chars_per_page < settings.PDF_TEXT_MIN_CHARS_PER_PAGE or alnum_ratio < settings.PDF_TEXT_MIN_ALNUM_RATIO:
+        print(f"Capa de texto insuficiente ({chars_per_page:.0f} caracteres/página, {alnum_ratio:.0%} alfanuméricos).")
+        return None
+    return text
+
+def get_gemini_model(api_key: str) -> genai.GenerativeModel:
+    """
+    Devuelve el cliente del modelo de Gemini de este worker, creándolo la primera vez.
+    Se precalienta al arrancar la aplicación (ver app/services/warmup.py).
+    """
+    global _gemini_model
+    if _gemini_model is None:
+        # Configura la API de Google AI
+        genai.configure(api_key=api_key)
+        # Elige el modelo multimodal (gemini-1.5-flash es una buena opción)
+        # Asegúrate de que este modelo esté disponible para tu API Key y región.
+        _gemini_model = genai.GenerativeModel(settings.GEMINI_MODEL_NAME)
+        print(f"DEBUG (Gemini): cliente del modelo {settings.GEMINI_MODEL_NAME} creado.")
+    return _gemini_model
 
-async def _call_gemini_api(pdf_content: bytes, system_prompt: str, api_key: str) -> dict:
+async def _call_gemini_api(
+    pdf_content: bytes,
+    system_prompt: str,
+    api_key: str,
+    document_text: Optional[str] = None
+) -> dict:
     """
-    Llama a la API de Google Gemini (modelo gemini-1.5-flash-latest)
-    para analizar el contenido de un archivo PDF directamente.
+    Llama a la API de Google Gemini (modelo configurado en GEMINI_MODEL_NAME)
+    para analizar el contenido de un archivo PDF directamente o, si se dispone
+    de ella, solo su capa de texto.
 
     Args:
         pdf_content (bytes): El contenido binario del archivo PDF.
         system_prompt (str): Las instrucciones para el modelo Gemini.
         api_key (str): La API Key de Google AI.
+        document_text (Optional[str]): Texto extraído del PDF. Si se indica, se envía
+            este texto en lugar del archivo binario.
 
     Returns:
         dict: El diccionario JSON parseado de la respuesta de Gemini.
@@ -50,24 +121,25 @@ async def _call_gemini_api(pdf_content: bytes, system_prompt: str, api_key: str)
         )
 
     try:
-        # Configura la API de Google AI
-        genai.configure(api_key=api_key)
-
-        # Elige el modelo multimodal (gemini-1.5-flash es una buena opción)
-        # Asegúrate de que este modelo esté disponible para tu API Key y región.
-        model = genai.GenerativeModel('gemini-1.5-flash-latest')
+        # Cliente del modelo creado una sola vez por worker (ver get_gemini_model)
+        model = get_gemini_model(api_key)
 
-        print(f"Llamando a Gemini API (modelo: {model.model_name}) con el archivo PDF...")
+        if document_text is not None:
+            # Vía rápida: el oficio tiene capa de texto, se envía solo el texto
+            print(f"Llamando a Gemini API (modelo: {model.model_name}) con el texto extraído ({len(document_text)} caracteres)...")
+            contents = [system_prompt, f"Texto del oficio:\n\n{document_text}"]
+        else:
+            print(f"Llamando a Gemini API (modelo: {model.model_name}) con el archivo PDF...")
 
-        # Prepara los datos para el modelo multimodal
-        # Necesitamos pasar el prompt y el archivo PDF como partes separadas.
-        pdf_file_data = {
-            'mime_type': 'application/pdf', # Especifica el tipo MIME del archivo
-            'data': pdf_content           # El contenido binario del PDF
-        }
+            # Prepara los datos para el modelo multimodal
+            # Necesitamos pasar el prompt y el archivo PDF como partes separadas.
+            pdf_file_data = {
+                'mime_type': 'application/pdf', # Especifica el tipo MIME del archivo
+                'data': pdf_content           # El contenido binario del PDF
+            }
 
-        # El contenido que se envía es una lista: [prompt_texto, archivo_pdf]
-        contents = [system_prompt, pdf_file_data]
+            # El contenido que se envía es una lista: [prompt_texto, archivo_pdf]
+            contents = [system_prompt, pdf_file_data]
 
         # Realiza la llamada a la API
         # Ajusta los parámetros de generación si es necesario (temperature, top_p, etc.)
@@ -80,7 +152,14 @@ async def _call_gemini_api(pdf_content: bytes, system_prompt: str, api_key: str)
         # Nota: Forzar response_mime_type="application/json" puede ser útil,
         # pero también podemos confiar en que el prompt pida JSON explícitamente.
         # Lo dejaremos comentado por ahora y confiaremos en el prompt.
-        response = model.generate_content(contents) # , generation_config=generation_config)
+        # Usamos la variante asíncrona para no bloquear el event loop del worker
+        # durante la llamada. Cada intento (incluidos reintentos y solicitudes cubiertas)
+        # ocupa un lugar del límite de llamadas simultáneas de gemini_caller.
+        async def generate_once():
+            return await model.generate_content_async(contents) # , generation_config=generation_config)
+
+        # Plazos, reintentos con backoff, disyuntor y hedging (ver gemini_resilience.py)
+        response = await gemini_caller.call(generate_once)
 
         print("Respuesta recibida de Gemini.")
 
@@ -103,6 +182,9 @@ async def _call_gemini_api(pdf_content: bytes, system_prompt: str, api_key: str)
         analysis_result_dict = json.loads(response_text)
         return analysis_result_dict
 
+    except HTTPException:
+        # Errores ya traducidos por la capa de resiliencia (503 disyuntor abierto, 504 timeout)
+        raise
     except json.JSONDecodeError as json_err:
         print(f"Error: La respuesta de Gemini no es un JSON válido. Error: {json_err}")
         print(f"Respuesta recibida:\n{response.text}") # Imprime la respuesta completa para depurar
@@ -125,55 +207,140 @@ async def _call_gemini_api(pdf_content: bytes, system_prompt: str, api_key: str)
             detail=f"Error al comunicarse con el servicio de IA: {error_detail}"
         )
 
+def _apply_court_resolution(analysis: AnalysisResponse) -> AnalysisResponse:
+    """
+    Completa código, email y departamento del juzgado a partir del nombre devuelto
+    por el modelo, usando la tabla local de juzgados (codigos.json).
+    Si el nombre no coincide con ningún juzgado, esos campos quedan en None.
+    """
+    juzgado = resolve_court(analysis.nombre_juzgado)
+    if juzgado is None:
+        analysis.codigo_juzgado = None
+        analysis.email_juzgado = None
+        analysis.departamento_juzgado = None
+        return analysis
+    analysis.codigo_juzgado = juzgado.codigo
+    analysis.nombre_juzgado = juzgado.nombre
+    analysis.email_juzgado = juzgado.email
+    analysis.departamento_juzgado = juzgado.departamento
+    return analysis
+
 # --- Servicio Principal ---
 
-async def analyze_pdf_document(pdf_file: UploadFile) -> AnalysisResponse:
+async def analyze_pdf_document(
+    pdf_file: UploadFile,
+    db: Optional[Session] = None
+) -> Tuple[AnalysisResponse, Dict[str, str]]:
     """
     Servicio principal para analizar un documento PDF usando Gemini Multimodal.
 
-    Lee el archivo, lo envía directamente a la API de Gemini y valida la respuesta.
+    Lee el archivo por bloques (con tamaño máximo), busca el resultado en la caché de
+    análisis y, si no existe, lo envía directamente a la API de Gemini, valida la
+    respuesta y la guarda en caché.
 
     Args:
         pdf_file (UploadFile): El objeto del archivo PDF subido.
+        db (Optional[Session]): Sesión de base de datos para la caché. Si es None,
+            se analiza siempre sin consultar ni guardar en caché.
 
     Returns:
-        AnalysisResponse: Un objeto Pydantic con los datos del análisis validados.
+        Tuple[AnalysisResponse, Dict[str, str]]: El análisis validado y metadatos
+            del procesamiento (ej. {"cache": "MISS", "input_mode": "text"}).
 
     Raises:
         HTTPException: Si ocurre algún error durante el proceso.
     """
+    # 1. Leer el PDF por bloques: tamaño acotado (413) y SHA-256 calculado al vuelo.
+    # El contenido completo solo se carga en memoria si hay que llamar a Gemini.
+    upload = await spool_upload(pdf_file)
     try:
-        # 1. Leer contenido del archivo PDF (como bytes)
-        pdf_content = await pdf_file.read()
-        if not pdf_content:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="El archivo PDF está vacío o no se pudo leer."
-            )
-        print(f"Archivo PDF leído. Tamaño: {len(pdf_content)} bytes.")
-    except Exception as e:
-        print(f"Error al leer el archivo UploadFile: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"No se pudo leer el archivo PDF subido: {e}"
+        return await _analyze_pdf(
+            upload.sha256,
+            lambda: run_in_threadpool(upload.read_bytes),
+            db=db
         )
     finally:
-        await pdf_file.close() # Cierra el archivo
+        upload.close()
+
+
+async def analyze_pdf_bytes(
+    pdf_content: bytes,
+    db: Optional[Session] = None
+) -> Tuple[AnalysisResponse, Dict[str, str]]:
+    """
+    Analiza el contenido binario de un PDF ya leído (ver `analyze_pdf_document`).
+    """
+    async def load_pdf() -> bytes:
+        return pdf_content
+    return await _analyze_pdf(hashlib.sha256(pdf_content).hexdigest(), load_pdf, db=db)
+
+
+async def _analyze_pdf(
+    pdf_sha256: str,
+    load_pdf: Callable[[], Awaitable[bytes]],
+    db: Optional[Session] = None
+) -> Tuple[AnalysisResponse, Dict[str, str]]:
+    """
+    Núcleo del análisis: caché, llamada a Gemini, validación, resolución del juzgado
+    y cruce con los identificadores extraídos localmente.
+    `load_pdf` solo se invoca si el resultado no está en caché.
+    """
+    metadata: Dict[str, str] = {}
 
     # 2. Obtener configuración (API Key y Prompt)
     api_key = settings.GEMINI_API_KEY
     system_prompt = settings.GEMINI_SYSTEM_PROMPT # Cargado desde prompt.txt
+    cache_key = {
+        "pdf_sha256": pdf_sha256,
+        "prompt_hash": PROMPT_HASH,
+        "model_name": settings.GEMINI_MODEL_NAME,
+    }
 
-    # 3. Llamar a la API de Gemini Multimodal (maneja excepciones internamente)
+    # 3. Buscar en la caché (las consultas sync van al threadpool para no bloquear el loop)
+    if db is not None:
+        try:
+            cached = await run_in_threadpool(crud_analysis_cache.get_cached_result, db, **cache_key)
+        except Exception as e:
+            # Un fallo de la caché no debe impedir el análisis
+            print(f"Advertencia: no se pudo consultar la caché de análisis: {e}")
+            db.rollback()
+            cached = None
+        if cached is not None:
+            try:
+                analysis_response = merge_identifiers(_apply_court_resolution(AnalysisResponse(**cached)), None)
+                print(f"Análisis obtenido de la caché (PDF {cache_key['pdf_sha256'][:12]}...).")
+                metadata["cache"] = "HIT"
+                return analysis_response, metadata
+            except ValidationError as val_err:
+                # Entrada incompatible con el esquema actual: se ignora y se vuelve a analizar
+                print(f"Advertencia: entrada de caché inválida, se ignora. Errores: {val_err.errors()}")
+        metadata["cache"] = "MISS"
+
+    # 4. Llamar a la API de Gemini Multimodal (maneja excepciones internamente)
     # Pasamos los bytes del PDF directamente
-    analysis_result_dict = await _call_gemini_api(pdf_content, system_prompt, api_key)
+    pdf_content = await load_pdf()
+    # Si el PDF es digital y su capa de texto es buena, se envía solo el texto (menos datos y latencia)
+    document_text = await run_in_threadpool(_extract_text_layer, pdf_content)
+    use_text = settings.PDF_TEXT_FAST_PATH_ENABLED and document_text is not None
+    metadata["input_mode"] = "text" if use_text else "pdf"
+    gemini_call = _call_gemini_api(pdf_content, system_prompt, api_key, document_text=document_text if use_text else None)
+    if document_text is not None:
+        # La extracción local de C.I., IUE, oficio y CVE corre en paralelo con la llamada a Gemini
+        analysis_result_dict, extracted = await asyncio.gather(
+            gemini_call, run_in_threadpool(extract_identifiers, document_text)
+        )
+    else:
+        analysis_result_dict, extracted = await gemini_call, None
 
-    # 4. Validar la respuesta JSON con el esquema Pydantic
+    # 5. Validar la respuesta JSON con el esquema Pydantic
     try:
         # Crea una instancia del modelo Pydantic desde el diccionario devuelto por Gemini.
         analysis_response = AnalysisResponse(**analysis_result_dict)
         print("Respuesta de Gemini validada correctamente con el esquema Pydantic.")
-        return analysis_response
+        # El modelo solo devuelve el nombre del juzgado; el resto se resuelve localmente
+        analysis_response = _apply_court_resolution(analysis_response)
+        # Los identificadores extraídos del texto prevalecen sobre los del modelo
+        analysis_response = merge_identifiers(analysis_response, extracted)
     except ValidationError as val_err:
         # Si la validación falla
         print(f"Error: La respuesta de Gemini no cumple con el esquema AnalysisResponse. Errores: {val_err.errors()}")
@@ -190,3 +357,74 @@ async def analyze_pdf_document(pdf_file: UploadFile) -> AnalysisResponse:
             detail="Error interno al procesar la respuesta del análisis."
         )
 
+    # 6. Guardar el resultado validado en la caché
+    if db is not None:
+        try:
+            await run_in_threadpool(
+                crud_analysis_cache.store_result, db,
+                result=analysis_response.model_dump(mode="json"), **cache_key
+            )
+        except Exception as e:
+            print(f"Advertencia: no se pudo guardar el análisis en caché: {e}")
+            db.rollback()
+
+    return analysis_response, metadata
+
+
+# --- Servicio de Análisis por Lotes ---
+
+async def _analyze_batch_item(
+    filename: str,
+    upload: SpooledUpload,
+    semaphore: asyncio.Semaphore
+) -> Dict[str, Any]:
+    """
+    Analiza un documento de un lote y devuelve su línea de resultado.
+    Nunca lanza excepciones: un error se informa en la propia línea.
+    """
+    async with semaphore:
+        # Cada documento usa su propia sesión: una Session no puede compartirse entre tareas concurrentes
+        db = SessionLocal()
+        try:
+            analysis, metadata = await _analyze_pdf(
+                upload.sha256, lambda: run_in_threadpool(upload.read_bytes), db=db
+            )
+            return {"filename": filename, "status": "ok", **metadata, "result": analysis.model_dump(mode="json")}
+        except HTTPException as http_exc:
+            return {"filename": filename, "status": "error", "status_code": http_exc.status_code, "error": http_exc.detail}
+        except Exception as e:
+            print(f"Error inesperado al analizar '{filename}' del lote: {e}")
+            return {"filename": filename, "status": "error", "status_code": 500, "error": f"Error interno inesperado: {e}"}
+        finally:
+            db.close()
+            upload.close()
+
+
+async def analyze_pdf_batch(documents: List[Tuple[str, SpooledUpload]]) -> AsyncIterator[str]:
+    """
+    Analiza varios PDFs en paralelo (hasta ANALYSIS_BATCH_CONCURRENCY a la vez) y
+    produce una línea NDJSON por documento en cuanto termina, en orden de finalización.
+    Un documento lento o con error no retrasa al resto del lote.
+
+    Args:
+        documents (List[Tuple[str, SpooledUpload]]): Pares (nombre de archivo, PDF ya leído).
+            Cada archivo temporal se cierra al terminar su análisis.
+
+    Yields:
+        str: Una línea JSON con filename, status y el AnalysisResponse o el error.
+    """
+    semaphore = asyncio.Semaphore(settings.ANALYSIS_BATCH_CONCURRENCY)
+    tasks = [
+        asyncio.create_task(_analyze_batch_item(filename, upload, semaphore))
+        for filename, upload in documents
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            item = await next_done
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+    finally:
+        # Si el cliente se desconecta, no seguimos gastando llamadas a Gemini
+        for task in tasks:
+            task.cancel()
+        for _, upload in documents:
+            upload.close()
@@ -0,0 +1,204 @@
+# app/services/court_resolver.py
+import json
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from app.core.config import settings # Ruta de codigos.json y umbral de similitud
+
+# --- Normalización de Nombres de Juzgados ---
+
+# Ordinales numéricos con sufijo ("1°", "2º", "3ª", "1er", "2do") -> solo el número
+_ORDINAL_NUMERICO_RE = re.compile(r"(\d+)\s*(?:[°ºª]|(?:er|ero|era|ro|ra|do|da|to|ta|mo|ma|vo|va|no|na)\b)")
+
+# Ordinales escritos -> número (se aplica después de quitar acentos)
+_ORDINALES_ESCRITOS = {
+    "primer": "1", "primero": "1", "primera": "1",
+    "segundo": "2", "segunda": "2",
+    "tercer": "3", "tercero": "3", "tercera": "3",
+    "cuarto": "4", "cuarta": "4",
+    "quinto": "5", "quinta": "5",
+    "sexto": "6", "sexta": "6",
+    "septimo": "7", "septima": "7", "setimo": "7", "setima": "7",
+    "octavo": "8", "octava": "8",
+    "noveno": "9", "novena": "9",
+    "decimo": "10", "decima": "10",
+}
+
+# Abreviaturas habituales en los nombres de juzgados
+_ABREVIATURAS = {
+    "jdo": "juzgado",
+    "jdos": "juzgados",
+    "ldo": "letrado",
+    "dptal": "departamental",
+    "dep": "departamental",
+    "inst": "instancia",
+    "ejec": "ejecucion",
+    "vig": "vigilancia",
+    "esp": "especializado",
+    "sec": "seccion",
+    "t": "turno",
+}
+
+# Palabras que no aportan a la identificación del juzgado
+_PALABRAS_VACIAS = {"de", "del", "la", "el", "en", "lo", "los"}
+
+# "Primera Instancia" casi nunca figura en la tabla; se descarta para que su "1" no
+# se confunda con el número de turno
+_PRIMERA_INSTANCIA_RE = re.compile(r"\b1 instancia\b")
+
+# Una palabra presente en más de esta fracción de la tabla se considera genérica
+# ("juzgado", "letrado", "turno"...) y no cuenta para la similitud del lugar
+_FRACCION_PALABRA_GENERICA = 0.1
+
+
+def normalize_court_name(name: str) -> str:
+    """
+    Normaliza el nombre de un juzgado para poder compararlo:
+    minúsculas, sin acentos, ordinales como números ("1°" y "Primer" -> "1"),
+    abreviaturas expandidas y espacios colapsados.
+    """
+    text = name.lower()
+    # Los ordinales se resuelven antes de quitar acentos, porque NFKD convierte "º"/"ª" en letras
+    text = _ORDINAL_NUMERICO_RE.sub(r"\1 ", text)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+
+    tokens = []
+    for token in text.split():
+        token = _ORDINALES_ESCRITOS.get(token, token)
+        token = _ABREVIATURAS.get(token, token)
+        if token not in _PALABRAS_VACIAS:
+            tokens.append(token)
+    return " ".join(_PRIMERA_INSTANCIA_RE.sub(" ", " ".join(tokens)).split())
+
+
+def _trigrams(text: str) -> Set[str]:
+    """Conjunto de trigramas de caracteres (con relleno, al estilo de pg_trgm)."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _numbers(text: str) -> Set[str]:
+    """Números presentes en un nombre normalizado (turno, sección, etc.)."""
+    return {token for token in text.split() if token.isdigit()}
+
+
+def _dice(a: Set[str], b: Set[str]) -> float:
+    """Coeficiente de Dice entre dos conjuntos de trigramas."""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+# --- Tabla de Juzgados en Memoria ---
+
+class JuzgadoEntry(NamedTuple):
+    """Fila de la tabla de juzgados (codigos.json), ya limpia."""
+    codigo: int
+    nombre: str
+    email: Optional[str]
+    departamento: str
+
+
+class _FuzzyKey(NamedTuple):
+    trigrams: Set[str] # trigramas del nombre completo
+    place_trigrams: Set[str] # trigramas de las palabras distintivas (lugar, materia)
+    numbers: Set[str] # turno, sección, etc.
+
+
+class _CourtIndex(NamedTuple):
+    entries: List[JuzgadoEntry]
+    exact: Dict[str, JuzgadoEntry] # nombre normalizado -> entrada
+    fuzzy: List[Tuple[JuzgadoEntry, _FuzzyKey]]
+    generic_words: Set[str]
+
+
+def _fuzzy_key(normalized: str, generic_words: Set[str]) -> _FuzzyKey:
+    distinctive = " ".join(
+        token for token in normalized.split()
+        if token not in generic_words and not token.isdigit()
+    )
+    return _FuzzyKey(_trigrams(normalized), _trigrams(distinctive) if distinctive else set(), _numbers(normalized))
+
+
+@lru_cache(maxsize=1)
+def get_court_index() -> _CourtIndex:
+    """
+    Carga codigos.json y construye el índice en memoria (una vez por proceso).
+    """
+    with open(settings.JUZGADOS_FILE_PATH, "r", encoding="utf-8") as f:
+        raw_entries = json.load(f)
+
+    entries: List[JuzgadoEntry] = []
+    exact: Dict[str, JuzgadoEntry] = {}
+    normalized_names: List[str] = []
+    word_counts: Dict[str, int] = {}
+    for raw in raw_entries:
+        entry = JuzgadoEntry(
+            codigo=int(raw["Codigo"]),
+            nombre=" ".join(str(raw["Juzgado"]).split()),
+            email=(raw.get("Email") or "").strip() or None,
+            departamento=" ".join(str(raw["Departamento"]).split()),
+        )
+        entries.append(entry)
+        normalized = normalize_court_name(entry.nombre)
+        normalized_names.append(normalized)
+        # Ante nombres repetidos, conserva la primera entrada con email
+        if normalized not in exact or (exact[normalized].email is None and entry.email):
+            exact[normalized] = entry
+        for word in set(normalized.split()):
+            word_counts[word] = word_counts.get(word, 0) + 1
+
+    generic_words = {
+        word for word, count in word_counts.items()
+        if count > _FRACCION_PALABRA_GENERICA * len(entries)
+    }
+    fuzzy = [
+        (entry, _fuzzy_key(normalized, generic_words))
+        for entry, normalized in zip(entries, normalized_names)
+    ]
+
+    print(f"DEBUG (CourtResolver): {len(entries)} juzgados cargados desde {settings.JUZGADOS_FILE_PATH}")
+    return _CourtIndex(entries=entries, exact=exact, fuzzy=fuzzy, generic_words=generic_words)
+
+
+def resolve_court(name: Optional[str]) -> Optional[JuzgadoEntry]:
+    """
+    Busca el juzgado que mejor coincide con un nombre libre (tal como aparece en el oficio).
+
+    Primero intenta una coincidencia exacta del nombre normalizado y, si no la hay,
+    usa similitud de trigramas: la mitad del puntaje viene del nombre completo y la otra
+    mitad de las palabras distintivas (lugar, materia), para que "Letrado de Pando" no
+    coincida con "Letrado de Montevideo". Un candidato cuyo número de turno/sección
+    no coincide se penaliza, para no confundir "1° Turno" con "2° Turno".
+
+    Args:
+        name (Optional[str]): Nombre del juzgado devuelto por el modelo.
+
+    Returns:
+        Optional[JuzgadoEntry]: La entrada encontrada, o None si ninguna supera
+            el umbral JUZGADO_MATCH_THRESHOLD.
+    """
+    if not name or not name.strip():
+        return None
+    index = get_court_index()
+    normalized = normalize_court_name(name)
+    if normalized in index.exact:
+        return index.exact[normalized]
+
+    query = _fuzzy_key(normalized, index.generic_words)
+    best_entry, best_score = None, 0.0
+    for entry, key in index.fuzzy:
+        score = 0.5 * _dice(query.trigrams, key.trigrams) + 0.5 * _dice(query.place_trigrams, key.place_trigrams)
+        if query.numbers != key.numbers:
+            score *= 0.5
+        if score > best_score:
+            best_entry, best_score = entry, score
+
+    if best_score >= settings.JUZGADO_MATCH_THRESHOLD:
+        return best_entry
+    print(f"Advertencia: no se encontró juzgado para '{name}' (mejor similitud: {best_score:.2f}).")
+    return None
@@ -0,0 +1,52 @@
+# app/services/expediente_export.py
+import csv
+import io
+import json
+from datetime import date
+from typing import Any, AsyncIterator, Dict, List
+
+from app.core.config import settings
+from app.crud import crud_expediente
+from app.db.session import AsyncSessionLocal
+from app.schemas.expediente import ExpedienteFilters
+from app.services.expediente_import import FORMAT_CSV, FORMAT_NDJSON
+
+MEDIA_TYPES = {
+    FORMAT_CSV: "text/csv; charset=utf-8",
+    FORMAT_NDJSON: "application/x-ndjson",
+}
+
+
+def _to_text(value: Any) -> Any:
+    """Fechas en ISO 8601 (igual que la API); el resto sin cambios."""
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def _format_csv(rows: List[Dict[str, Any]], header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(crud_expediente.EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow(["" if row[column] is None else _to_text(row[column]) for column in crud_expediente.EXPORT_COLUMNS])
+    return buffer.getvalue()
+
+
+def _format_ndjson(rows: List[Dict[str, Any]]) -> str:
+    return "".join(
+        json.dumps({column: _to_text(row[column]) for column in crud_expediente.EXPORT_COLUMNS}, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+async def export_expedientes(filters: ExpedienteFilters, file_format: str) -> AsyncIterator[str]:
+    """
+    Genera la exportación por partes, a medida que llegan las filas del cursor del
+    servidor. Usa su propia sesión, que vive mientras dure la respuesta (la de la
+    dependencia de la solicitud puede cerrarse antes de empezar a enviarla).
+    """
+    if file_format == FORMAT_CSV:
+        yield _format_csv([], header=True) # El encabezado sale antes de la primera consulta
+    async with AsyncSessionLocal() as db:
+        async for rows in crud_expediente.stream_expedientes(db, filters, batch_size=settings.EXPEDIENTES_EXPORT_BATCH_SIZE):
+            yield _format_csv(rows, header=False) if file_format == FORMAT_CSV else _format_ndjson(rows)
@@ -0,0 +1,140 @@
+# app/services/expediente_import.py
+import codecs
+import csv
+import itertools
+import json
+from typing import Any, BinaryIO, Dict, Iterator, List, Tuple, Union
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud import crud_expediente
+from app.schemas.expediente import ExpedienteBulkError, ExpedienteBulkResult, ExpedienteCreate
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+
+# (número de fila, registro leído o mensaje de error de lectura)
+_Record = Tuple[int, Union[Dict[str, Any], str]]
+
+
+def detect_format(filename: str, content_type: str) -> str:
+    """Deduce el formato por la extensión o el Content-Type (CSV por defecto)."""
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in (content_type or "") or "jsonlines" in (content_type or ""):
+        return FORMAT_NDJSON
+    return FORMAT_CSV
+
+
+def _iter_records(file: BinaryIO, file_format: str) -> Iterator[_Record]:
+    """
+    Lee el archivo de a una fila (sin cargarlo entero). En CSV, las celdas vacías se
+    omiten para que cuenten como "no informado" y no pisen datos al actualizar.
+    """
+    lines = codecs.iterdecode(file, "utf-8-sig")
+    if file_format == FORMAT_NDJSON:
+        row_number = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield row_number, f"JSON inválido: {e}"
+                continue
+            yield row_number, record if isinstance(record, dict) else "Cada línea debe ser un objeto JSON."
+    else:
+        row_number = 0
+        reader = csv.DictReader(lines)
+        try:
+            for row_number, row in enumerate(reader, start=1):
+                yield row_number, {
+                    key.strip(): value.strip() for key, value in row.items()
+                    if key and isinstance(value, str) and value.strip()
+                }
+        except csv.Error as e:
+            # Un CSV mal formado no permite seguir leyendo de forma confiable
+            yield row_number + 1, f"CSV inválido, se detuvo la lectura: {e}"
+
+
+def _read_chunk(records: Iterator[_Record]) -> List[Tuple[int, Union[Dict[str, Any], ExpedienteBulkError]]]:
+    """Lee y valida el siguiente lote de filas (función síncrona)."""
+    return [
+        (row_number, _validate(row_number, record))
+        for row_number, record in itertools.islice(records, settings.EXPEDIENTES_BULK_CHUNK_SIZE)
+    ]
+
+
+def _validate(row_number: int, record: Union[Dict[str, Any], str]) -> Union[Dict[str, Any], ExpedienteBulkError]:
+    """Valida un registro con ExpedienteCreate y deja solo los campos informados."""
+    if isinstance(record, str):
+        return ExpedienteBulkError(row=row_number, error=record)
+    nro = record.get("expediente_nro")
+    try:
+        expediente = ExpedienteCreate.model_validate(record)
+    except ValidationError as e:
+        errors = "; ".join(f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors())
+        return ExpedienteBulkError(row=row_number, expediente_nro=str(nro) if nro is not None else None, error=errors)
+    return expediente.model_dump(include=expediente.model_fields_set | {"expediente_nro"})
+
+
+async def import_expedientes(db: AsyncSession, file: BinaryIO, file_format: str) -> ExpedienteBulkResult:
+    """
+    Importa expedientes desde un archivo CSV o NDJSON, por lotes de
+    EXPEDIENTES_BULK_CHUNK_SIZE filas: cada lote es un INSERT ... ON CONFLICT de varias
+    filas en su propia transacción. Una fila inválida o un lote que falla en la base de
+    datos se informan en `errors` sin detener el resto de la importación.
+    """
+    result = ExpedienteBulkResult(received=0, inserted=0, updated=0, failed=0)
+
+    def add_error(error: ExpedienteBulkError) -> None:
+        result.failed += 1
+        if len(result.errors) < settings.EXPEDIENTES_BULK_MAX_ERRORS:
+            result.errors.append(error)
+
+    records = _iter_records(file, file_format)
+    while True:
+        # La lectura y validación de cada lote es CPU/disco: se hace fuera del event loop
+        try:
+            chunk = await run_in_threadpool(_read_chunk, records)
+        except UnicodeDecodeError as e:
+            add_error(ExpedienteBulkError(row=result.received + 1, error=f"El archivo debe estar en UTF-8; se detuvo la lectura ({e.reason})."))
+            break
+        if not chunk:
+            break
+        result.received += len(chunk)
+
+        # Si un expediente_nro se repite en el lote, prevalece la última fila
+        rows: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        for row_number, validated in chunk:
+            if isinstance(validated, ExpedienteBulkError):
+                add_error(validated)
+                continue
+            nro = validated["expediente_nro"]
+            if nro in rows:
+                add_error(ExpedienteBulkError(
+                    row=rows[nro][0], expediente_nro=nro,
+                    error=f"expediente_nro repetido; se usó la fila {row_number}."
+                ))
+            rows[nro] = (row_number, validated)
+        if not rows:
+            continue
+
+        try:
+            inserted, updated, unchanged = await crud_expediente.upsert_expedientes(db, [values for _, values in rows.values()])
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            print(f"Error al importar un lote de {len(rows)} expedientes: {e}")
+            for nro, (row_number, _) in rows.items():
+                add_error(ExpedienteBulkError(row=row_number, expediente_nro=nro, error=f"Error de base de datos: {e.__class__.__name__}"))
+            continue
+        result.inserted += inserted
+        result.updated += updated
+        result.unchanged += unchanged
+
+    result.errors.sort(key=lambda error: error.row)
+    return result
@@ -0,0 +1,285 @@
+# app/services/gemini_resilience.py
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# Códigos HTTP de error de Gemini que vale la pena reintentar (cuota, errores del servidor)
+_RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Muestras de latencia usadas para estimar el p95 (umbral de las solicitudes cubiertas)
+_LATENCY_SAMPLES = 200
+_MIN_SAMPLES_FOR_P95 = 20
+
+
+class LocalQueueTimeout(Exception):
+    """Se agotó el plazo total esperando un lugar libre en este worker (no es un fallo de Gemini)."""
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """
+    Indica si un error de la llamada a Gemini es transitorio.
+    Las excepciones de google.api_core exponen el código HTTP en `code`.
+    """
+    if isinstance(exc, asyncio.TimeoutError):
+        return True
+    code = getattr(exc, "code", None)
+    code = getattr(code, "value", code) # Algunas versiones usan un enum
+    return isinstance(code, int) and code in _RETRYABLE_STATUS_CODES
+
+
+class CircuitBreaker:
+    """
+    Disyuntor simple: tras `failure_threshold` fallos seguidos se abre y rechaza
+    llamadas durante `reset_timeout` segundos; luego deja pasar una sola de prueba
+    (semiabierto), rechaza las demás mientras esa está en curso, y se cierra si tiene
+    éxito o se vuelve a abrir si falla.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self.probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        """
+        Indica si la llamada puede hacerse. En semiabierto, la primera llamada pasa a ser
+        la de prueba (quien la hace debe llamar a release_probe al terminar).
+        """
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open" or self.probe_in_flight:
+            return False
+        self.probe_in_flight = True
+        return True
+
+    def release_probe(self) -> None:
+        """Libera la llamada de prueba al terminar, haya tenido éxito o no."""
+        self.probe_in_flight = False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        # En semiabierto basta un fallo (el de la llamada de prueba) para volver a abrir
+        if self.state == "half_open" or (self.opened_at is None and self.consecutive_failures >= self.failure_threshold):
+            self.times_opened += 1
+            self.opened_at = time.monotonic()
+
+
+class ResilientCaller:
+    """
+    Envuelve una llamada asíncrona con plazos (total y por intento), reintentos con
+    backoff exponencial y jitter, disyuntor y, opcionalmente, solicitudes cubiertas
+    (hedging): si un intento no respondió al llegar al p95 de latencia, se lanza un
+    segundo en paralelo y se usa el primero que termine bien.
+
+    Con `max_concurrent`, cada intento espera un lugar libre antes de empezar. La espera
+    en esa cola local no cuenta para el plazo del intento, el disyuntor, el p95 ni la
+    cobertura: solo la llamada en sí (la cola sí consume el plazo total).
+    """
+
+    def __init__(self, name: str, max_concurrent: Optional[int] = None):
+        self.name = name
+        self._limiter = asyncio.Semaphore(max_concurrent) if max_concurrent else None
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.GEMINI_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.GEMINI_BREAKER_RESET_TIMEOUT,
+        )
+        self._latencies: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+        self._counters: Dict[str, int] = {
+            "calls": 0, "successes": 0, "failures": 0, "attempts": 0, "retries": 0,
+            "timeouts": 0, "queue_timeouts": 0, "rejected_by_breaker": 0, "hedges_started": 0, "hedges_won": 0,
+        }
+
+    # --- Métricas ---
+
+    def _latency_percentile(self, fraction: float) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def hedge_delay(self) -> float:
+        """Espera antes de cubrir un intento: p95 observado, o el valor por defecto si hay pocas muestras."""
+        if len(self._latencies) < _MIN_SAMPLES_FOR_P95:
+            return settings.GEMINI_HEDGE_DELAY_DEFAULT
+        return self._latency_percentile(0.95)
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado del disyuntor, contadores y latencias (segundos) de este proceso."""
+        return {
+            "name": self.name,
+            "breaker_state": self.breaker.state,
+            "breaker_times_opened": self.breaker.times_opened,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "breaker_probe_in_flight": self.breaker.probe_in_flight,
+            **self._counters,
+            "latency_p50": self._latency_percentile(0.50),
+            "latency_p95": self._latency_percentile(0.95),
+            "latency_p99": self._latency_percentile(0.99),
+            "hedging_enabled": settings.GEMINI_HEDGING_ENABLED,
+        }
+
+    # --- Llamada ---
+
+    @asynccontextmanager
+    async def _slot(self, deadline: float) -> AsyncIterator[None]:
+        """Espera un lugar libre en el limitador local, como mucho hasta `deadline`."""
+        if self._limiter is None:
+            yield
+            return
+        try:
+            await asyncio.wait_for(self._limiter.acquire(), timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            raise LocalQueueTimeout() from None
+        try:
+            yield
+        finally:
+            self._limiter.release()
+
+    async def _timed_attempt(
+        self,
+        make_attempt: Callable[[], Awaitable[T]],
+        deadline: float,
+        started_event: Optional[asyncio.Event] = None
+    ) -> T:
+        """Un intento: el plazo y la latencia se miden desde que obtiene su lugar."""
+        async with self._slot(deadline):
+            if started_event is not None:
+                started_event.set()
+            self._counters["attempts"] += 1
+            started = time.monotonic()
+            timeout = min(settings.GEMINI_ATTEMPT_TIMEOUT, deadline - started)
+            result = await asyncio.wait_for(make_attempt(), timeout=timeout)
+            self._latencies.append(time.monotonic() - started)
+            return result
+
+    async def _attempt_with_hedging(self, make_attempt: Callable[[], Awaitable[T]], deadline: float) -> T:
+        started_event = asyncio.Event()
+        primary = asyncio.ensure_future(self._timed_attempt(make_attempt, deadline, started_event))
+        pending = {primary}
+        try:
+            if not settings.GEMINI_HEDGING_ENABLED:
+                return await primary
+
+            # La espera para cubrir corre desde que el intento empezó, no desde que entró en la cola
+            started_waiter = asyncio.ensure_future(started_event.wait())
+            try:
+                await asyncio.wait({primary, started_waiter}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                started_waiter.cancel()
+            if primary.done():
+                return primary.result()
+
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_delay())
+            if done:
+                return primary.result()
+
+            self._counters["hedges_started"] += 1
+            hedge = asyncio.ensure_future(self._timed_attempt(make_attempt, deadline))
+            pending = {primary, hedge}
+            last_error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._counters["hedges_won"] += 1
+                        return task.result()
+                    # Si la cobertura no consiguió lugar, el error que importa es el del intento principal
+                    if last_error is None or not isinstance(task.exception(), LocalQueueTimeout):
+                        last_error = task.exception()
+            raise last_error
+        finally:
+            # Cancela el intento que quedó pendiente (o ambos, si venció el plazo)
+            for task in pending:
+                task.cancel()
+
+    async def call(self, make_attempt: Callable[[], Awaitable[T]]) -> T:
+        """
+        Ejecuta `make_attempt` con toda la política de resiliencia.
+
+        Raises:
+            HTTPException: 503 si el disyuntor está abierto (o en semiabierto con la
+                llamada de prueba en curso) o no hubo lugar libre antes del plazo total,
+                504 si los intentos no respondieron a tiempo, o la excepción original si
+                el error no es reintentable o se agotan los reintentos.
+        """
+        self._counters["calls"] += 1
+        is_probe = self.breaker.state == "half_open"
+        if not self.breaker.allow_request():
+            self._counters["rejected_by_breaker"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="El servicio de IA no está disponible temporalmente. Intente nuevamente en unos segundos."
+            )
+
+        try:
+            return await self._call_with_retries(make_attempt)
+        finally:
+            # La prueba terminó: si tuvo éxito el disyuntor ya está cerrado; si falló, abierto
+            if is_probe:
+                self.breaker.release_probe()
+
+    async def _call_with_retries(self, make_attempt: Callable[[], Awaitable[T]]) -> T:
+        deadline = time.monotonic() + settings.GEMINI_TOTAL_TIMEOUT
+        attempt = 0
+        while True:
+            try:
+                result = await self._attempt_with_hedging(make_attempt, deadline)
+                self.breaker.record_success()
+                self._counters["successes"] += 1
+                return result
+            except LocalQueueTimeout:
+                # El worker está saturado: Gemini no falló, así que no cuenta para el disyuntor
+                self._counters["queue_timeouts"] += 1
+                self._counters["failures"] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Hay demasiados análisis en curso. Intente nuevamente en unos segundos."
+                )
+            except Exception as exc:
+                if isinstance(exc, asyncio.TimeoutError):
+                    self._counters["timeouts"] += 1
+                retryable = is_retryable_error(exc)
+                # Solo los errores transitorios indican que el servicio está caído
+                if retryable:
+                    self.breaker.record_failure()
+                backoff = min(settings.GEMINI_BACKOFF_MAX, settings.GEMINI_BACKOFF_BASE * (2 ** attempt))
+                backoff = random.uniform(0, backoff) # Full jitter
+                out_of_time = time.monotonic() + backoff >= deadline
+                if not retryable or attempt >= settings.GEMINI_MAX_RETRIES or out_of_time or self.breaker.state != "closed":
+                    self._counters["failures"] += 1
+                    if isinstance(exc, asyncio.TimeoutError):
+                        raise HTTPException(
+                            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                            detail=f"El servicio de IA no respondió a tiempo ({attempt + 1} intentos)."
+                        )
+                    raise
+                attempt += 1
+                self._counters["retries"] += 1
+                print(f"Reintentando llamada a {self.name} (intento {attempt + 1}) en {backoff:.1f}s tras error: {exc}")
+                await asyncio.sleep(backoff)
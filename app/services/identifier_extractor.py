@@ -0,0 +1,157 @@
+# app/services/identifier_extractor.py
+import re
+from typing import List, NamedTuple, Optional
+
+from app.schemas.analysis import AnalysisResponse
+
+# --- Patrones Compilados ---
+
+# C.I. uruguaya: hasta 7 dígitos (con o sin puntos) y dígito verificador ("4.459.424-7", "4459424-7", "44594247")
+_CI_RE = re.compile(r"(?<![\d.])(\d{1,2}\.?\d{3}\.?\d{3})\s*[-‐–/]?\s*(\d)(?!\d)")
+# Contexto que indica que el número siguiente es una cédula
+_CI_CONTEXT_RE = re.compile(r"(?:C\.?\s*I\.?|c[ée]dula(?:\s+de\s+identidad)?|documento(?:\s+de\s+identidad)?)\s*(?:N[°ºo.]*\s*)?:?\s*$", re.IGNORECASE)
+# Formato inequívoco de C.I. aunque no tenga contexto: d.ddd.ddd-d
+_CI_FORMATTED_RE = re.compile(r"^\d{1,2}\.\d{3}\.\d{3}\s*[-‐–]\s*\d$")
+
+# IUE: "IUE 330-364/2024", "I.U.E. N° 2-12345/2023"
+_IUE_RE = re.compile(r"I\.?\s*U\.?\s*E\.?\s*(?:N[°ºo.]*\s*)?:?\s*(\d{1,4}\s*-\s*\d{1,7}\s*/\s*\d{4})", re.IGNORECASE)
+# Número de oficio: "Oficio N° 250/2025", "OFICIO Nro. 1234/24"
+_OFICIO_RE = re.compile(r"\bOficio\s*(?:N(?:ro|um)?[°ºo.]*\s*)?:?\s*(\d{1,6}\s*/\s*\d{2,4})", re.IGNORECASE)
+# CVE: "CVE: 00A1B2C3D4", "Código de Verificación Electrónica: ..."
+_CVE_RE = re.compile(
+    r"(?:\bCVE\b|C[óo]digo\s+de\s+Verificaci[óo]n\s+Electr[óo]nica)\s*(?:\(CVE\))?\s*(?:N[°ºo.]*\s*)?:?\s*([A-Za-z0-9](?:[A-Za-z0-9\-]{4,62}[A-Za-z0-9]))",
+    re.IGNORECASE
+)
+
+# Caracteres previos a un número que se examinan para buscar contexto de C.I.
+_CI_CONTEXT_WINDOW = 40
+
+
+class ExtractedIdentifiers(NamedTuple):
+    """Identificadores encontrados en el texto del oficio."""
+    cedulas: List[str] # Solo dígitos, con dígito verificador válido, sin repetir
+    iue: Optional[str]
+    numero_oficio: Optional[str]
+    cve: Optional[str]
+
+
+# --- Cédula de Identidad ---
+
+def normalize_ci(value: str) -> str:
+    """Deja solo los dígitos de una C.I. ("4.459.424-7" -> "44594247")."""
+    return re.sub(r"\D", "", value)
+
+
+def is_valid_ci(ci: str) -> bool:
+    """
+    Verifica el dígito verificador de una C.I. uruguaya (solo dígitos, 7 u 8 de largo).
+    Los dígitos base se ponderan con 2-9-8-7-6-3-4 y el verificador es el complemento a 10.
+    """
+    if not ci.isdigit() or not 7 <= len(ci) <= 8:
+        return False
+    base = ci[:-1].rjust(7, "0")
+    total = sum(int(digit) * weight for digit, weight in zip(base, (2, 9, 8, 7, 6, 3, 4)))
+    return (10 - total % 10) % 10 == int(ci[-1])
+
+
+# --- Extracción ---
+
+def _compact(value: str) -> str:
+    """Quita espacios internos ("330 - 364 / 2024" -> "330-364/2024")."""
+    return re.sub(r"\s+", "", value)
+
+
+def extract_identifiers(text: str) -> ExtractedIdentifiers:
+    """
+    Extrae C.I., IUE, número de oficio y CVE del texto de un oficio con patrones
+    compilados. Una C.I. solo se acepta si su dígito verificador es válido y, además,
+    va precedida de "C.I."/"cédula" o tiene el formato d.ddd.ddd-d.
+
+    Args:
+        text (str): Texto del oficio (capa de texto del PDF).
+
+    Returns:
+        ExtractedIdentifiers: Los identificadores encontrados (None/[] si no hay).
+    """
+    cedulas: List[str] = []
+    for match in _CI_RE.finditer(text):
+        raw = match.group(0).strip()
+        context = text[max(0, match.start() - _CI_CONTEXT_WINDOW):match.start()]
+        if not (_CI_CONTEXT_RE.search(context) or _CI_FORMATTED_RE.match(raw)):
+            continue
+        ci = normalize_ci(raw)
+        if is_valid_ci(ci) and ci not in cedulas:
+            cedulas.append(ci)
+
+    iue_match = _IUE_RE.search(text)
+    oficio_match = _OFICIO_RE.search(text)
+    cve_match = _CVE_RE.search(text)
+    return ExtractedIdentifiers(
+        cedulas=cedulas,
+        iue=_compact(iue_match.group(1)) if iue_match else None,
+        numero_oficio=_compact(oficio_match.group(1)) if oficio_match else None,
+        cve=cve_match.group(1).upper() if cve_match else None,
+    )
+
+
+# --- Combinación con la Respuesta del Modelo ---
+
+def _replace_or_append(asunto: str, pattern: re.Pattern, value: str, label: str) -> str:
+    """Corrige en el asunto el valor capturado por `pattern`, o lo añade si no aparece."""
+    match = pattern.search(asunto)
+    if match is None:
+        return f"{asunto.rstrip(' .')}, {label} {value}."
+    if _compact(match.group(1)) == value:
+        return asunto
+    return asunto[:match.start(1)] + value + asunto[match.end(1):]
+
+
+def merge_identifiers(analysis: AnalysisResponse, extracted: Optional[ExtractedIdentifiers]) -> AnalysisResponse:
+    """
+    Combina los identificadores extraídos localmente con los devueltos por el modelo.
+    Ante un desacuerdo, prevalece el valor extraído del texto.
+
+    - documentos_involucrados: primero las C.I. extraídas del texto y luego las del
+      modelo que no estén ya incluidas; se descartan las de dígito verificador inválido.
+    - documento_identidad de cada involucrado: se anula si su dígito verificador es inválido.
+    - iue / numero_oficio: se toman del texto y se corrigen dentro de asunto_principal.
+      Sin texto, se derivan del propio asunto_principal.
+    - cve: el extraído reemplaza al del modelo.
+    """
+    model_cis = [ci for ci in analysis.documentos_involucrados if is_valid_ci(ci)]
+    discarded = set(analysis.documentos_involucrados) - set(model_cis)
+    if discarded:
+        print(f"Advertencia: C.I. con dígito verificador inválido descartadas: {sorted(discarded)}")
+
+    # Las extraídas ya tienen dígito verificador válido y van primero
+    cedulas = list(extracted.cedulas) if extracted is not None else []
+    cedulas.extend(ci for ci in model_cis if ci not in cedulas)
+    analysis.documentos_involucrados = cedulas
+
+    for accion in analysis.acciones_detalladas:
+        for involucrado in accion.involucrados_accion:
+            if involucrado.documento_identidad and not is_valid_ci(involucrado.documento_identidad):
+                print(f"Advertencia: C.I. de '{involucrado.nombre_completo}' con dígito verificador inválido descartada: {involucrado.documento_identidad}")
+                involucrado.documento_identidad = None
+
+    if extracted is not None:
+        if extracted.iue:
+            analysis.iue = extracted.iue
+            analysis.asunto_principal = _replace_or_append(analysis.asunto_principal, _IUE_RE, extracted.iue, "IUE")
+        if extracted.numero_oficio:
+            analysis.numero_oficio = extracted.numero_oficio
+            analysis.asunto_principal = _replace_or_append(analysis.asunto_principal, _OFICIO_RE, extracted.numero_oficio, "Oficio N°")
+
+    # Sin valor extraído del texto, se derivan del asunto redactado por el modelo
+    if analysis.iue is None:
+        iue_match = _IUE_RE.search(analysis.asunto_principal)
+        analysis.iue = _compact(iue_match.group(1)) if iue_match else None
+    if analysis.numero_oficio is None:
+        oficio_match = _OFICIO_RE.search(analysis.asunto_principal)
+        analysis.numero_oficio = _compact(oficio_match.group(1)) if oficio_match else None
+
+    if extracted is not None and extracted.cve:
+        if analysis.cve and analysis.cve.upper() != extracted.cve:
+            print(f"Advertencia: CVE del modelo '{analysis.cve}' reemplazado por el extraído '{extracted.cve}'.")
+        analysis.cve = extracted.cve
+    return analysis
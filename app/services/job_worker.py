@@ -0,0 +1,128 @@
+# app/services/job_worker.py
+import asyncio
+from typing import List, Optional
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.crud import crud_analysis_job
+from app.services.analysis_service import analyze_pdf_bytes
+
+# Tareas consumidoras activas en este proceso (una lista por worker de gunicorn)
+_worker_tasks: List[asyncio.Task] = []
+
+
+def _extend_lease(job) -> bool:
+    """Extiende la reserva del trabajo con una sesión propia (la del análisis sigue en uso)."""
+    db = SessionLocal()
+    try:
+        return crud_analysis_job.extend_job_lease(
+            db, job, visibility_timeout_seconds=settings.ANALYSIS_JOB_VISIBILITY_TIMEOUT
+        )
+    finally:
+        db.close()
+
+
+async def _keep_lease(job) -> None:
+    """
+    Latido: mientras el análisis sigue en curso, renueva la reserva cada tercio del tiempo
+    de visibilidad, para que un análisis lento (reintentos de Gemini) no la pierda.
+    """
+    interval = settings.ANALYSIS_JOB_VISIBILITY_TIMEOUT / 3
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if not await run_in_threadpool(_extend_lease, job):
+                print(f"Advertencia: el trabajo de análisis {job.id} ya no pertenece a este worker.")
+                return
+        except Exception as e:
+            # Si la base de datos no responde, se reintenta en el próximo latido
+            print(f"Error al renovar la reserva del trabajo de análisis {job.id}: {e}")
+
+
+async def _process_one_job() -> bool:
+    """
+    Reclama y procesa un trabajo de la cola.
+
+    Returns:
+        bool: True si se procesó un trabajo, False si la cola estaba vacía.
+    """
+    db = SessionLocal()
+    try:
+        job = await run_in_threadpool(
+            crud_analysis_job.claim_next_job, db,
+            visibility_timeout_seconds=settings.ANALYSIS_JOB_VISIBILITY_TIMEOUT
+        )
+        if job is None:
+            return False
+
+        print(f"Trabajo de análisis {job.id} reclamado (intento {job.attempts}/{job.max_attempts}).")
+        heartbeat = asyncio.create_task(_keep_lease(job))
+        try:
+            analysis, _ = await analyze_pdf_bytes(job.pdf_content or b"", db=db)
+        except Exception as e:
+            db.rollback()
+            # Los errores 4xx (PDF vacío, inválido...) no se arreglan reintentando
+            retryable = not (isinstance(e, HTTPException) and e.status_code < 500)
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            delay = settings.ANALYSIS_JOB_RETRY_BASE_DELAY * (2 ** (job.attempts - 1))
+            new_status = await run_in_threadpool(
+                crud_analysis_job.mark_job_failed, db, job,
+                error=str(error), retry_delay_seconds=delay, retryable=retryable
+            )
+            if new_status is None:
+                print(f"Trabajo de análisis {job.id} falló ({error}), pero otro worker ya lo reclamó; no se modifica.")
+            else:
+                print(f"Trabajo de análisis {job.id} falló ({error}). Nuevo estado: {new_status}.")
+            return True
+        finally:
+            heartbeat.cancel()
+
+        done = await run_in_threadpool(
+            crud_analysis_job.mark_job_done, db, job,
+            result=analysis.model_dump(mode="json")
+        )
+        if done:
+            print(f"Trabajo de análisis {job.id} terminado.")
+        else:
+            # Se perdió la reserva: el resultado del worker que lo reclamó después prevalece
+            print(f"Trabajo de análisis {job.id} terminado, pero otro worker ya lo reclamó; se descarta este resultado.")
+        return True
+    finally:
+        db.close()
+
+
+async def _worker_loop(worker_number: int) -> None:
+    """Consume la cola hasta que la tarea se cancela (al apagar el worker)."""
+    print(f"DEBUG (JobWorker): consumidor {worker_number} iniciado.")
+    while True:
+        try:
+            processed = await _process_one_job()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Un fallo de la base de datos no debe matar al consumidor
+            print(f"Error en el consumidor de trabajos {worker_number}: {e}")
+            processed = False
+        if not processed:
+            await asyncio.sleep(settings.ANALYSIS_JOB_POLL_INTERVAL)
+
+
+def start_job_workers(count: Optional[int] = None) -> None:
+    """Arranca los consumidores de la cola de análisis en el event loop actual."""
+    count = settings.ANALYSIS_JOB_WORKERS if count is None else count
+    for worker_number in range(count):
+        _worker_tasks.append(asyncio.create_task(_worker_loop(worker_number)))
+
+
+async def stop_job_workers() -> None:
+    """
+    Detiene los consumidores. Un trabajo interrumpido queda en 'running' y vuelve a
+    la cola cuando vence su tiempo de visibilidad, por lo que no se pierde.
+    """
+    for task in _worker_tasks:
+        task.cancel()
+    await asyncio.gather(*_worker_tasks, return_exceptions=True)
+    _worker_tasks.clear()
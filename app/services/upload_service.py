@@ -0,0 +1,152 @@
+# app/services/upload_service.py
+import hashlib
+import tempfile
+import zipfile
+from typing import Callable, Dict, NamedTuple, Optional
+
+from fastapi import UploadFile, HTTPException, Request, status
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+
+# Margen para las cabeceras y separadores del cuerpo multipart
+_MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class SpooledUpload(NamedTuple):
+    """
+    PDF subido, copiado a un archivo temporal (en memoria hasta UPLOAD_SPOOL_MAX_MEMORY,
+    en disco a partir de ahí) y con su SHA-256 ya calculado.
+    """
+    file: tempfile.SpooledTemporaryFile
+    sha256: str
+    size: int
+
+    def read_bytes(self) -> bytes:
+        """Lee el contenido completo (solo cuando realmente hace falta, ej. para Gemini)."""
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def _payload_too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+
+
+async def spool_upload(upload: UploadFile, max_bytes: Optional[int] = None) -> SpooledUpload:
+    """
+    Copia un archivo subido por bloques, con tamaño acotado y hash incremental.
+
+    Nunca mantiene el archivo entero como un único `bytes`: cada bloque se añade al
+    SHA-256 y se escribe en un SpooledTemporaryFile, que pasa a disco al superar
+    UPLOAD_SPOOL_MAX_MEMORY. Si el archivo supera `max_bytes` se rechaza con 413
+    en cuanto se detecta, sin leer el resto.
+
+    Args:
+        upload (UploadFile): El archivo subido (se cierra siempre al terminar).
+        max_bytes (Optional[int]): Tamaño máximo permitido (por defecto UPLOAD_MAX_BYTES).
+
+    Returns:
+        SpooledUpload: El archivo temporal, su SHA-256 y su tamaño.
+
+    Raises:
+        HTTPException: 400 si el archivo está vacío, 413 si es demasiado grande.
+    """
+    max_bytes = settings.UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.UPLOAD_SPOOL_MAX_MEMORY)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await upload.read(settings.UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise _payload_too_large(
+                    f"El archivo '{upload.filename}' supera el tamaño máximo permitido de {max_bytes} bytes."
+                )
+            digest.update(chunk)
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    finally:
+        await upload.close()
+
+    if size == 0:
+        spool.close()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El archivo PDF está vacío o no se pudo leer."
+        )
+    print(f"Archivo '{upload.filename}' recibido. Tamaño: {size} bytes. SHA-256: {digest.hexdigest()[:12]}...")
+    return SpooledUpload(file=spool, sha256=digest.hexdigest(), size=size)
+
+
+def spool_zip_member(archive: zipfile.ZipFile, member: zipfile.ZipInfo, max_bytes: Optional[int] = None) -> SpooledUpload:
+    """
+    Igual que `spool_upload`, pero para un archivo dentro de un ZIP (función síncrona).
+    El tamaño se verifica mientras se descomprime, no solo con el declarado en el ZIP.
+    """
+    max_bytes = settings.UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+    if member.file_size > max_bytes:
+        raise _payload_too_large(f"El archivo '{member.filename}' supera el tamaño máximo permitido de {max_bytes} bytes.")
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.UPLOAD_SPOOL_MAX_MEMORY)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with archive.open(member) as source:
+            while True:
+                chunk = source.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _payload_too_large(f"El archivo '{member.filename}' supera el tamaño máximo permitido de {max_bytes} bytes.")
+                digest.update(chunk)
+                spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    if size == 0:
+        spool.close()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El archivo PDF está vacío o no se pudo leer.")
+    return SpooledUpload(file=spool, sha256=digest.hexdigest(), size=size)
+
+
+# Rutas que reciben archivos (sufijo de la ruta, sin el prefijo de la API) y su límite de tamaño
+_UPLOAD_ROUTE_LIMITS: Dict[str, Callable[[], int]] = {
+    "/analyze-pdf": lambda: settings.UPLOAD_MAX_BYTES,
+    "/analyze-pdf/jobs": lambda: settings.UPLOAD_MAX_BYTES,
+    "/analyze-pdf/batch": lambda: settings.ANALYSIS_BATCH_MAX_BYTES,
+    "/expedientes/from-pdf": lambda: settings.UPLOAD_MAX_BYTES,
+    "/expedientes/bulk": lambda: settings.EXPEDIENTES_BULK_MAX_BYTES,
+}
+
+
+def _request_size_limit(path: str) -> Optional[int]:
+    """Tamaño máximo del cuerpo para las rutas que reciben archivos (None si la ruta no tiene límite)."""
+    for route, limit in _UPLOAD_ROUTE_LIMITS.items():
+        if path.rstrip("/").endswith(route):
+            return limit() + _MULTIPART_OVERHEAD_BYTES
+    return None
+
+
+async def limit_upload_size_middleware(request: Request, call_next):
+    """
+    Middleware HTTP que rechaza con 413 las subidas cuyo Content-Length ya excede el
+    límite, antes de que se lea (y se guarde en disco) el cuerpo multipart.
+    Las subidas sin Content-Length (chunked) se acotan luego en `spool_upload`.
+    """
+    limit = _request_size_limit(request.url.path) if request.method == "POST" else None
+    content_length = request.headers.get("content-length")
+    if limit is not None and content_length and content_length.isdigit() and int(content_length) > limit:
+        print(f"Subida rechazada: Content-Length {content_length} supera el límite de {limit} bytes.")
+        return JSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={"detail": f"La solicitud supera el tamaño máximo permitido de {limit} bytes."}
+        )
+    return await call_next(request)
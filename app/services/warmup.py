@@ -0,0 +1,82 @@
+# app/services/warmup.py
+import asyncio
+from typing import Dict, Any
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.session import warm_up_async_pool, warm_up_pool
+from app.services.analysis_service import get_gemini_model
+from app.services.court_resolver import get_court_index
+
+# Estado de preparación de este worker (uno por proceso de gunicorn)
+_ready = False
+_errors: Dict[str, str] = {}
+
+
+def is_ready() -> bool:
+    """Indica si el worker terminó de precalentarse y puede recibir tráfico."""
+    return _ready
+
+
+def readiness_report() -> Dict[str, Any]:
+    """Estado de preparación y errores del último intento de precalentamiento."""
+    return {"ready": _ready, "errors": dict(_errors)}
+
+
+def _warm_up_sync() -> Dict[str, str]:
+    """
+    Ejecuta cada paso del precalentamiento (función síncrona) y devuelve los errores
+    por paso. Un paso fallido no impide intentar los demás.
+    """
+    errors: Dict[str, str] = {}
+
+    if not settings.GEMINI_SYSTEM_PROMPT or settings.GEMINI_SYSTEM_PROMPT == "DEFAULT_PROMPT_IF_FILE_NOT_FOUND":
+        errors["prompt"] = "El prompt del sistema no se pudo cargar."
+
+    try:
+        get_court_index()
+    except Exception as e:
+        errors["court_table"] = str(e)
+
+    if settings.GEMINI_API_KEY and settings.GEMINI_API_KEY != "NO_API_KEY_SET":
+        try:
+            get_gemini_model(settings.GEMINI_API_KEY)
+        except Exception as e:
+            errors["gemini_model"] = str(e)
+    else:
+        errors["gemini_model"] = "GEMINI_API_KEY no está configurada."
+
+    try:
+        warm_up_pool(settings.DB_POOL_WARM_CONNECTIONS)
+    except Exception as e:
+        errors["database"] = str(e)
+
+    return errors
+
+
+async def warm_up() -> bool:
+    """
+    Precalienta el worker: prompt, tabla de juzgados, cliente de Gemini y pools de
+    conexiones (síncrono y asíncrono). Marca el worker como listo solo si todos los
+    pasos tuvieron éxito.
+    """
+    global _ready, _errors
+    errors = await run_in_threadpool(_warm_up_sync)
+    try:
+        await warm_up_async_pool(settings.DB_POOL_WARM_CONNECTIONS)
+    except Exception as e:
+        errors["database_async"] = str(e)
+    _errors = errors
+    _ready = not _errors
+    if _ready:
+        print("DEBUG (Warmup): worker precalentado y listo.")
+    else:
+        print(f"DEBUG (Warmup): precalentamiento incompleto: {_errors}")
+    return _ready
+
+
+async def warm_up_until_ready() -> None:
+    """Reintenta el precalentamiento cada WARMUP_RETRY_INTERVAL segundos hasta lograrlo."""
+    while not await warm_up():
+        await asyncio.sleep(settings.WARMUP_RETRY_INTERVAL)
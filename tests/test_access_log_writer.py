@@ -0,0 +1,72 @@
+# tests/test_access_log_writer.py
+from collections import deque
+
+import pytest
+
+from app.core.config import settings
+from app.schemas.access_log import AccessLogCreate
+from app.services import access_log_writer
+from app.services.access_log_writer import (
+    OVERFLOW_DROP_OLDEST,
+    OVERFLOW_REJECT,
+    AccessLogBufferFull,
+    enqueue_access_logs,
+    writer_stats,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_buffer(monkeypatch):
+    """Búfer y contadores propios de cada prueba, con capacidad para 5 eventos."""
+    monkeypatch.setattr(access_log_writer, "_buffer", deque())
+    monkeypatch.setattr(access_log_writer, "_wakeup", None)
+    monkeypatch.setattr(access_log_writer, "_counters", {key: 0 for key in access_log_writer._counters})
+    monkeypatch.setattr(settings, "ACCESS_LOG_BUFFER_MAX_EVENTS", 5)
+    monkeypatch.setattr(settings, "ACCESS_LOG_OVERFLOW_POLICY", OVERFLOW_DROP_OLDEST)
+
+
+def _events(prefix: str, count: int):
+    return [AccessLogCreate(action_description=f"{prefix}{i}") for i in range(count)]
+
+
+def _buffered_actions():
+    return [event["action_description"] for event in access_log_writer._buffer]
+
+
+def test_acepta_mientras_hay_lugar():
+    assert enqueue_access_logs(_events("a", 3), "10.0.0.1") == 3
+    stats = writer_stats()
+    assert (stats["buffered"], stats["accepted"], stats["dropped"]) == (3, 3, 0)
+    assert access_log_writer._buffer[0]["ip_address"] == "10.0.0.1"
+
+
+def test_drop_oldest_descarta_solo_los_necesarios():
+    enqueue_access_logs(_events("a", 4), None)
+    assert enqueue_access_logs(_events("b", 3), None) == 3
+    assert _buffered_actions() == ["a2", "a3", "b0", "b1", "b2"]
+    assert writer_stats()["dropped"] == 2
+
+
+def test_drop_oldest_lote_mayor_que_la_capacidad():
+    enqueue_access_logs(_events("a", 3), None)
+    # 3 eventos del búfer desalojados + los 3 más viejos del lote entrante
+    assert enqueue_access_logs(_events("b", 8), None) == 5
+    assert _buffered_actions() == ["b3", "b4", "b5", "b6", "b7"]
+    stats = writer_stats()
+    assert (stats["buffered"], stats["accepted"], stats["dropped"]) == (5, 8, 6)
+
+
+def test_drop_oldest_lote_mayor_que_la_capacidad_con_bufer_vacio():
+    assert enqueue_access_logs(_events("b", 7), None) == 5
+    assert _buffered_actions() == ["b2", "b3", "b4", "b5", "b6"]
+    assert writer_stats()["dropped"] == 2
+
+
+def test_reject_no_modifica_el_bufer(monkeypatch):
+    monkeypatch.setattr(settings, "ACCESS_LOG_OVERFLOW_POLICY", OVERFLOW_REJECT)
+    enqueue_access_logs(_events("a", 4), None)
+    with pytest.raises(AccessLogBufferFull):
+        enqueue_access_logs(_events("b", 2), None)
+    assert _buffered_actions() == ["a0", "a1", "a2", "a3"]
+    stats = writer_stats()
+    assert (stats["rejected"], stats["dropped"]) == (2, 0)
@@ -0,0 +1,89 @@
+# tests/test_analysis_batch.py
+import io
+import tempfile
+import zipfile
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.routers import analysis
+from app.routers.analysis import _expand_zip
+from app.services.upload_service import SpooledUpload, spool_zip_member
+
+
+def _zip_bytes(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members:
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def _spooled(content: bytes) -> SpooledUpload:
+    spool = tempfile.SpooledTemporaryFile()
+    spool.write(content)
+    return SpooledUpload(file=spool, sha256="", size=len(content))
+
+
+def test_expand_zip_separa_pdfs_y_otros_archivos():
+    zip_upload = _spooled(_zip_bytes([
+        ("a.pdf", b"%PDF-1.4 a"), ("notas.txt", b"texto"), ("__MACOSX/._a.pdf", b"x"), ("b.PDF", b"%PDF-1.4 b"),
+    ]))
+    documents, rejected = _expand_zip(zip_upload, max_entries=10)
+    try:
+        assert [name for name, _ in documents] == ["a.pdf", "b.PDF"]
+        assert documents[0][1].read_bytes() == b"%PDF-1.4 a"
+        assert rejected == [("notas.txt", "El archivo dentro del ZIP no es un PDF.")]
+    finally:
+        for _, upload in documents:
+            upload.close()
+        zip_upload.close()
+
+
+def test_expand_zip_se_detiene_al_superar_el_maximo_de_archivos(monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_BATCH_MAX_FILES", 2)
+    extracted = []
+
+    def counting_spool(archive, member):
+        extracted.append(member.filename)
+        return spool_zip_member(archive, member)
+
+    monkeypatch.setattr(analysis, "spool_zip_member", counting_spool)
+    zip_upload = _spooled(_zip_bytes([(f"{i}.pdf", b"%PDF-1.4") for i in range(5)]))
+    with pytest.raises(HTTPException) as exc_info:
+        _expand_zip(zip_upload, max_entries=2)
+    zip_upload.close()
+
+    assert exc_info.value.status_code == 400
+    assert "máximo de 2 documentos" in exc_info.value.detail
+    # No se extrae nada más allá del límite
+    assert extracted == ["0.pdf", "1.pdf"]
+
+
+def test_expand_zip_rechaza_miembros_demasiado_grandes(monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", 1024)
+    # Muy comprimible: el ZIP es chico pero el PDF descomprimido supera el límite
+    zip_upload = _spooled(_zip_bytes([("grande.pdf", b"%" * 64 * 1024), ("chico.pdf", b"%PDF-1.4")]))
+    documents, rejected = _expand_zip(zip_upload, max_entries=10)
+    try:
+        assert [name for name, _ in documents] == ["chico.pdf"]
+        assert rejected[0][0] == "grande.pdf"
+        assert "supera el tamaño máximo permitido de 1024 bytes" in rejected[0][1]
+    finally:
+        for _, upload in documents:
+            upload.close()
+        zip_upload.close()
+
+
+def test_endpoint_lote_zip_con_demasiados_archivos(monkeypatch):
+    monkeypatch.setattr(settings, "ANALYSIS_BATCH_MAX_FILES", 2)
+    content = _zip_bytes([(f"{i}.pdf", b"%PDF-1.4") for i in range(3)])
+    response = TestClient(app).post(
+        "/api/v1/analyze-pdf/batch",
+        files={"files": ("lote.zip", content, "application/zip")},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "El lote supera el máximo de 2 documentos."
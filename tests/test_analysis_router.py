@@ -0,0 +1,45 @@
+# tests/test_analysis_router.py
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db.session import get_db
+from app.main import app
+from app.routers import analysis
+from app.schemas.analysis import AnalysisResponse
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def fake_analyze_pdf_document(pdf_file, db=None):
+        assert await pdf_file.read()
+        return (
+            AnalysisResponse(asunto_principal="Oficio N° 250/2025", releva_secreto_tributario=False),
+            {"cache": "MISS", "input_mode": "text"},
+        )
+
+    monkeypatch.setattr(analysis, "analyze_pdf_document", fake_analyze_pdf_document)
+    app.dependency_overrides[get_db] = lambda: None
+    try:
+        # Sin el bloque "with" no corre el lifespan (precalentamiento, workers, base de datos)
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+
+def test_analyze_pdf_devuelve_resultado_y_cabeceras(client):
+    response = client.post(
+        "/api/v1/analyze-pdf",
+        files={"file": ("oficio.pdf", b"%PDF-1.4 prueba", "application/pdf")},
+    )
+    assert response.status_code == 200
+    assert response.json()["asunto_principal"] == "Oficio N° 250/2025"
+    assert response.headers["X-Analysis-Cache"] == "MISS"
+    assert response.headers["X-Analysis-Input-Mode"] == "text"
+
+
+def test_analyze_pdf_rechaza_otro_tipo(client):
+    response = client.post(
+        "/api/v1/analyze-pdf",
+        files={"file": ("oficio.txt", b"texto", "text/plain")},
+    )
+    assert response.status_code == 400
@@ -0,0 +1,31 @@
+# tests/test_court_resolver.py
+import pytest
+
+from app.services.court_resolver import normalize_court_name, resolve_court
+
+
+def test_normalize_court_name():
+    assert normalize_court_name("Jdo. Ldo. de Rivera de Cuarto T.") == normalize_court_name("Juzgado Letrado de Rivera de 4° Turno")
+
+
+@pytest.mark.parametrize("name, codigo", [
+    ("Juzgado Letrado de Rivera de 4° Turno", 163553),
+    ("JUZGADO LETRADO DE RIVERA DE CUARTO TURNO", 163553),
+    ("Jdo. Ldo. de Pando 2do T.", 163057),
+    ("Juzgado Letrado de Primera Instancia de Pando de 2° Turno", 163057),
+    ("Juzgado de Paz Dptal. de Pando", 163319),
+])
+def test_resolve_court(name, codigo):
+    entry = resolve_court(name)
+    assert entry is not None
+    assert entry.codigo == codigo
+
+
+def test_resolve_court_no_confunde_turnos():
+    assert resolve_court("Juzgado Letrado de Pando de 3° Turno").codigo == 163058
+    assert resolve_court("Juzgado Letrado de Pando de 4° Turno").codigo == 163059
+
+
+@pytest.mark.parametrize("name", [None, "", "   ", "Juzgado Letrado de Narnia"])
+def test_resolve_court_sin_coincidencia(name):
+    assert resolve_court(name) is None
@@ -0,0 +1,126 @@
+# tests/test_expediente_import.py
+import asyncio
+import io
+from datetime import date
+
+import pytest
+
+from app.core.config import settings
+from app.schemas.expediente import ExpedienteBulkError
+from app.services import expediente_import
+from app.services.expediente_import import (
+    FORMAT_CSV,
+    FORMAT_NDJSON,
+    _iter_records,
+    _validate,
+    detect_format,
+    import_expedientes,
+)
+
+
+def _records(content: str, file_format: str):
+    return list(_iter_records(io.BytesIO(content.encode("utf-8")), file_format))
+
+
+@pytest.mark.parametrize("filename, content_type, expected", [
+    ("lote.csv", "text/csv", FORMAT_CSV),
+    ("lote.ndjson", "", FORMAT_NDJSON),
+    ("lote.JSONL", "", FORMAT_NDJSON),
+    ("lote", "application/x-ndjson", FORMAT_NDJSON),
+    ("", "", FORMAT_CSV),
+])
+def test_detect_format(filename, content_type, expected):
+    assert detect_format(filename, content_type) == expected
+
+
+def test_csv_omite_celdas_vacias_y_bom():
+    content = "﻿expediente_nro,oficio,juzgado\n IUE 1-1/2024 , 250/2025,\nIUE 2-2/2024,,Juzgado\n"
+    assert _records(content, FORMAT_CSV) == [
+        (1, {"expediente_nro": "IUE 1-1/2024", "oficio": "250/2025"}),
+        (2, {"expediente_nro": "IUE 2-2/2024", "juzgado": "Juzgado"}),
+    ]
+
+
+def test_ndjson_lineas_invalidas():
+    content = '{"expediente_nro": "IUE 1-1/2024"}\n\n{no es json}\n[1, 2]\n{"expediente_nro": "IUE 2-2/2024"}\n'
+    records = _records(content, FORMAT_NDJSON)
+    assert records[0] == (1, {"expediente_nro": "IUE 1-1/2024"})
+    assert records[1][0] == 2 and records[1][1].startswith("JSON inválido")
+    assert records[2] == (3, "Cada línea debe ser un objeto JSON.")
+    assert records[3] == (4, {"expediente_nro": "IUE 2-2/2024"})
+
+
+def test_validate_deja_solo_los_campos_informados():
+    validated = _validate(1, {"expediente_nro": "IUE 1-1/2024", "fecha_recibido": "2025-05-07"})
+    # 'trabajado' no viene en la fila: no se incluye, así no pisa el valor guardado
+    assert validated == {"expediente_nro": "IUE 1-1/2024", "fecha_recibido": date(2025, 5, 7)}
+
+
+def test_validate_informa_la_fila_y_el_campo():
+    error = _validate(3, {"expediente_nro": "IUE 1-1/2024", "fecha_recibido": "ayer"})
+    assert isinstance(error, ExpedienteBulkError)
+    assert (error.row, error.expediente_nro) == (3, "IUE 1-1/2024")
+    assert error.error.startswith("fecha_recibido:")
+
+
+def test_validate_error_de_lectura():
+    error = _validate(2, "JSON inválido: ...")
+    assert (error.row, error.expediente_nro, error.error) == (2, None, "JSON inválido: ...")
+
+
+class _FakeSession:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+def test_import_expedientes_informa_errores_por_fila(monkeypatch):
+    monkeypatch.setattr(settings, "EXPEDIENTES_BULK_CHUNK_SIZE", 2)
+    upserted = []
+
+    async def fake_upsert(db, rows):
+        upserted.append([row["expediente_nro"] for row in rows])
+        return len(rows), 0, 0
+
+    monkeypatch.setattr(expediente_import.crud_expediente, "upsert_expedientes", fake_upsert)
+    content = (
+        "expediente_nro,fecha_recibido\n"
+        "IUE 1-1/2024,2025-05-07\n"
+        "IUE 2-2/2024,no-es-fecha\n"
+        "IUE 3-3/2024,\n"
+        "IUE 3-3/2024,2025-05-08\n"
+        ",2025-05-09\n"
+    )
+    db = _FakeSession()
+    result = asyncio.run(import_expedientes(db, io.BytesIO(content.encode()), FORMAT_CSV))
+
+    assert (result.received, result.inserted, result.failed) == (5, 2, 3)
+    assert upserted == [["IUE 1-1/2024"], ["IUE 3-3/2024"]]
+    assert [(error.row, error.expediente_nro) for error in result.errors] == [
+        (2, "IUE 2-2/2024"), (3, "IUE 3-3/2024"), (5, None)
+    ]
+    assert "repetido" in result.errors[1].error
+
+
+def test_import_expedientes_lote_fallido_no_detiene_el_resto(monkeypatch):
+    monkeypatch.setattr(settings, "EXPEDIENTES_BULK_CHUNK_SIZE", 1)
+
+    async def fake_upsert(db, rows):
+        if rows[0]["expediente_nro"] == "IUE 1-1/2024":
+            raise RuntimeError("conexión perdida")
+        return 0, 1, 0
+
+    monkeypatch.setattr(expediente_import.crud_expediente, "upsert_expedientes", fake_upsert)
+    content = '{"expediente_nro": "IUE 1-1/2024"}\n{"expediente_nro": "IUE 2-2/2024"}\n'
+    db = _FakeSession()
+    result = asyncio.run(import_expedientes(db, io.BytesIO(content.encode()), FORMAT_NDJSON))
+
+    assert (result.received, result.updated, result.failed) == (2, 1, 1)
+    assert result.errors[0].row == 1 and result.errors[0].error == "Error de base de datos: RuntimeError"
+    assert (db.commits, db.rollbacks) == (1, 1)
@@ -0,0 +1,59 @@
+# tests/test_expedientes_etag.py
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.routers.expedientes import _expected_versions, _expediente_etag, _none_match
+
+_VERSION = datetime(2026, 10, 17, 15, 30, 12, 345678, tzinfo=timezone.utc)
+
+
+def _expediente(expediente_id: int = 7, fecha_actualizacion=_VERSION):
+    return SimpleNamespace(
+        id=expediente_id,
+        fecha_creacion=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        fecha_actualizacion=fecha_actualizacion,
+    )
+
+
+def test_etag_de_ida_y_vuelta():
+    etag = _expediente_etag(_expediente())
+    assert _expected_versions(etag, 7) == [_VERSION]
+
+
+def test_etag_usa_la_fecha_de_creacion_si_nunca_se_modifico():
+    expediente = _expediente(fecha_actualizacion=None)
+    assert _expected_versions(_expediente_etag(expediente), 7) == [expediente.fecha_creacion]
+
+
+@pytest.mark.parametrize("header", [None, "*", " * "])
+def test_if_match_sin_condicion(header):
+    assert _expected_versions(header, 7) is None
+
+
+def test_if_match_lista_de_etags():
+    otra = datetime(2026, 10, 18, tzinfo=timezone.utc)
+    header = f'{_expediente_etag(_expediente())} , {_expediente_etag(_expediente(fecha_actualizacion=otra))}'
+    assert _expected_versions(header, 7) == [_VERSION, otra]
+
+
+@pytest.mark.parametrize("header", [
+    'W/"7-1760715012345678"', # Débil: If-Match usa comparación fuerte
+    '"8-1760715012345678"', # De otro expediente
+    'sin-comillas',
+    '""',
+])
+def test_if_match_que_nunca_coincide(header):
+    assert _expected_versions(header, 7) == []
+
+
+def test_if_none_match():
+    etag = _expediente_etag(_expediente())
+    assert _none_match(etag, etag)
+    assert _none_match(f"W/{etag}", etag) # If-None-Match usa comparación débil
+    assert _none_match(f'"otro", {etag}', etag)
+    assert _none_match("*", etag)
+    assert not _none_match('"otro"', etag)
+    assert not _none_match(None, etag)
+    assert not _none_match("", etag)
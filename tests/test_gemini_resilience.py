@@ -0,0 +1,120 @@
+# tests/test_gemini_resilience.py
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services import gemini_resilience
+from app.services.gemini_resilience import CircuitBreaker, ResilientCaller
+
+
+class _Clock:
+    """Reemplaza time.monotonic del módulo para avanzar el tiempo a mano."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = _Clock()
+    monkeypatch.setattr(gemini_resilience.time, "monotonic", fake)
+    return fake
+
+
+class _ServiceUnavailable(Exception):
+    code = 503
+
+
+def test_breaker_se_abre_tras_fallos_seguidos(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.times_opened == 1
+    assert not breaker.allow_request()
+
+
+def test_breaker_un_exito_reinicia_los_fallos(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_breaker_semiabierto_admite_una_sola_prueba(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.state == "half_open"
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.release_probe()
+    assert breaker.allow_request()
+
+
+def test_breaker_prueba_exitosa_cierra(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow_request()
+    breaker.record_success()
+    breaker.release_probe()
+    assert breaker.state == "closed"
+    assert breaker.allow_request() and breaker.allow_request()
+
+
+def test_breaker_prueba_fallida_vuelve_a_abrir(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow_request()
+    breaker.record_failure() # Basta un fallo en semiabierto
+    breaker.release_probe()
+    assert breaker.state == "open"
+    assert breaker.times_opened == 2
+    assert not breaker.allow_request()
+
+
+def test_resilient_caller_rechaza_llamadas_durante_la_prueba(monkeypatch):
+    monkeypatch.setattr(settings, "GEMINI_BREAKER_FAILURE_THRESHOLD", 1)
+    monkeypatch.setattr(settings, "GEMINI_BREAKER_RESET_TIMEOUT", 0.05)
+    monkeypatch.setattr(settings, "GEMINI_MAX_RETRIES", 0)
+    monkeypatch.setattr(settings, "GEMINI_HEDGING_ENABLED", False)
+
+    async def scenario():
+        caller = ResilientCaller("prueba")
+
+        async def failing():
+            raise _ServiceUnavailable()
+
+        with pytest.raises(_ServiceUnavailable):
+            await caller.call(failing)
+        assert caller.breaker.state == "open"
+        await asyncio.sleep(0.06)
+
+        calls = 0
+
+        async def slow_success():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        results = await asyncio.gather(*(caller.call(slow_success) for _ in range(4)), return_exceptions=True)
+        return caller, calls, results
+
+    caller, calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert results[0] == "ok"
+    assert all(isinstance(result, HTTPException) and result.status_code == 503 for result in results[1:])
+    assert caller.breaker.state == "closed"
+    assert not caller.breaker.probe_in_flight
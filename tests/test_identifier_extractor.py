@@ -0,0 +1,67 @@
+# tests/test_identifier_extractor.py
+import pytest
+
+from app.schemas.analysis import AnalysisResponse
+from app.services.identifier_extractor import extract_identifiers, is_valid_ci, merge_identifiers, normalize_ci
+
+
+@pytest.mark.parametrize("ci", ["44594247", "12345672", "11111111", "1234561"])
+def test_ci_con_digito_verificador_valido(ci):
+    assert is_valid_ci(ci)
+
+
+@pytest.mark.parametrize("ci", ["44594248", "12345678", "123456", "123456789", "4459424-7", ""])
+def test_ci_invalida(ci):
+    assert not is_valid_ci(ci)
+
+
+def test_normalize_ci():
+    assert normalize_ci("4.459.424-7") == "44594247"
+
+
+def test_extract_identifiers():
+    text = (
+        "Oficio N° 250/2025. IUE 330 - 364/2024. Se solicita información de la C.I. 1.234.567-2, "
+        "de la cédula de identidad 4459424-7 y del documento 1.234.567-8 (dígito inválido). "
+        "CVE: 00a1b2c3d4"
+    )
+    extracted = extract_identifiers(text)
+    assert extracted.cedulas == ["12345672", "44594247"]
+    assert extracted.iue == "330-364/2024"
+    assert extracted.numero_oficio == "250/2025"
+    assert extracted.cve == "00A1B2C3D4"
+
+
+def test_extract_identifiers_sin_contexto_ni_formato():
+    # Un número suelto con dígito verificador válido no se toma como C.I.
+    assert extract_identifiers("Expediente 44594247 del año 2024").cedulas == []
+
+
+def _analysis(**values) -> AnalysisResponse:
+    return AnalysisResponse(**{"asunto_principal": "Oficio", "releva_secreto_tributario": False, **values})
+
+
+def test_merge_identifiers_extraidas_primero_y_sin_invalidas():
+    analysis = _analysis(
+        documentos_involucrados=["44594247", "12345678", "11111111"],
+        acciones_detalladas=[{
+            "tipo_accion": "Solicitud",
+            "descripcion_completa": "Solicitud de historia laboral",
+            "involucrados_accion": [
+                {"nombre_completo": "A", "documento_identidad": "1.234.567-8"},
+                {"nombre_completo": "B", "documento_identidad": "4.459.424-7"},
+            ],
+        }],
+    )
+    merged = merge_identifiers(analysis, extract_identifiers("C.I. 1.234.567-2 y cédula 4.459.424-7"))
+
+    assert merged.documentos_involucrados == ["12345672", "44594247", "11111111"]
+    involucrados = merged.acciones_detalladas[0].involucrados_accion
+    assert [involucrado.documento_identidad for involucrado in involucrados] == [None, "44594247"]
+
+
+def test_merge_identifiers_corrige_iue_en_el_asunto():
+    analysis = _analysis(asunto_principal="Oficio N° 250/2025 - IUE 330-999/2024 - Solicitud")
+    merged = merge_identifiers(analysis, extract_identifiers("Oficio N° 250/2025, IUE 330-364/2024"))
+    assert merged.iue == "330-364/2024"
+    assert "IUE 330-364/2024" in merged.asunto_principal
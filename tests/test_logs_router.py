@@ -0,0 +1,46 @@
+# tests/test_logs_router.py
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.crud import crud_access_log
+from app.db.session import get_async_db
+from app.main import app
+
+
+def _log(log_id: int):
+    return SimpleNamespace(
+        id=log_id, timestamp=datetime(2026, 10, 17, tzinfo=timezone.utc), ip_address="10.0.0.1",
+        action_description="consulta", user_identifier="ana", details=None,
+    )
+
+
+@pytest.fixture
+def client(monkeypatch):
+    pages = {None: ([_log(2), _log(1)], "siguiente"), "siguiente": ([_log(0)], None)}
+
+    async def fake_get_access_logs(db, cursor=None, **filters):
+        return pages[cursor]
+
+    async def no_db():
+        yield None
+
+    monkeypatch.setattr(crud_access_log, "get_access_logs", fake_get_access_logs)
+    app.dependency_overrides[get_async_db] = no_db
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_async_db, None)
+
+
+def test_logs_de_acceso_responden_una_lista_con_el_cursor_en_cabecera(client):
+    response = client.get("/api/v1/logs/access")
+    assert response.status_code == 200
+    assert [log["id"] for log in response.json()] == [2, 1]
+    assert response.headers["X-Next-Cursor"] == "siguiente"
+
+    last = client.get("/api/v1/logs/access", params={"cursor": "siguiente"})
+    assert [log["id"] for log in last.json()] == [0]
+    assert "X-Next-Cursor" not in last.headers
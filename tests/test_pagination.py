@@ -0,0 +1,33 @@
+# tests/test_pagination.py
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app.crud.pagination import decode_cursor, encode_cursor, split_page
+
+
+def test_cursor_ida_y_vuelta():
+    values = ["IUE 2-123/2024", 42, None, True]
+    assert decode_cursor(encode_cursor(values), len(values)) == values
+
+
+def test_cursor_fechas_como_iso():
+    moment = datetime(2026, 10, 17, 15, 30, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor([date(2026, 10, 17), moment]), 2) == ["2026-10-17", moment.isoformat()]
+
+
+def test_cursor_opaco_y_seguro_para_url():
+    cursor = encode_cursor(["ñandú/?&=", 1])
+    assert "=" not in cursor
+    assert all(character.isalnum() or character in "-_" for character in cursor)
+
+
+@pytest.mark.parametrize("cursor", ["no-es-base64!", encode_cursor([1]), "e30", ""])
+def test_cursor_invalido(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 2)
+
+
+def test_split_page():
+    assert split_page([1, 2, 3], 2) == ([1, 2], True)
+    assert split_page([1, 2], 2) == ([1, 2], False)
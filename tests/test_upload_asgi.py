@@ -0,0 +1,102 @@
+# tests/test_upload_asgi.py
+import asyncio
+import tracemalloc
+
+import pytest
+
+from app.db.session import get_db
+from app.main import app
+from app.routers import analysis
+from app.schemas.analysis import AnalysisResponse
+from app.services.upload_service import spool_upload
+
+_MB = 1024 * 1024
+_BOUNDARY = "----limite-de-prueba"
+_BODY_CHUNK = 64 * 1024
+
+
+def _multipart_parts(size: int):
+    """Cuerpo multipart con un PDF de `size` bytes, generado por bloques (nunca entero en memoria)."""
+    head = (
+        f"--{_BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="grande.pdf"\r\n'
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{_BOUNDARY}--\r\n".encode()
+    return head, tail, len(head) + size + len(tail)
+
+
+async def _post_large_pdf(size: int):
+    head, tail, total = _multipart_parts(size)
+
+    def body_chunks():
+        yield head
+        remaining = size
+        while remaining:
+            chunk = min(_BODY_CHUNK, remaining)
+            remaining -= chunk
+            yield b"%" * chunk
+        yield tail
+
+    chunks = body_chunks()
+    sent = {}
+
+    async def receive():
+        chunk = next(chunks, None)
+        if chunk is None:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            sent["status"] = message["status"]
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/api/v1/analyze-pdf", "raw_path": b"/api/v1/analyze-pdf",
+        "root_path": "", "query_string": b"", "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+        "headers": [
+            (b"host", b"testserver"),
+            (b"content-type", f"multipart/form-data; boundary={_BOUNDARY}".encode()),
+            (b"content-length", str(total).encode()),
+        ],
+    }
+    await app(scope, receive, send)
+    return sent["status"]
+
+
+@pytest.fixture
+def spooling_endpoint(monkeypatch):
+    """El endpoint real, con el análisis reemplazado por la copia acotada del archivo."""
+    received = {}
+
+    async def fake_analyze_pdf_document(pdf_file, db=None):
+        upload = await spool_upload(pdf_file)
+        received["size"] = upload.size
+        upload.close()
+        return AnalysisResponse(asunto_principal="Oficio", releva_secreto_tributario=False), {"cache": "MISS"}
+
+    monkeypatch.setattr(analysis, "analyze_pdf_document", fake_analyze_pdf_document)
+    app.dependency_overrides[get_db] = lambda: None
+    try:
+        yield received
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+
+def test_subida_por_la_app_con_memoria_acotada(spooling_endpoint):
+    """
+    Una subida de 16 MB atraviesa el parser multipart de Starlette y spool_upload sin
+    acumularse en memoria: ambos pasan a disco al superar su umbral.
+    """
+    size = 16 * _MB
+    tracemalloc.start()
+    try:
+        status_code = asyncio.run(_post_large_pdf(size))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert status_code == 200
+    assert spooling_endpoint["size"] == size
+    assert peak < 4 * _MB
@@ -0,0 +1,57 @@
+# tests/test_upload_limits.py
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.main import app
+from app.services.upload_service import _MULTIPART_OVERHEAD_BYTES, _request_size_limit
+
+
+@pytest.mark.parametrize("path, setting", [
+    ("/api/v1/analyze-pdf", "UPLOAD_MAX_BYTES"),
+    ("/api/v1/analyze-pdf/jobs", "UPLOAD_MAX_BYTES"),
+    ("/api/v1/analyze-pdf/batch", "ANALYSIS_BATCH_MAX_BYTES"),
+    ("/api/v1/expedientes/from-pdf", "UPLOAD_MAX_BYTES"),
+    ("/api/v1/expedientes/bulk", "EXPEDIENTES_BULK_MAX_BYTES"),
+    ("/api/v1/expedientes/bulk/", "EXPEDIENTES_BULK_MAX_BYTES"),
+])
+def test_limite_por_ruta(path, setting):
+    assert _request_size_limit(path) == getattr(settings, setting) + _MULTIPART_OVERHEAD_BYTES
+
+
+@pytest.mark.parametrize("path", ["/api/v1/expedientes/", "/api/v1/logs/access", "/api/v1/expedientes/12/trabajado"])
+def test_rutas_sin_subida_no_tienen_limite(path):
+    assert _request_size_limit(path) is None
+
+
+def _post_with_content_length(path: str, content_length: int):
+    """Envía solo las cabeceras de un POST: el middleware debe responder sin leer el cuerpo."""
+    sent = {}
+
+    async def receive():
+        raise AssertionError("El cuerpo no debería leerse")
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            sent["status"] = message["status"]
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+        "headers": [
+            (b"host", b"testserver"),
+            (b"content-type", b"multipart/form-data; boundary=x"),
+            (b"content-length", str(content_length).encode()),
+        ],
+    }
+    asyncio.run(app(scope, receive, send))
+    return sent["status"]
+
+
+@pytest.mark.parametrize("path", ["/api/v1/expedientes/from-pdf", "/api/v1/expedientes/bulk"])
+def test_rutas_de_expedientes_rechazan_por_content_length(monkeypatch, path):
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", 1024)
+    monkeypatch.setattr(settings, "EXPEDIENTES_BULK_MAX_BYTES", 1024)
+    assert _post_with_content_length(path, 1024 + _MULTIPART_OVERHEAD_BYTES + 1) == 413
@@ -0,0 +1,79 @@
+# tests/test_upload_service.py
+import asyncio
+import hashlib
+import io
+import tracemalloc
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.core.config import settings
+from app.services.upload_service import spool_upload
+
+_MB = 1024 * 1024
+
+
+class _GeneratedStream:
+    """Archivo de solo lectura que genera `size` bytes bajo demanda, sin tenerlos en memoria."""
+
+    def __init__(self, size: int):
+        self.remaining = size
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            size = self.remaining
+        chunk = b"%" * min(size, self.remaining)
+        self.remaining -= len(chunk)
+        self.bytes_read += len(chunk)
+        return chunk
+
+    def close(self) -> None:
+        pass
+
+
+def test_spool_upload_memoria_acotada():
+    """Una subida de 64 MB no debe acumularse en memoria: el pico queda cerca del umbral del spool."""
+    size = 64 * _MB
+    upload = UploadFile(file=_GeneratedStream(size), filename="grande.pdf")
+
+    tracemalloc.start()
+    try:
+        spooled = asyncio.run(spool_upload(upload, max_bytes=size))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    try:
+        assert spooled.size == size
+        assert peak < settings.UPLOAD_SPOOL_MAX_MEMORY + 8 * settings.UPLOAD_CHUNK_SIZE + 2 * _MB
+    finally:
+        spooled.close()
+
+
+def test_spool_upload_rechaza_sin_leer_el_resto():
+    stream = _GeneratedStream(10 * _MB)
+    upload = UploadFile(file=stream, filename="grande.pdf")
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(spool_upload(upload, max_bytes=_MB))
+
+    assert exc_info.value.status_code == 413
+    assert stream.bytes_read <= _MB + settings.UPLOAD_CHUNK_SIZE
+
+
+def test_spool_upload_calcula_hash_y_tamano():
+    content = b"%PDF-1.4 contenido de prueba"
+    spooled = asyncio.run(spool_upload(UploadFile(file=io.BytesIO(content), filename="a.pdf")))
+    try:
+        assert spooled.size == len(content)
+        assert spooled.sha256 == hashlib.sha256(content).hexdigest()
+        assert spooled.read_bytes() == content
+    finally:
+        spooled.close()
+
+
+def test_spool_upload_vacio():
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(spool_upload(UploadFile(file=io.BytesIO(b""), filename="vacio.pdf")))
+    assert exc_info.value.status_code == 400